@@ -0,0 +1,150 @@
+# src/assembly.py
+
+"""
+Assembly Module
+
+Per-part view of a STEP assembly: every volume of the loaded model becomes a
+part with its own bounding box, sub-domain and (optionally) occupancy mask.
+
+Listing the parts needs the Gmsh session and runs once, next to the combined
+bounding box and tessellation. The per-part masks only need the part's slice
+of that tessellation, so they are pure NumPy work and run across a process
+pool: wall time grows with the number of parts per core, not per file.
+A worker that dies (an out-of-memory kill on a huge part) costs a retry on a
+fresh pool, not a hang.
+"""
+
+import concurrent.futures
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+
+def list_parts(debug=False):
+    """
+    Return [{index, tag, name, bbox, surfaces}] for the volumes of the loaded
+    model, bbox as (min_x, min_y, min_z, max_x, max_y, max_z) and surfaces the
+    tags of the faces bounding the volume.
+
+    Expects an initialized Gmsh session with the model already synchronized.
+    """
+    import gmsh
+    parts = []
+    for index, (dim, tag) in enumerate(gmsh.model.getEntities(3)):
+        # Imported names are paths such as "Shapes/Assembly/impeller"
+        name = gmsh.model.getEntityName(dim, tag).split("/")[-1] or f"volume_{tag}"
+        _, surfaces = gmsh.model.getAdjacencies(dim, tag)
+        parts.append({
+            "index": index,
+            "tag": int(tag),
+            "name": name,
+            "bbox": tuple(gmsh.model.getBoundingBox(dim, tag)),
+            "surfaces": sorted({abs(int(s)) for s in surfaces}),
+        })
+    if debug:
+        print(f"[DEBUG] Assembly parts: {len(parts)} volume{'s' if len(parts) != 1 else ''}.")
+    return parts
+
+
+def part_mask_path(mask_path, index):
+    """Mask sidecar of part `index`, beside the combined one: <stem>_part0003<ext>."""
+    root, ext = os.path.splitext(mask_path)
+    return f"{root}_part{index:04d}{ext}"
+
+
+def part_budget(resolution_budget, count):
+    """
+    Share of a resolution budget for each of `count` parts: max_cells and
+    max_bytes split evenly, so all part grids together stay within it.
+    """
+    if not resolution_budget or count <= 1:
+        return resolution_budget
+    share = dict(resolution_budget)
+    for key in ("max_cells", "max_bytes"):
+        if share.get(key) is not None:
+            share[key] = max(1, int(share[key]) // count)
+    return share
+
+
+def split_surface(vertices, triangles, entities, part_surfaces):
+    """
+    Yield the (vertices, triangles) of every part given the surface tags of
+    each part: the triangles of those surfaces, with the vertex array
+    compacted to the nodes they use.
+    """
+    # Group triangles by surface once instead of scanning them per part
+    order = np.argsort(entities, kind="stable")
+    ordered = entities[order]
+    for surfaces in part_surfaces:
+        surfaces = np.asarray(surfaces, dtype=ordered.dtype)
+        starts = np.searchsorted(ordered, surfaces, side="left")
+        stops = np.searchsorted(ordered, surfaces, side="right")
+        rows = np.concatenate([order[a:b] for a, b in zip(starts, stops)] or [np.empty(0, dtype=np.int64)])
+        used, inverse = np.unique(triangles[rows], return_inverse=True)
+        yield vertices[used], inverse.reshape(-1, 3).astype(np.int64)
+
+
+def _mask_part(task):
+    # Module level so a process pool can pickle it
+    from src.gmsh_runner import attach_geometry_mask
+    part, vertices, triangles, mask_path, mask_encoding = task
+    return attach_geometry_mask(part, vertices, triangles, mask_path=mask_path, mask_encoding=mask_encoding)
+
+
+def _mask_pool(tasks, workers):
+    """
+    Mask the {position: task} `tasks` on a fresh process pool. Returns the
+    masked parts and the tasks lost when a worker process died, both by position.
+    """
+    masked, lost = {}, {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_mask_part, task): position for position, task in tasks.items()}
+        for future in concurrent.futures.as_completed(futures):
+            position = futures[future]
+            try:
+                masked[position] = future.result()
+            except BrokenProcessPool:
+                # Every unfinished part fails with the pool, not just the one that killed it
+                lost[position] = tasks[position]
+    return masked, lost
+
+
+def attach_part_masks(parts, part_surfaces, vertices, triangles, entities, mask_path=None, mask_encoding="dense",
+                      workers=1, debug=False):
+    """
+    Return the part dicts (index and domain_definition, as in the output)
+    with the geometry mask of each part added, given its surface tags.
+
+    `mask_path` is the combined mask sidecar; each part writes its own beside
+    it (see part_mask_path), or inline flat masks when it is None. Parts are
+    farmed out to `workers` processes; one worker or one part runs in-process.
+    Parts lost with a dead worker are retried on a fresh pool, then one per
+    pool; a part that still kills its worker alone raises BrokenProcessPool.
+    """
+    tasks = (
+        (part, part_vertices, part_triangles, mask_path and part_mask_path(mask_path, part["index"]), mask_encoding)
+        for part, (part_vertices, part_triangles) in zip(parts, split_surface(vertices, triangles, entities,
+                                                                              part_surfaces))
+    )
+    if workers <= 1 or len(parts) <= 1:
+        masked = [_mask_part(task) for task in tasks]
+    else:
+        tasks = dict(enumerate(tasks))
+        masked, lost = _mask_pool(tasks, min(workers, len(tasks)))
+        if lost:
+            print(f"[WARN] A mask worker process died; retrying {len(lost)} part(s) on a fresh pool.")
+            done, lost = _mask_pool(lost, min(workers, len(lost)))
+            masked.update(done)
+        for position in sorted(lost):
+            # Alone in its own pool, a part can only take itself down
+            done, still_lost = _mask_pool({position: lost[position]}, 1)
+            if still_lost:
+                part = parts[position]
+                raise BrokenProcessPool(f"Worker process died masking part {part['index']} ({part['name']}), "
+                                        "likely out of memory; lower its resolution.")
+            masked.update(done)
+        masked = [masked[position] for position in range(len(tasks))]
+    if debug:
+        print(f"[DEBUG] Part masks: {len(masked)} parts on {max(1, min(workers, len(parts)))} worker(s).")
+    return masked
@@ -0,0 +1,306 @@
+# src/batch_runner.py
+
+"""
+Batch Runner Module
+
+Extracts domain definitions for many STEP files in one invocation. Files are
+spread across a pool of worker processes; each worker keeps a single Gmsh
+session alive and clears the model between files instead of paying the
+interpreter, import and initialize cost per file.
+
+A worker that dies outright (a Gmsh/OCC crash, an out-of-memory kill) breaks
+the pool; the files it took down with it are retried on a fresh pool of the
+same size. Only files lost a second time are isolated one per worker, and a
+file that dies alone is recorded as failed.
+
+Zip archives are expanded into references to their STEP members (see
+zip_ingest); the worker handling a member streams just that member to a
+temporary file, so archives are never unpacked as a whole.
+"""
+
+import concurrent.futures
+import contextlib
+import json
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+from src.gmsh_runner import load_bounding_box, resolve_domain, load_schema, domain_cache_key
+from src.domain_definition_writer import compile_schema
+from src.result_cache import file_sha256
+from src.run_metrics import RunMetrics, emit_record
+from src.zip_ingest import (
+    STEP_EXTENSIONS, ARCHIVE_EXTENSIONS, is_archive, list_step_members, member_ref, split_member_ref,
+    member_output_stem, open_step_source
+)
+
+SUMMARY_FILENAME = "batch_summary.json"
+
+# Per-worker state, populated once by _init_worker
+_worker_validator = None
+_worker_debug = False
+_worker_cache = None
+
+
+def collect_step_files(source):
+    """
+    Resolve a batch source into an ordered list of STEP paths.
+
+    A directory yields its STEP files and zip archives (non-recursive, sorted
+    by name). A zip archive, given directly or found in a directory or
+    manifest, yields member references for its STEP members. Any other file
+    is read as a manifest with one path per line; blank lines and lines
+    starting with '#' are ignored, and relative paths are resolved against
+    the manifest's directory.
+    """
+    if os.path.isdir(source):
+        entries = sorted(
+            os.path.join(source, name)
+            for name in os.listdir(source)
+            if name.lower().endswith(STEP_EXTENSIONS + ARCHIVE_EXTENSIONS)
+            and os.path.isfile(os.path.join(source, name))
+        )
+        return _expand_archives(entries)
+
+    if not os.path.isfile(source):
+        raise FileNotFoundError(f"Batch source not found: {source}")
+
+    if is_archive(source):
+        return _expand_archives([source])
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    step_files = []
+    with open(source, "r") as f:
+        for line in f:
+            entry = line.strip()
+            if not entry or entry.startswith("#"):
+                continue
+            if not os.path.isabs(entry):
+                entry = os.path.join(base_dir, entry)
+            step_files.append(entry)
+    return _expand_archives(step_files)
+
+
+def _expand_archives(entries):
+    """Replace every zip archive in `entries` by references to its STEP members."""
+    expanded = []
+    for entry in entries:
+        if is_archive(entry):
+            expanded.extend(member_ref(entry, member) for member in list_step_members(entry))
+        else:
+            expanded.append(entry)
+    return expanded
+
+
+def output_path_for(step_path, output_dir):
+    """
+    Map a STEP path to its domain JSON path inside output_dir. Archive
+    members land under a folder named after the archive, keeping the
+    member's own folders.
+    """
+    if split_member_ref(step_path)[1] is not None:
+        return os.path.join(output_dir, member_output_stem(step_path) + ".json")
+    stem = os.path.splitext(os.path.basename(step_path))[0]
+    return os.path.join(output_dir, f"{stem}.json")
+
+
+def plan_outputs(step_files, output_dir):
+    """
+    Pair every STEP file with its output path, rejecting name collisions so
+    that two inputs never silently overwrite the same output.
+    """
+    planned = {}
+    for step_path in step_files:
+        output_path = output_path_for(step_path, output_dir)
+        if output_path in planned:
+            raise ValueError(
+                f"Output name collision: {planned[output_path]} and {step_path} both map to {output_path}"
+            )
+        planned[output_path] = step_path
+    return [(step_path, output_path) for output_path, step_path in planned.items()]
+
+
+def _init_worker(schema, debug, cache):
+    # Gmsh is imported in the workers only, so the pure helpers load without it
+    import gmsh
+    global _worker_validator, _worker_debug, _worker_cache
+    _worker_validator = compile_schema(schema)
+    _worker_debug = debug
+    _worker_cache = cache
+    gmsh.initialize()
+    if debug: print(f"[DEBUG] Worker {os.getpid()} initialized Gmsh.")
+
+
+def _extract(step_path, metrics, lc, nx, ny, nz, resolution_budget, record):
+    """Domain for a local STEP file, from the worker cache when possible."""
+    domain = None
+    metrics.set("step_bytes", os.path.getsize(step_path))
+    record["step_sha256"] = file_sha256(step_path)
+    metrics.set("step_sha256", record["step_sha256"])
+    if _worker_cache is not None:
+        # Same key as a plain single run (OCC bounding box, no mask or sidecars)
+        cache_key = domain_cache_key(_worker_cache, step_path, {"lc": lc, "nx": nx, "ny": ny, "nz": nz},
+                                     resolution_budget=resolution_budget)
+        domain = _worker_cache.get(cache_key)
+        record["cache"] = "hit" if domain is not None else "miss"
+        metrics.set("cache", record["cache"])
+    if domain is None:
+        bbox = load_bounding_box(step_path, debug=_worker_debug, metrics=metrics)
+        with metrics.phase("resolution"):
+            domain = resolve_domain(bbox, lc=lc, nx=nx, ny=ny, nz=nz,
+                                    resolution_budget=resolution_budget, debug=_worker_debug)
+        if _worker_cache is not None:
+            _worker_cache.put(cache_key, domain)
+    return domain
+
+
+def _process_file(task):
+    step_path, output_path, lc, nx, ny, nz, resolution_budget = task
+    started = time.perf_counter()
+    record = {"step": step_path, "output": output_path}
+    metrics = RunMetrics(step=step_path, lc=lc, nx=nx, ny=ny, nz=nz, worker=os.getpid())
+    try:
+        with contextlib.ExitStack() as stack:
+            local_path = step_path
+            if split_member_ref(step_path)[1] is not None:
+                with metrics.phase("spool"):
+                    local_path = stack.enter_context(open_step_source(step_path))
+            domain = _extract(local_path, metrics, lc, nx, ny, nz, resolution_budget, record)
+        with metrics.phase("validate"):
+            _worker_validator.validate(domain)
+        with metrics.phase("write"):
+            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+            with open(output_path, "w") as f:
+                json.dump(domain, f, indent=2)
+        record["status"] = "ok"
+        record["domain_definition"] = domain["domain_definition"]
+    except Exception as e:
+        record["status"] = "failed"
+        record["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        # Drop the model right away so an idle worker does not pin its memory
+        try:
+            import gmsh
+            gmsh.clear()
+        except Exception:
+            pass
+    record["elapsed_s"] = round(time.perf_counter() - started, 4)
+    metrics.set("status", record["status"])
+    record["metrics"] = metrics.as_record()
+    return record
+
+
+def _lost_record(task):
+    """Failed record for a file whose worker process died."""
+    step_path, output_path, lc, nx, ny, nz, _ = task
+    metrics = RunMetrics(step=step_path, lc=lc, nx=nx, ny=ny, nz=nz)
+    metrics.set("status", "failed")
+    return {"step": step_path, "output": output_path, "status": "failed",
+            "error": "BrokenProcessPool: worker process died (crash or out-of-memory kill)",
+            "elapsed_s": 0.0, "metrics": metrics.as_record()}
+
+
+def _run_pool(tasks, workers, initargs, on_record):
+    """
+    Run `tasks` on a fresh worker pool, handing every record to `on_record`.
+    Returns the tasks that were lost when a worker process died.
+    """
+    lost = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                initargs=initargs) as pool:
+        futures = {pool.submit(_process_file, task): task for task in tasks}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                record = future.result()
+            except BrokenProcessPool:
+                # Every unfinished file fails with the pool, not just the one that killed it
+                lost.append(futures[future])
+                continue
+            on_record(record)
+    return lost
+
+
+def catalog_record(catalog, record, metrics, lc=None, source="batch"):
+    """Record one per-file result of _process_file in a RunCatalog."""
+    domain = {"domain_definition": record["domain_definition"]} if record["status"] == "ok" else None
+    return catalog.record_run(record["step"], record["status"], domain=domain,
+                              output_path=record["output"] if domain else None,
+                              step_sha256=record.get("step_sha256"), lc=lc, metrics=metrics,
+                              error=record.get("error"), source=source)
+
+
+def run_batch(source, output_dir, lc=None, nx=None, ny=None, nz=None,
+              schema_path="schemas/domain_schema.json", workers=1, debug=False, cache=None, metrics_path=None,
+              resolution_budget=None, catalog=None):
+    """
+    Process every STEP file listed by `source` and write one domain JSON per
+    input plus a batch summary into `output_dir`. Returns the summary dict.
+
+    Per-file failures are recorded in the summary rather than aborting the
+    batch; invalid resolution arguments fail fast before any work starts.
+    When a ResultCache is given, workers consult it before touching Gmsh.
+    Per-file metrics are appended as JSON lines to `metrics_path` if given;
+    a `resolution_budget` (see resolution_planner) replaces lc/nx/ny/nz.
+    Every file is recorded in the RunCatalog `catalog` if given.
+    """
+    if not lc and not (nx and ny and nz) and not resolution_budget:
+        raise ValueError("Either --lc or all of --nx, --ny, --nz must be provided.")
+
+    step_files = collect_step_files(source)
+    if not step_files:
+        raise ValueError(f"No STEP files found in batch source: {source}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = [
+        (step_path, output_path, lc, nx, ny, nz, resolution_budget)
+        for step_path, output_path in plan_outputs(step_files, output_dir)
+    ]
+    schema = load_schema(schema_path)
+    workers = max(1, min(workers, len(tasks)))
+
+    print(f"[INFO] Batch: {len(tasks)} STEP file(s) across {workers} worker(s)")
+    started = time.perf_counter()
+    records = []
+
+    def on_record(record):
+        metrics = record.pop("metrics")
+        if metrics_path:
+            emit_record(metrics, metrics_path)
+        if catalog is not None:
+            catalog_record(catalog, record, metrics, lc=lc, source="batch")
+        if record["status"] == "ok":
+            print(f"[INFO] ✅ {record['step']} → {record['output']} ({record['elapsed_s']}s)")
+        else:
+            print(f"[ERROR] ❌ {record['step']}: {record['error']}")
+        records.append(record)
+
+    initargs = (schema, debug, cache)
+    lost = _run_pool(tasks, workers, initargs, on_record)
+    if lost:
+        print(f"[WARN] A worker process died; retrying {len(lost)} file(s) on a fresh pool.")
+        lost = _run_pool(lost, min(workers, len(lost)), initargs, on_record)
+    if lost:
+        print(f"[WARN] A worker process died again; retrying {len(lost)} file(s) one per fresh worker.")
+    for task in sorted(lost, key=lambda task: task[0]):
+        # Alone in its pool, a file that dies again is the one to blame
+        if _run_pool([task], 1, initargs, on_record):
+            on_record(_lost_record(task))
+
+    records.sort(key=lambda r: r["step"])
+    failed = sum(1 for r in records if r["status"] != "ok")
+    summary = {
+        "source": source,
+        "total": len(records),
+        "succeeded": len(records) - failed,
+        "failed": failed,
+        "workers": workers,
+        "elapsed_s": round(time.perf_counter() - started, 4),
+        "files": records
+    }
+
+    summary_path = os.path.join(output_dir, SUMMARY_FILENAME)
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=2)
+    print(f"[INFO] Batch summary written to: {summary_path} ({summary['succeeded']}/{summary['total']} succeeded)")
+
+    return summary
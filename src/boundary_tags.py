@@ -0,0 +1,187 @@
+# src/boundary_tags.py
+
+"""
+Boundary Tags Module
+
+Labels the wall-adjacent cells of the structured grid with the boundary
+group (inlet, outlet, wall, ...) of the nearest model surface.
+
+- Groups come from the model's 2D physical groups or named faces (see
+  surface_tessellation.surface_groups). Surfaces in no group share label 0,
+  "unassigned"; groups are numbered from 1 in the order given.
+- Boundary cells are fluid cells with a solid face neighbour, found slab by
+  slab from the occupancy mask with one slab of look-ahead.
+- Every boundary cell centre takes the group of its nearest triangle, in
+  batched SurfaceIndex queries capped at one cell spacing (the surface
+  crosses the segment to the solid neighbour), so the query work is linear
+  in the number of boundary cells.
+
+The result is a sparse .npz sidecar: sorted flat cell indices
+(i + nx * (j + ny * k), as for geometry_mask_flat) and one small-integer
+label per cell, described by a lookup table in the JSON.
+"""
+
+import os
+
+import numpy as np
+
+from src.mask_io import file_checksum
+from src.occupancy_mask import grid_spacing, iter_mask_slabs
+
+UNASSIGNED_LABEL = 0
+UNASSIGNED_NAME = "unassigned"
+
+# Boundary cells handed to the surface index at once
+DEFAULT_CELL_BATCH = 1 << 16
+
+AXIS_ORDER = "zyx"
+
+
+class BoundaryTagError(Exception):
+    """Raised when a boundary tag sidecar is missing or does not match its descriptor."""
+
+
+def lookup_table(groups, triangle_entities):
+    """
+    Lookup table [{label, name, surfaces[, physical_tag]}] and the label of
+    every triangle (uint16). A surface listed by several groups keeps the
+    first group's label.
+    """
+    triangle_entities = np.asarray(triangle_entities, dtype=np.int64)
+    surface_label = {}
+    table = []
+    for label, (name, physical_tag, surfaces) in enumerate(groups, start=UNASSIGNED_LABEL + 1):
+        entry = {"label": label, "name": name, "surfaces": sorted(int(s) for s in surfaces)}
+        if physical_tag is not None:
+            entry["physical_tag"] = int(physical_tag)
+        table.append(entry)
+        for surface in entry["surfaces"]:
+            surface_label.setdefault(surface, label)
+
+    tags = np.unique(triangle_entities)
+    unassigned = [int(t) for t in tags if int(t) not in surface_label]
+    table.insert(0, {"label": UNASSIGNED_LABEL, "name": UNASSIGNED_NAME, "surfaces": unassigned})
+
+    labels_of_tags = np.array([surface_label.get(int(t), UNASSIGNED_LABEL) for t in tags], dtype=np.uint16)
+    triangle_labels = labels_of_tags[np.searchsorted(tags, triangle_entities)] if tags.size else np.empty(0, np.uint16)
+    return table, triangle_labels
+
+
+def _slab_boundary(k_start, slab, below, above):
+    """Flat (k, j, i) offsets in the grid of fluid cells of `slab` with a solid face neighbour."""
+    solid = slab.astype(bool)
+    near = np.zeros_like(solid)
+    near[:, :, 1:] |= solid[:, :, :-1]
+    near[:, :, :-1] |= solid[:, :, 1:]
+    near[:, 1:] |= solid[:, :-1]
+    near[:, :-1] |= solid[:, 1:]
+    near[1:] |= solid[:-1]
+    near[:-1] |= solid[1:]
+    if below is not None:
+        near[0] |= below.astype(bool)
+    if above is not None:
+        near[-1] |= above.astype(bool)
+    k, j, i = np.nonzero(near & ~solid)
+    _, ny, nx = slab.shape
+    return ((k.astype(np.int64) + k_start) * ny + j) * nx + i
+
+
+def iter_boundary_cells(slabs):
+    """
+    Yield sorted flat indices of the boundary cells slab by slab, from mask
+    slabs (k_start, k_stop, slab) in increasing k. Cells outside the grid do
+    not count as neighbours.
+    """
+    below = None
+    pending = None
+    for k_start, _, slab in slabs:
+        if pending is not None:
+            yield _slab_boundary(pending[0], pending[1], below, slab[0])
+            below = pending[1][-1]
+        pending = (k_start, slab)
+    if pending is not None:
+        yield _slab_boundary(pending[0], pending[1], below, None)
+
+
+def tag_boundary_cells(domain_definition, vertices, triangles, triangle_entities, groups, index=None,
+                       crossings=None, cell_batch=DEFAULT_CELL_BATCH):
+    """
+    Return (cells, labels, table): sorted flat indices of the boundary cells,
+    the group label of each and the lookup table.
+
+    `index` may carry a prebuilt SurfaceIndex and `crossings` a
+    column_crossings() result of the same grid.
+    """
+    if index is None:
+        from src.spatial_index import SurfaceIndex
+        index = SurfaceIndex(vertices, triangles, triangle_entities)
+    table, triangle_labels = lookup_table(groups, triangle_entities)
+    origin, spacing, (nx, ny, nz) = grid_spacing(domain_definition)
+    origin = np.array(origin)
+    spacing = np.array(spacing)
+    reach = float(spacing.max())
+
+    cells, labels = [], []
+    for slab_cells in iter_boundary_cells(iter_mask_slabs(domain_definition, vertices, triangles, crossings=crossings)):
+        for start in range(0, len(slab_cells), cell_batch):
+            batch = slab_cells[start:start + cell_batch]
+            ijk = np.stack([batch % nx, (batch // nx) % ny, batch // (nx * ny)], axis=1)
+            points = origin + (ijk + 0.5) * spacing
+            _, tri, _ = index.nearest(points, max_distance=reach)
+            missed = tri < 0
+            if missed.any():  # Only where ray parity and distance disagree
+                tri[missed] = index.nearest(points[missed])[1]
+            cells.append(batch)
+            labels.append(triangle_labels[tri])
+
+    cells = np.concatenate(cells) if cells else np.empty(0, dtype=np.int64)
+    labels = np.concatenate(labels) if labels else np.empty(0, dtype=np.uint16)
+    counts = np.bincount(labels, minlength=len(table))
+    for entry in table:
+        entry["cells"] = int(counts[entry["label"]])
+    return cells, labels, table
+
+
+def write_boundary_tags(path, domain_definition, vertices, triangles, triangle_entities, groups, index=None,
+                        debug=False):
+    """
+    Tag the boundary cells into a sparse .npz sidecar at `path` and return
+    its descriptor (without the path).
+    """
+    cells, labels, table = tag_boundary_cells(domain_definition, vertices, triangles, triangle_entities, groups,
+                                              index=index)
+    _, _, (nx, ny, nz) = grid_spacing(domain_definition)
+    # Smallest integer types that hold every index and label
+    cell_dtype = np.uint32 if nx * ny * nz <= np.iinfo(np.uint32).max else np.int64
+    label_dtype = np.uint8 if len(table) <= np.iinfo(np.uint8).max + 1 else np.uint16
+    with open(path, "wb") as f:
+        np.savez(f, cells=cells.astype(cell_dtype), labels=labels.astype(label_dtype))
+    if debug:
+        summary = ", ".join(f"{entry['name']}={entry['cells']}" for entry in table)
+        print(f"[DEBUG] Boundary tags: {len(cells)} of {nx * ny * nz} cells ({summary}).")
+    return {
+        "format": "npz",
+        "encoding": "sparse",
+        "shape": [nz, ny, nx],
+        "axis_order": AXIS_ORDER,
+        "dtype": np.dtype(label_dtype).name,
+        "cells": int(len(cells)),
+        "groups": table,
+        "sha256": file_checksum(path),
+    }
+
+
+def load_boundary_tags(descriptor, base_dir=".", verify=False):
+    """Return (cells, labels) of a boundary tag descriptor's sidecar."""
+    path = descriptor["path"]
+    path = path if os.path.isabs(path) else os.path.join(base_dir, path)
+    if not os.path.isfile(path):
+        raise BoundaryTagError(f"Missing boundary tag file: {path}")
+    if verify and file_checksum(path) != descriptor.get("sha256"):
+        raise BoundaryTagError(f"Checksum mismatch for boundary tag file: {path}")
+    with np.load(path) as data:
+        cells, labels = data["cells"], data["labels"]
+    nz, ny, nx = descriptor["shape"]
+    if len(cells) != len(labels) or len(cells) != descriptor["cells"] or (len(cells) and cells.max() >= nx * ny * nz):
+        raise BoundaryTagError(f"Boundary tag file {path} does not match its descriptor")
+    return cells, labels
@@ -0,0 +1,236 @@
+# src/distance_field.py
+
+"""
+Distance Field Module
+
+Signed distance to the model surface at every node of the structured grid.
+Nodes sit at min + i * spacing for i = 0..n on each axis, so the field has
+(nz + 1, ny + 1, nx + 1) values stored C-ordered in the same "zyx" axis
+order as mask sidecars. Values are negative inside the solid.
+
+- Narrow band: exact point-to-triangle distances for nodes within
+  `band_cells` grid spacings of the surface, computed z-slab by z-slab
+  through a SurfaceIndex.
+- Far field: first-order fast sweeping of |grad d| = 1 outwards from the
+  band, updating whole diagonal planes of nodes at a time.
+- Sign: cell-centre occupancy of a grid shifted by half a cell, whose cell
+  centres are exactly the nodes (column ray parity, as for the mask).
+
+The field is written straight into a float32 .npy memmap, so besides it only
+one slab of query points, one diagonal plane of sweep temporaries and a
+one-byte-per-node band flag live in RAM.
+"""
+
+import itertools
+import os
+
+import numpy as np
+
+from src.mask_io import file_checksum
+from src.occupancy_mask import grid_spacing, column_crossings, iter_mask_slabs
+
+# Exact band half-width in grid spacings (the largest spacing of the grid);
+# must cover the node diagonal of a cell for the sweep to start everywhere
+DEFAULT_BAND_CELLS = 3
+
+# Nodes per z-slab handed to the surface index at once
+DEFAULT_SLAB_NODES = 1 << 18
+
+# Sweep rounds (all eight orderings) before giving up on convergence
+DEFAULT_MAX_SWEEPS = 8
+
+AXIS_ORDER = "zyx"
+SIGN_CONVENTION = "negative_inside"
+
+
+class DistanceFieldError(Exception):
+    """Raised when a distance field sidecar is missing or does not match its descriptor."""
+
+
+def node_domain(domain_definition):
+    """Domain definition whose cell centres are the nodes of `domain_definition`."""
+    origin, spacing, shape = grid_spacing(domain_definition)
+    shifted = {}
+    for axis, o, h, n in zip("xyz", origin, spacing, shape):
+        shifted[f"min_{axis}"] = o - 0.5 * h
+        shifted[f"max_{axis}"] = o + (n + 0.5) * h
+        shifted[f"n{axis}"] = n + 1
+    return shifted
+
+
+def _eikonal_update(a, h):
+    """
+    Godunov upwind solution of sum_i ((u - a_i) / h_i)^2 = 1 using the
+    smallest neighbour per axis, a (3, K) and h (3,) per axis.
+    """
+    w = [np.full(a.shape[1], 1.0 / (hi * hi)) for hi in h]
+    a = [a[0], a[1], a[2]]
+    # Three compare-swaps order the neighbours (and their weights) ascending
+    for lo, hi in ((0, 1), (1, 2), (0, 1)):
+        swap = a[lo] > a[hi]
+        a[lo], a[hi] = np.where(swap, a[hi], a[lo]), np.where(swap, a[lo], a[hi])
+        w[lo], w[hi] = np.where(swap, w[hi], w[lo]), np.where(swap, w[lo], w[hi])
+
+    with np.errstate(invalid="ignore", over="ignore"):
+        u = a[0] + 1.0 / np.sqrt(w[0])
+        sw, swa, swaa = w[0], w[0] * a[0], w[0] * a[0] * a[0]
+        for m in (1, 2):
+            sw, swa, swaa = sw + w[m], swa + w[m] * a[m], swaa + w[m] * a[m] * a[m]
+            disc = swa * swa - sw * (swaa - 1.0)
+            candidate = (swa + np.sqrt(np.maximum(disc, 0.0))) / sw
+            # Use one more axis only while the front reaches that neighbour
+            u = np.where(u > a[m], candidate, u)
+    return u
+
+
+def _level_nodes(level, shape):
+    """(k, j, i) of the nodes with k + j + i == level in a (Z, Y, X) grid."""
+    Z, Y, X = shape
+    k = np.arange(max(0, level - (Y - 1) - (X - 1)), min(Z - 1, level) + 1)
+    rest = level - k
+    j_lo = np.maximum(0, rest - (X - 1))
+    counts = np.minimum(Y - 1, rest) - j_lo + 1
+    owner = np.repeat(np.arange(len(k)), counts)
+    j = j_lo[owner] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    k = k[owner]
+    return k, j, level - k - j
+
+
+def _neighbour_min(flat_field, flat, coord, size, stride):
+    """Smaller of the two neighbours along one axis, inf past the grid edge."""
+    low = np.where(coord > 0, flat_field[np.maximum(flat - stride, 0)], np.inf)
+    high = np.where(coord < size - 1, flat_field[np.minimum(flat + stride, len(flat_field) - 1)], np.inf)
+    return np.minimum(low, high)
+
+
+def _sweep(field, frozen, spacing, max_sweeps=DEFAULT_MAX_SWEEPS):
+    """
+    Fill the non-frozen entries of `field` (zyx, inf where unknown) with the
+    eikonal distance from the frozen ones, by fast sweeping in the 8 octant
+    orderings. Nodes on one diagonal plane k + j + i = const of an ordering
+    only depend on the previous plane, so each plane is one vectorized update
+    and a sweep matches the sequential Gauss-Seidel one. Returns rounds used.
+    """
+    h = np.array(spacing, dtype=np.float64)  # zyx order, like the field
+    Z, Y, X = field.shape
+    strides = (Y * X, X, 1)
+    flat_field = np.asarray(field).reshape(-1)  # Plain view: memmap indexing is slow per call
+    flat_frozen = frozen.reshape(-1)
+    levels = Z + Y + X - 2
+    for round_ in range(1, max_sweeps + 1):
+        change = 0.0
+        for flips in itertools.product((False, True), repeat=3):
+            for level in range(levels + 1):
+                coords = [n - 1 - c if flip else c
+                          for c, n, flip in zip(_level_nodes(level, field.shape), field.shape, flips)]
+                flat = coords[0] * strides[0] + coords[1] * strides[1] + coords[2]
+                free = ~flat_frozen[flat]
+                if not free.any():
+                    continue
+                flat, coords = flat[free], [c[free] for c in coords]
+                stored = flat_field[flat]
+                neighbours = np.stack([
+                    _neighbour_min(flat_field, flat, coords[axis], field.shape[axis], strides[axis])
+                    for axis in range(3)
+                ])
+                # Compare in the stored precision so rounding cannot keep a node "moving"
+                candidate = _eikonal_update(neighbours, h).astype(np.float32)
+                moved = candidate < stored
+                if moved.any():
+                    change = max(change, float((stored[moved] - candidate[moved]).max()))
+                    flat_field[flat[moved]] = candidate[moved]
+        if change == 0.0:
+            return round_
+    return max_sweeps
+
+
+def write_distance_field(path, domain_definition, vertices, triangles, index=None, band_cells=DEFAULT_BAND_CELLS,
+                         slab_nodes=DEFAULT_SLAB_NODES, max_sweeps=DEFAULT_MAX_SWEEPS, debug=False):
+    """
+    Compute the signed distance field of the grid nodes into a float32 .npy
+    memmap at `path` and return its descriptor (without the path).
+
+    `index` may carry a prebuilt SurfaceIndex of the same surface.
+    """
+    if index is None:
+        from src.spatial_index import SurfaceIndex
+        index = SurfaceIndex(vertices, triangles)
+
+    nodes = node_domain(domain_definition)
+    origin, spacing, (nx, ny, nz) = grid_spacing(nodes)
+    origin = np.array(origin) + 0.5 * np.array(spacing)  # first node, not the shifted cell corner
+    band_width = band_cells * max(spacing)
+    plane_nodes = nx * ny
+    depth = max(1, min(nz, slab_nodes // plane_nodes))
+
+    field = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(nz, ny, nx))
+    try:
+        # Exact unsigned distances inside the band, inf elsewhere
+        ys, xs = np.meshgrid(origin[1] + spacing[1] * np.arange(ny), origin[0] + spacing[0] * np.arange(nx), indexing="ij")
+        band_nodes = 0
+        for k_start in range(0, nz, depth):
+            k_stop = min(nz, k_start + depth)
+            zs = origin[2] + spacing[2] * np.arange(k_start, k_stop)
+            points = np.stack([
+                np.broadcast_to(xs, (k_stop - k_start, ny, nx)),
+                np.broadcast_to(ys, (k_stop - k_start, ny, nx)),
+                np.broadcast_to(zs[:, None, None], (k_stop - k_start, ny, nx)),
+            ], axis=-1).reshape(-1, 3)
+            distance, _, _ = index.nearest(points, max_distance=band_width)
+            field[k_start:k_stop] = distance.reshape(k_stop - k_start, ny, nx)
+            band_nodes += int(np.isfinite(distance).sum())
+        if debug:
+            print(f"[DEBUG] Distance field: {band_nodes} of {nx * ny * nz} nodes in the exact band (width {band_width:.6g}).")
+
+        # Far field from the band
+        frozen = np.isfinite(field)
+        sweeps = _sweep(field, frozen, (spacing[2], spacing[1], spacing[0]), max_sweeps=max_sweeps) if band_nodes else 0
+        del frozen
+        if debug:
+            print(f"[DEBUG] Distance field: far field filled in {sweeps} sweep round(s).")
+
+        # Sign from node occupancy
+        crossings = column_crossings(vertices, triangles, nodes)
+        low, high = np.inf, -np.inf
+        for k_start, k_stop, inside in iter_mask_slabs(nodes, vertices, triangles, slab_cells=slab_nodes, crossings=crossings):
+            slab = field[k_start:k_stop]
+            signed = np.where(inside.astype(bool), -slab, slab)
+            field[k_start:k_stop] = signed
+            finite = signed[np.isfinite(signed)]
+            if finite.size:
+                low, high = min(low, float(finite.min())), max(high, float(finite.max()))
+        field.flush()
+    finally:
+        del field
+
+    descriptor = {
+        "format": "npy",
+        "shape": [nz, ny, nx],
+        "dtype": "float32",
+        "axis_order": AXIS_ORDER,
+        "location": "nodes",
+        "sign": SIGN_CONVENTION,
+        "band_width": band_width,
+        "band_nodes": band_nodes,
+        "sweeps": sweeps,
+        "sha256": file_checksum(path),
+    }
+    if low <= high:  # An empty surface leaves the whole field at +inf
+        descriptor["min"], descriptor["max"] = low, high
+    return descriptor
+
+
+def load_distance_field(descriptor, base_dir=".", mmap_mode="r", verify=False):
+    """Open the stored field of a distance field descriptor, memory-mapped by default."""
+    path = descriptor["path"]
+    path = path if os.path.isabs(path) else os.path.join(base_dir, path)
+    if not os.path.isfile(path):
+        raise DistanceFieldError(f"Missing distance field file: {path}")
+    if verify and file_checksum(path) != descriptor.get("sha256"):
+        raise DistanceFieldError(f"Checksum mismatch for distance field file: {path}")
+    array = np.load(path, mmap_mode=mmap_mode)
+    if list(array.shape) != descriptor["shape"] or array.dtype != np.float32:
+        raise DistanceFieldError(
+            f"Distance field file {path} has shape {array.shape}/{array.dtype}, expected {descriptor['shape']}/float32"
+        )
+    return array
@@ -5,9 +5,29 @@ Domain Definition Writer Module
 
 Validates spatial domain parameters for simulation pipelines,
 ensuring integrity between schema constraints and dynamic logic.
+
+`validate_domain_bounds` checks a single domain and raises on the first
+problem. `validate_domains_bulk` checks thousands of domains at once with
+NumPy column operations and returns a per-record error report instead.
 """
 
-from typing import Dict
+import argparse
+import json
+import os
+import sys
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+# numpy and jsonschema are imported where used: gmsh_runner imports this
+# module on every start-up, including --help and cache hits.
+
+AXES = ("x", "y", "z")
+
+# Missing or unparsable values in the bulk column arrays
+_OK, _MISSING, _NON_NUMERIC = 0, 1, 2
+
+# Schema messages kept per record in bulk reports
+MAX_SCHEMA_ERRORS_PER_RECORD = 5
 
 
 class DomainValidationError(Exception):
@@ -42,19 +62,158 @@ def validate_domain_bounds(domain: Dict) -> None:
             )
 
 
-# Optional usage example
-if __name__ == "__main__":
-    sample_domain = {
-        "min_x": 0.0, "max_x": 10.0,
-        "min_y": 0.0, "max_y": 5.0,
-        "min_z": "2.0", "max_z": 1.0  # <-- Valid string cast, but will still fail logically
+def compile_schema(schema: Dict):
+    """Checks a JSON schema once and returns a reusable validator instance."""
+    from jsonschema.validators import validator_for
+    cls = validator_for(schema)
+    cls.check_schema(schema)
+    return cls(schema)
+
+
+@lru_cache(maxsize=8)
+def _compiled_schema_file(path: str, mtime_ns: int):
+    with open(path, "r") as f:
+        return compile_schema(json.load(f))
+
+
+def load_schema_validator(schema_path: str):
+    """
+    Returns the compiled validator for a schema file, cached per path and
+    modification time so repeated validations skip parsing and compiling.
+    """
+    path = os.path.abspath(schema_path)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"Missing schema file: {schema_path}")
+    return _compiled_schema_file(path, os.stat(path).st_mtime_ns)
+
+
+def _column(definitions: List[Dict], key: str):
+    """Float column for `key` plus a status code per record."""
+    import numpy as np
+    values = np.full(len(definitions), np.nan)
+    status = np.zeros(len(definitions), dtype=np.int8)
+    for i, definition in enumerate(definitions):
+        value = definition.get(key) if isinstance(definition, dict) else None
+        if value is None:
+            status[i] = _MISSING
+            continue
+        try:
+            values[i] = float(value)
+        except (TypeError, ValueError):
+            status[i] = _NON_NUMERIC
+    return values, status
+
+
+def validate_domains_bulk(domains: Iterable[Dict], max_cells: Optional[int] = None,
+                          schema_validator=None) -> Dict:
+    """
+    Validates many domains in one pass and reports every problem per record.
+
+    Parameters:
+        domains: Full domain documents ({"domain_definition": {...}}) or bare
+            definitions with the min/max bounds and nx, ny, nz.
+        max_cells (int, optional): Upper limit for nx * ny * nz.
+        schema_validator (optional): Compiled JSON schema validator (see
+            load_schema_validator), applied to full documents.
+
+    Returns:
+        dict with "total", "valid", "invalid" and "errors", which maps record
+        indices to their list of messages; valid records are omitted.
+    """
+    import numpy as np
+
+    records = list(domains)
+    definitions = [
+        record.get("domain_definition", record) if isinstance(record, dict) else None
+        for record in records
+    ]
+    errors: Dict[int, List[str]] = {}
+
+    def report(mask, message):
+        for i in np.flatnonzero(mask):
+            errors.setdefault(int(i), []).append(message(int(i)))
+
+    for axis in AXES:
+        lo, lo_status = _column(definitions, f"min_{axis}")
+        hi, hi_status = _column(definitions, f"max_{axis}")
+        missing = (lo_status == _MISSING) | (hi_status == _MISSING)
+        non_numeric = ~missing & ((lo_status == _NON_NUMERIC) | (hi_status == _NON_NUMERIC))
+        numeric = ~missing & ~non_numeric
+        with np.errstate(invalid="ignore"):
+            non_finite = numeric & ~(np.isfinite(lo) & np.isfinite(hi))
+            inverted = numeric & ~non_finite & (hi < lo)
+        report(missing, lambda i, a=axis: f"Missing domain bounds for axis '{a}'")
+        report(non_numeric, lambda i, a=axis: f"Non-numeric bounds for axis '{a}'")
+        report(non_finite, lambda i, a=axis: f"Non-finite bounds for axis '{a}'")
+        report(inverted, lambda i, a=axis, lo=lo, hi=hi:
+               f"Invalid domain: max_{a} ({hi[i]}) < min_{a} ({lo[i]})")
+
+    counts = []
+    resolution_ok = np.ones(len(records), dtype=bool)
+    for axis in AXES:
+        n, n_status = _column(definitions, f"n{axis}")
+        with np.errstate(invalid="ignore"):
+            bad = (n_status != _OK) | ~(n >= 1) | (n != np.floor(n))
+        report(bad, lambda i, a=axis: f"Invalid resolution: n{a} must be a positive integer")
+        resolution_ok &= ~bad
+        counts.append(np.where(bad, 1.0, n))
+
+    if max_cells is not None:
+        cells = counts[0] * counts[1] * counts[2]  # float64: no overflow on huge grids
+        report(resolution_ok & (cells > max_cells),
+               lambda i: f"Cell count {int(cells[i])} exceeds limit {max_cells}")
+
+    if schema_validator is not None:
+        for i, record in enumerate(records):
+            messages = [
+                f"Schema: {'/'.join(str(p) for p in error.absolute_path) or '<root>'}: {error.message}"
+                for error in schema_validator.iter_errors(record)
+            ]
+            if messages:
+                errors.setdefault(i, []).extend(messages[:MAX_SCHEMA_ERRORS_PER_RECORD])
+
+    return {
+        "total": len(records),
+        "valid": len(records) - len(errors),
+        "invalid": len(errors),
+        "errors": dict(sorted(errors.items())),
     }
 
-    try:
-        validate_domain_bounds(sample_domain)
-        print("Domain bounds are valid ✅")
-    except DomainValidationError as e:
-        print(f"Validation failed ❌: {e}")
 
+def _iter_domain_files(paths: Iterable[str]):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(".json"):
+                    yield os.path.join(path, name)
+        else:
+            yield path
 
 
+# Audit entry point: validate many domain JSON files at once
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-validate domain definition JSON files")
+    parser.add_argument("paths", nargs="+", help="Domain JSON files or directories of them")
+    parser.add_argument("--schema", type=str, help="Also validate against this JSON schema")
+    parser.add_argument("--max-cells", type=int, help="Maximum allowed nx * ny * nz")
+    args = parser.parse_args()
+
+    files, records = [], []
+    for path in _iter_domain_files(args.paths):
+        try:
+            with open(path, "r") as f:
+                records.append(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"Validation failed ❌: {path}: unreadable ({e})")
+            records.append(None)
+        files.append(path)
+
+    result = validate_domains_bulk(
+        records, max_cells=args.max_cells,
+        schema_validator=load_schema_validator(args.schema) if args.schema else None
+    )
+    for index, messages in result["errors"].items():
+        for message in messages:
+            print(f"Validation failed ❌: {files[index]}: {message}")
+    print(f"Domains checked: {result['total']}, valid: {result['valid']}, invalid: {result['invalid']}")
+    sys.exit(1 if result["invalid"] else 0)
@@ -2,89 +2,177 @@
 
 import dropbox
 import os
-import requests
 import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.dropbox_sync import SyncState, select_downloads
+from src.transfer_control import (
+    AdaptiveLimiter, call_with_retry, dropbox_client, refresh_access_token, DEFAULT_INITIAL_CONCURRENCY
+)
 
 # Allowed extensions to download
 ALLOWED_EXTENSIONS = [".step", ".stp", ".json", ".zip"]
 
-# Function to refresh the access token
-def refresh_access_token(refresh_token, client_id, client_secret):
-    url = "https://api.dropbox.com/oauth2/token"
-    data = {
-        "grant_type": "refresh_token",
-        "refresh_token": refresh_token,
-        "client_id": client_id,
-        "client_secret": client_secret
-    }
-    response = requests.post(url, data=data)
-    if response.status_code == 200:
-        return response.json()["access_token"]
-    else:
-        raise Exception("❌ Failed to refresh access token")
+# Ceiling on concurrent downloads sharing one access token and connection pool;
+# the adaptive limiter starts lower and grows while throughput improves
+DEFAULT_MAX_WORKERS = 16
+
+# Response bodies are streamed to disk in chunks of this size
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Function to list the downloadable files of a folder, following pagination
+def list_downloadable_entries(dbx, dropbox_folder, log_file):
+    entries = []
+    has_more = True
+    cursor = None
+    while has_more:
+        result = (
+            call_with_retry(dbx.files_list_folder_continue, cursor)
+            if cursor else
+            call_with_retry(dbx.files_list_folder, dropbox_folder)
+        )
+        log_file.write(f"📁 Listing files in: {dropbox_folder}\n")
+
+        for entry in result.entries:
+            if isinstance(entry, dropbox.files.FileMetadata):
+                ext = os.path.splitext(entry.name)[1].lower()
+                if ext in ALLOWED_EXTENSIONS:
+                    entries.append(entry)
+                else:
+                    log_file.write(f"⏭️ Skipped file (unsupported type): {entry.name}\n")
+                    print(f"⏭️ Skipped: {entry.name}")
+
+        has_more = result.has_more
+        cursor = result.cursor
+    return entries
+
+# Function to stream one file to disk; the final name only appears once complete
+def download_entry(dbx, entry, local_folder, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    local_path = os.path.join(local_folder, entry.name)
+    fd, tmp_path = tempfile.mkstemp(dir=local_folder, prefix=f".{entry.name}.", suffix=".part")
+    try:
+        _, res = dbx.files_download(path=entry.path_lower)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in res.iter_content(chunk_size=chunk_size):
+                    if chunk:
+                        f.write(chunk)
+        finally:
+            res.close()
+        os.replace(tmp_path, local_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return local_path
+
+# Function to download entries concurrently; log writes stay on the calling thread.
+# Throttled and transient failures are retried; the limiter adapts how many run at once.
+def download_entries(dbx, entries, local_folder, log_file, max_workers=DEFAULT_MAX_WORKERS, limiter=None):
+    limiter = limiter or AdaptiveLimiter(max_workers, initial=min(max_workers, DEFAULT_INITIAL_CONCURRENCY))
+    downloaded, failed = [], []
+    with ThreadPoolExecutor(max_workers=max(1, limiter.maximum)) as pool:
+        futures = {
+            pool.submit(call_with_retry, download_entry, dbx, entry, local_folder, limiter=limiter,
+                        nbytes=getattr(entry, "size", 0)): entry
+            for entry in entries
+        }
+        for future in as_completed(futures):
+            entry = futures[future]
+            try:
+                local_path = future.result()
+            except Exception as e:
+                log_file.write(f"❌ Failed to download {entry.name}: {e}\n")
+                print(f"❌ Failed: {entry.name}: {e}")
+                failed.append(entry.name)
+                continue
+            log_file.write(f"✅ Downloaded {entry.name} → {local_path}\n")
+            print(f"✅ Downloaded: {entry.name}")
+            downloaded.append(entry.name)
+    stats = limiter.stats()
+    log_file.write(f"📈 Concurrency: ended at {stats['limit']}, peak {stats['peak']}, "
+                   f"{stats['throttled']} throttled, {stats['errors']} transient error(s)\n")
+    return downloaded, failed
 
 # Function to download filtered files and optionally delete them afterwards
-def download_files_from_dropbox(dropbox_folder, local_folder, refresh_token, client_id, client_secret, log_file_path):
+def download_files_from_dropbox(dropbox_folder, local_folder, refresh_token, client_id, client_secret, log_file_path,
+                                max_workers=DEFAULT_MAX_WORKERS, incremental=True, catalog=None):
+    # One token and one pooled session shared by every download thread; the client refreshes the token when it expires
     access_token = refresh_access_token(refresh_token, client_id, client_secret)
-    dbx = dropbox.Dropbox(access_token)
+    dbx = dropbox_client(access_token, refresh_token, client_id, client_secret, max_connections=max_workers)
+    downloaded, failed = [], []
 
     with open(log_file_path, "a") as log_file:
         log_file.write("🚀 Starting download process...\n")
         try:
             os.makedirs(local_folder, exist_ok=True)
 
-            has_more = True
-            cursor = None
-            while has_more:
-                result = (
-                    dbx.files_list_folder_continue(cursor)
-                    if cursor else
-                    dbx.files_list_folder(dropbox_folder)
-                )
-                log_file.write(f"📁 Listing files in: {dropbox_folder}\n")
-
-                for entry in result.entries:
-                    if isinstance(entry, dropbox.files.FileMetadata):
-                        ext = os.path.splitext(entry.name)[1].lower()
-                        if ext in ALLOWED_EXTENSIONS:
-                            local_path = os.path.join(local_folder, entry.name)
-                            with open(local_path, "wb") as f:
-                                _, res = dbx.files_download(path=entry.path_lower)
-                                f.write(res.content)
-                            log_file.write(f"✅ Downloaded {entry.name} → {local_path}\n")
-                            print(f"✅ Downloaded: {entry.name}")
-                        else:
-                            log_file.write(f"⏭️ Skipped file (unsupported type): {entry.name}\n")
-                            print(f"⏭️ Skipped: {entry.name}")
-
-                has_more = result.has_more
-                cursor = result.cursor
-
-            log_file.write("🎉 Download completed.\n")
+            entries = list_downloadable_entries(dbx, dropbox_folder, log_file)
+
+            # Skip files whose local copy already has the listed content hash
+            state = SyncState(local_folder)
+            if incremental:
+                entries, unchanged = select_downloads(entries, state)
+                for entry in unchanged:
+                    log_file.write(f"⏭️ Unchanged, not downloaded: {entry.name}\n")
+                    print(f"⏭️ Unchanged: {entry.name}")
+
+            downloaded, failed = download_entries(dbx, entries, local_folder, log_file, max_workers=max_workers)
+            by_name = {entry.name: entry for entry in entries}
+            for name in downloaded:
+                state.record(name, by_name[name].content_hash)
+            state.save()
+
+            # Note every file's outcome in the run catalog
+            if catalog is not None:
+                outcomes = [(name, "ok") for name in downloaded] + [(name, "failed") for name in failed]
+                for name, status in outcomes:
+                    entry = by_name[name]
+                    catalog.record_transfer("download", os.path.join(local_folder, name), entry.path_display,
+                                            status=status, content_hash=entry.content_hash)
+
+            if failed:
+                log_file.write(f"⚠️ Download completed with {len(failed)} failure(s).\n")
+            else:
+                log_file.write("🎉 Download completed.\n")
         except dropbox.exceptions.ApiError as err:
             log_file.write(f"❌ Dropbox API error: {err}\n")
             print(f"❌ Dropbox API error: {err}")
+            failed.append(dropbox_folder)
         except Exception as e:
             log_file.write(f"❌ Unexpected error: {e}\n")
             print(f"❌ Unexpected error: {e}")
+            failed.append(dropbox_folder)
+    return downloaded, failed
 
 # Entry point
 if __name__ == "__main__":
+    from src.run_catalog import RunCatalog, CatalogError, DEFAULT_CATALOG_PATH
+
     dropbox_folder    = sys.argv[1]
     local_folder      = sys.argv[2]
     refresh_token     = sys.argv[3]
     client_id         = sys.argv[4]
     client_secret     = sys.argv[5]
     log_file_path     = sys.argv[6]
+    max_workers       = int(sys.argv[7]) if len(sys.argv) > 7 else DEFAULT_MAX_WORKERS
 
-    download_files_from_dropbox(
+    # The catalog is bookkeeping only: a broken one must not stop the transfer
+    try:
+        catalog = RunCatalog(DEFAULT_CATALOG_PATH)
+    except CatalogError as e:
+        print(f"⚠️ Run catalog disabled: {e}")
+        catalog = None
+
+    downloaded, failed = download_files_from_dropbox(
         dropbox_folder,
         local_folder,
         refresh_token,
         client_id,
         client_secret,
-        log_file_path
+        log_file_path,
+        max_workers=max_workers,
+        catalog=catalog
     )
-
-
-
+    if failed:
+        sys.exit(1) # Files that still failed after retries fail the step instead of going missing
@@ -7,12 +7,13 @@ REFRESH_TOKEN="${REFRESH_TOKEN}"
 DROPBOX_FOLDER="/engineering_simulations_pipeline"  # Set Dropbox folder path
 LOCAL_FOLDER="./data/testing-input-output"  # Set local folder for downloaded files
 LOG_FILE="./dropbox_download_log.txt"
+MAX_WORKERS="${DROPBOX_MAX_WORKERS:-16}"  # Ceiling on concurrent downloads (adapted at run time)
 
 # Create the local folder if it doesn't exist
 mkdir -p "$LOCAL_FOLDER"
 
 # Run the Python script to call the Dropbox download function
-python3 src/download_dropbox_files.py "$DROPBOX_FOLDER" "$LOCAL_FOLDER" "$REFRESH_TOKEN" "$APP_KEY" "$APP_SECRET" "$LOG_FILE"
+python3 src/download_dropbox_files.py "$DROPBOX_FOLDER" "$LOCAL_FOLDER" "$REFRESH_TOKEN" "$APP_KEY" "$APP_SECRET" "$LOG_FILE" "$MAX_WORKERS"
 
 # Verify downloaded files
 if [ "$(ls -A $LOCAL_FOLDER)" ]; then
@@ -0,0 +1,155 @@
+# src/dropbox_sync.py
+
+"""
+Dropbox Sync Module
+
+Helpers that let the transfer scripts skip files that are already identical
+on both sides. Dropbox exposes a `content_hash` for every file in folder
+listings: the SHA-256 of the concatenated SHA-256 digests of each 4 MiB
+block. The same hash is computed locally and cached in a small state file
+(keyed by file name, invalidated by size and mtime) so unchanged local files
+are not re-read on every run.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import dropbox
+
+from src.transfer_control import call_with_retry
+
+# Block size fixed by the Dropbox content-hash specification
+DROPBOX_HASH_BLOCK_SIZE = 4 * 1024 * 1024
+
+# Hidden, so it is neither uploaded nor mistaken for pipeline input
+STATE_FILE_NAME = ".dropbox_sync_state.json"
+
+STATE_FORMAT_VERSION = 1
+
+
+def _hash_blocks(blocks):
+    overall = hashlib.sha256()
+    for block in blocks:
+        overall.update(hashlib.sha256(block).digest())
+    return overall.hexdigest()
+
+
+def dropbox_content_hash(path, block_size=DROPBOX_HASH_BLOCK_SIZE):
+    """Computes the Dropbox content hash of a local file."""
+    with open(path, "rb") as f:
+        return _hash_blocks(iter(lambda: f.read(block_size), b""))
+
+
+def dropbox_content_hash_bytes(data, block_size=DROPBOX_HASH_BLOCK_SIZE):
+    """Computes the Dropbox content hash of in-memory bytes."""
+    return _hash_blocks(data[start:start + block_size] for start in range(0, len(data), block_size))
+
+
+class SyncState:
+    """
+    Per-folder cache of local content hashes.
+
+    Entries are keyed by file name and store the size and mtime seen when the
+    hash was taken; a mismatch on either forces a recomputation.
+    """
+
+    def __init__(self, folder, file_name=STATE_FILE_NAME):
+        self.folder = folder
+        self.path = os.path.join(folder, file_name)
+        self.entries = {}
+        self.dirty = False
+        try:
+            with open(self.path, "r") as f:
+                payload = json.load(f)
+            if payload.get("version") == STATE_FORMAT_VERSION:
+                self.entries = payload.get("files", {})
+        except (OSError, ValueError):
+            pass  # Missing or corrupt state only costs a re-hash
+
+    def _stat(self, name):
+        try:
+            st = os.stat(os.path.join(self.folder, name))
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def content_hash(self, name):
+        """Returns the local file's content hash, or None if it does not exist."""
+        stat = self._stat(name)
+        if stat is None:
+            return None
+        entry = self.entries.get(name)
+        if entry and (entry["size"], entry["mtime_ns"]) == stat:
+            return entry["content_hash"]
+        content_hash = dropbox_content_hash(os.path.join(self.folder, name))
+        self.record(name, content_hash)
+        return content_hash
+
+    def record(self, name, content_hash):
+        """Stores a hash known to describe the file as it is now on disk."""
+        stat = self._stat(name)
+        if stat is None:
+            return
+        self.entries[name] = {"size": stat[0], "mtime_ns": stat[1], "content_hash": content_hash}
+        self.dirty = True
+
+    def matches(self, name, remote_hash):
+        return remote_hash is not None and self.content_hash(name) == remote_hash
+
+    def save(self):
+        """Writes the state atomically; a no-op when nothing changed."""
+        if not self.dirty:
+            return
+        os.makedirs(self.folder, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder, prefix=".sync-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"version": STATE_FORMAT_VERSION, "files": self.entries}, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.dirty = False
+
+
+def list_remote_hashes(dbx, dropbox_folder):
+    """Maps lower-cased file names in a Dropbox folder to their content hashes."""
+    hashes = {}
+    try:
+        result = call_with_retry(dbx.files_list_folder, dropbox_folder)
+    except dropbox.exceptions.ApiError as err:
+        if err.error.is_path() and err.error.get_path().is_not_found():
+            return hashes  # Nothing uploaded yet
+        raise
+    while True:
+        for entry in result.entries:
+            if isinstance(entry, dropbox.files.FileMetadata):
+                hashes[entry.name.lower()] = entry.content_hash
+        if not result.has_more:
+            return hashes
+        result = call_with_retry(dbx.files_list_folder_continue, result.cursor)
+
+
+def select_downloads(entries, state):
+    """Splits listing entries into (to_download, unchanged) against local files."""
+    to_download, unchanged = [], []
+    for entry in entries:
+        (unchanged if state.matches(entry.name, entry.content_hash) else to_download).append(entry)
+    return to_download, unchanged
+
+
+def select_uploads(uploads, remote_hashes, states):
+    """
+    Splits (local_path, dropbox_path) pairs into (to_upload, unchanged).
+    `states` maps local folders to SyncState objects and is filled on demand.
+    """
+    to_upload, unchanged = [], []
+    for local_path, dropbox_path in uploads:
+        folder, name = os.path.split(os.path.abspath(local_path))
+        state = states.setdefault(folder, SyncState(folder))
+        remote_hash = remote_hashes.get(dropbox_path.rsplit("/", 1)[-1].lower())
+        (unchanged if state.matches(name, remote_hash) else to_upload).append((local_path, dropbox_path))
+    return to_upload, unchanged
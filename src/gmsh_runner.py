@@ -1,35 +1,65 @@
 # src/gmsh_runner.py
 
 import argparse
+import contextlib
 import json
 import math
-import gmsh
 import os
-from jsonschema import validate, ValidationError
+import sys
+from src.result_cache import ResultCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, file_sha256
+from src.run_catalog import DEFAULT_CATALOG_PATH
+from src.step_prescan import prescan_bounding_box, compare_bounding_boxes, DEFAULT_TOLERANCE
+from src.run_metrics import RunMetrics, profiled
+from src.domain_definition_writer import load_schema_validator
+from src.resolution_planner import plan_resolution, add_budget_arguments, budget_from_args
+
+# Heavy dependencies (gmsh, jsonschema, numpy and the modules built on them)
+# are imported inside the functions that need them, so --help, argument
+# errors and cache hits never load the Gmsh shared library.
 
 # ✅ Schema path for audit-safe validation
 SCHEMA_PATH = "schemas/domain_schema.json"
 
+# Binary --mask-format choices and the mask_io encoding each one writes
+MASK_FORMAT_ENCODINGS = {"npy": "dense", "npy-packed": "packbits", "npz-blocks": "blocks"}
+
+# Bounding box sources: OCC through Gmsh, streaming STEP pre-scan, or both compared
+BBOX_MODES = ("occ", "fast", "crosscheck")
+
 def compute_resolution(min_val, max_val, lc):
     return max(1, math.floor((max_val - min_val) / lc))
 
 def round2(val):
     return float(f"{val:.2f}")
 
-def extract_domain_definition(step_path, lc=None, nx=None, ny=None, nz=None, debug=False):
-    if debug: print("[DEBUG] Initializing Gmsh...")
-    gmsh.initialize()
-    gmsh.open(step_path)
-    gmsh.model.occ.synchronize()
+ENTITY_NAMES = ("points", "curves", "surfaces", "volumes")
+
+def load_bounding_box(step_path, debug=False, metrics=None):
+    # Expects an initialized Gmsh session; any previously loaded model is cleared
+    # so long-lived sessions (batch workers) can be reused across files.
+    import gmsh
+    metrics = metrics or RunMetrics()
+    gmsh.clear()
+    with metrics.phase("open"):
+        gmsh.open(step_path)
+    with metrics.phase("synchronize"):
+        gmsh.model.occ.synchronize()
     if debug: print("[DEBUG] STEP file loaded and synchronized.")
+    metrics.set("entities", {name: len(gmsh.model.getEntities(dim)) for dim, name in enumerate(ENTITY_NAMES)})
 
-    min_x, min_y, min_z, max_x, max_y, max_z = gmsh.model.getBoundingBox(-1, -1)
+    with metrics.phase("bbox"):
+        min_x, min_y, min_z, max_x, max_y, max_z = gmsh.model.getBoundingBox(-1, -1)
     if debug:
         print(f"[DEBUG] Raw bounding box:")
         print(f"        min_x={min_x}, max_x={max_x}")
         print(f"        min_y={min_y}, max_y={max_y}")
         print(f"        min_z={min_z}, max_z={max_z}")
 
+    return min_x, min_y, min_z, max_x, max_y, max_z
+
+def build_domain(bbox, lc=None, nx=None, ny=None, nz=None, debug=False):
+    min_x, min_y, min_z, max_x, max_y, max_z = bbox
+
     if lc:
         nx = compute_resolution(min_x, max_x, lc)
         ny = compute_resolution(min_y, max_y, lc)
@@ -39,10 +69,7 @@ def extract_domain_definition(step_path, lc=None, nx=None, ny=None, nz=None, deb
     elif not (nx and ny and nz):
         raise ValueError("Either --lc or all of --nx, --ny, --nz must be provided.")
 
-    gmsh.finalize()
-    if debug: print("[DEBUG] Gmsh finalized.")
-
-    domain = {
+    return {
         "domain_definition": {
             "min_x": round2(min_x), "max_x": round2(max_x),
             "min_y": round2(min_y), "max_y": round2(max_y),
@@ -51,10 +78,287 @@ def extract_domain_definition(step_path, lc=None, nx=None, ny=None, nz=None, deb
         }
     }
 
+def resolve_domain(bbox, lc=None, nx=None, ny=None, nz=None, resolution_budget=None, debug=False):
+    # A resolution budget (plan_resolution keyword arguments) replaces lc/nx/ny/nz
+    if not resolution_budget:
+        return build_domain(bbox, lc=lc, nx=nx, ny=ny, nz=nz, debug=debug)
+    plan = plan_resolution(bbox, **resolution_budget)
+    if debug:
+        print(f"[DEBUG] Planned resolution nx={plan['nx']}, ny={plan['ny']}, nz={plan['nz']} "
+              f"(lc={plan['lc']:.6g}, {plan['memory_estimate']['bytes']} bytes)")
+    domain = build_domain(bbox, nx=plan["nx"], ny=plan["ny"], nz=plan["nz"], debug=debug)
+    domain["memory_estimate"] = plan["memory_estimate"]
+    return domain
+
+def sweep_levels(lc=None, nx=None, ny=None, nz=None):
+    """
+    One resolution dict per level from list-valued lc or nx/ny/nz. A list of
+    lc values wins over nx/ny/nz, as a single lc does; a single nx, ny or nz
+    value is reused for every level of the others.
+    """
+    lcs = list(lc or [])
+    if lcs:
+        return [{"lc": value, "nx": None, "ny": None, "nz": None} for value in lcs]
+    axes = [list(values or []) for values in (nx, ny, nz)]
+    count = max(1, *(len(values) for values in axes))
+    for name, values in zip(("nx", "ny", "nz"), axes):
+        if len(values) not in (0, 1, count):
+            raise ValueError(f"--{name} has {len(values)} values, expected 1 or {count} to match the other axes")
+    padded = [values * count if len(values) == 1 else values or [None] * count for values in axes]
+    return [{"lc": None, "nx": x, "ny": y, "nz": z} for x, y, z in zip(*padded)]
+
+def level_label(level):
+    """Short name of a resolution level, used in per-level output names."""
+    if level.get("lc"):
+        return f"lc{level['lc']:g}"
+    return f"{level['nx']}x{level['ny']}x{level['nz']}"
+
+def level_output_path(output_path, level):
+    """Per-level output: the level label is appended to the stem."""
+    root, ext = os.path.splitext(output_path)
+    return f"{root}_{level_label(level)}{ext or '.json'}"
+
+def extract_domain_definition(step_path, lc=None, nx=None, ny=None, nz=None, debug=False, cache=None,
+                              bbox_mode="occ", bbox_tolerance=DEFAULT_TOLERANCE, mask=False,
+                              mask_path=None, mask_encoding="dense", metrics=None, resolution_budget=None,
+                              sdf=False, sdf_path=None, sdf_band_cells=None, tags=False, tags_path=None,
+                              assembly=False, workers=1):
+    level = {"lc": lc, "nx": nx, "ny": ny, "nz": nz, "mask_path": mask_path, "sdf_path": sdf_path,
+             "tags_path": tags_path}
+    return extract_domain_sweep(step_path, [level], debug=debug, cache=cache, bbox_mode=bbox_mode,
+                                bbox_tolerance=bbox_tolerance, mask=mask, mask_encoding=mask_encoding,
+                                metrics=metrics, resolution_budget=resolution_budget, sdf=sdf,
+                                sdf_band_cells=sdf_band_cells, tags=tags, assembly=assembly, workers=workers)[0]
+
+def domain_cache_key(cache, step_path, level, bbox_mode="occ", mask=False, mask_encoding="dense",
+                     resolution_budget=None, sdf=False, sdf_band_cells=None, tags=False, assembly=False):
+    """
+    Result cache key of one resolution level of `step_path` and the options
+    its output depends on. Single runs, sweeps and batch workers all key
+    their entries here so they share them.
+    """
+    # Crosscheck and OCC share results; crosscheck always re-runs to report
+    mask_path, sdf_path, tags_path = level.get("mask_path"), level.get("sdf_path"), level.get("tags_path")
+    return cache.make_key(step_path, lc=level.get("lc"), nx=level.get("nx"), ny=level.get("ny"), nz=level.get("nz"),
+                          bbox_mode="fast" if bbox_mode == "fast" else "occ", mask=mask,
+                          mask_path=mask_path and os.path.abspath(mask_path), mask_encoding=mask_encoding,
+                          **({"resolution_budget": resolution_budget} if resolution_budget else {}),
+                          **({"sdf_path": os.path.abspath(sdf_path), "sdf_band_cells": sdf_band_cells} if sdf else {}),
+                          **({"tags_path": os.path.abspath(tags_path)} if tags else {}),
+                          **({"assembly": True} if assembly else {}))
+
+def _cached_level(cache, step_path, level, bbox_mode, mask, mask_encoding, resolution_budget, sdf, sdf_band_cells,
+                  tags, assembly, debug):
+    mask_path, sdf_path, tags_path = level.get("mask_path"), level.get("sdf_path"), level.get("tags_path")
+    cache_key = domain_cache_key(cache, step_path, level, bbox_mode=bbox_mode, mask=mask, mask_encoding=mask_encoding,
+                                 resolution_budget=resolution_budget, sdf=sdf, sdf_band_cells=sdf_band_cells,
+                                 tags=tags, assembly=assembly)
+    cached = cache.get(cache_key) if bbox_mode != "crosscheck" else None
+    sidecars = [(cached, "geometry_mask", mask_path), (cached, "signed_distance", sdf_path),
+                (cached, "boundary_tags", tags_path)]
+    if cached is not None:
+        # Part masks sit beside the combined one
+        sidecars += [(part, "geometry_mask", mask_path) for part in cached.get("parts", [])]
+    for entry, key, path in sidecars:
+        if cached is not None and key in entry:
+            from src.mask_io import verify_mask_file
+            if not verify_mask_file(entry[key], base_dir=os.path.dirname(path)):
+                if debug: print(f"[DEBUG] Cached {key} sidecar missing or changed, recomputing.")
+                cached = None
+    if debug: print(f"[DEBUG] Cache {'hit' if cached is not None else 'miss'} ({cache_key[:12]}).")
+    return cache_key, cached
+
+def extract_domain_sweep(step_path, levels, debug=False, cache=None, bbox_mode="occ", bbox_tolerance=DEFAULT_TOLERANCE,
+                         mask=False, mask_encoding="dense", metrics=None, resolution_budget=None, sdf=False,
+                         sdf_band_cells=None, tags=False, assembly=False, workers=1):
+    """
+    Domain outputs for several resolutions of one STEP file, loading it once.
+
+    `levels` holds one dict per resolution with lc/nx/ny/nz and the
+    mask_path/sdf_path/tags_path of its sidecars. The bounding box, the
+    tessellation, the surface groups and the surface index are computed once
+    and shared by all levels. Levels found in the cache are returned as stored; when
+    every level is cached Gmsh is not started at all.
+
+    With `assembly`, every output also lists the volumes of the model as
+    indexed parts with their own sub-domain at the level's resolution (and
+    mask, with `mask`); part masks are computed on `workers` processes. A
+    resolution budget is split evenly between the parts (see part_budget).
+    """
+    if bbox_mode not in BBOX_MODES:
+        raise ValueError(f"Unknown bbox mode '{bbox_mode}', expected one of {BBOX_MODES}")
+    if sdf and not all(level.get("sdf_path") for level in levels):
+        raise ValueError("A signed distance field needs sdf_path for its .npy sidecar.")
+    if tags and not all(level.get("tags_path") for level in levels):
+        raise ValueError("Boundary tags need tags_path for their .npz sidecar.")
+
+    metrics = metrics or RunMetrics()
+    metrics.set("step_bytes", os.path.getsize(step_path))
+    metrics.set("cache", "disabled")
+    if len(levels) > 1:
+        metrics.set("levels", len(levels))
+    domains = [None] * len(levels)
+    cache_keys = [None] * len(levels)
+    if cache is not None:
+        for i, level in enumerate(levels):
+            cache_keys[i], domains[i] = _cached_level(cache, step_path, level, bbox_mode, mask, mask_encoding,
+                                                      resolution_budget, sdf, sdf_band_cells, tags, assembly, debug)
+        hits = sum(domain is not None for domain in domains)
+        metrics.set("cache", "hit" if hits == len(levels) else "miss" if hits == 0 else "partial")
+        if hits == len(levels):
+            if debug: print("[DEBUG] Cache hit, skipping Gmsh.")
+            return domains
+
+    if bbox_mode == "fast":
+        with metrics.phase("prescan"):
+            report = prescan_bounding_box(step_path)
+        if debug:
+            print(f"[DEBUG] Pre-scan bounding box ({report['points']} points, "
+                  f"{report['padded_curves']} padded curves, scale={report['scale']}): {report['bbox']}")
+        if report["mixed_units"]:
+            # One scale cannot be right for every point, so the fast box may be far too small
+            print("[WARN] STEP file declares several length units; using the OCC bounding box instead of the pre-scan.")
+            bbox_mode = "occ"
+
+    surface = groups = parts = None
+    if bbox_mode != "fast" or mask or sdf or tags or assembly:
+        import gmsh
+        # Long-lived callers (service workers) keep their own session open
+        owns_session = not gmsh.isInitialized()
+        if owns_session:
+            if debug: print("[DEBUG] Initializing Gmsh...")
+            with metrics.phase("initialize"):
+                gmsh.initialize()
+        occ_bbox = load_bounding_box(step_path, debug=debug, metrics=metrics)
+
+        if bbox_mode == "crosscheck":
+            with metrics.phase("prescan"):
+                fast_bbox = prescan_bounding_box(step_path)["bbox"]
+            discrepancies = compare_bounding_boxes(fast_bbox, occ_bbox, tolerance=bbox_tolerance)
+            for name, fast, occ, delta in discrepancies:
+                print(f"[WARN] Pre-scan bbox mismatch on {name}: fast={fast} occ={occ} (delta={delta:+.6g}, tolerance={bbox_tolerance})")
+            if not discrepancies:
+                print(f"[INFO] Pre-scan bbox agrees with OCC within {bbox_tolerance}.")
+
+        if mask or sdf or tags:
+            from src.surface_tessellation import tessellate_surfaces
+            with metrics.phase("tessellate"):
+                surface = tessellate_surfaces(debug=debug)
+            metrics.set("triangles", int(len(surface[1])))
+        if tags:
+            from src.surface_tessellation import surface_groups
+            groups = surface_groups(debug=debug)
+        if assembly:
+            from src.assembly import list_parts
+            with metrics.phase("parts"):
+                parts = list_parts(debug=debug)
+            metrics.set("parts", len(parts))
+
+        if owns_session:
+            with metrics.phase("finalize"):
+                gmsh.finalize()
+            if debug: print("[DEBUG] Gmsh finalized.")
+
+    bbox = report["bbox"] if bbox_mode == "fast" else occ_bbox
+    index = None
+    for i, level in enumerate(levels):
+        if domains[i] is not None:
+            continue
+        with metrics.phase("resolution"):
+            domain = resolve_domain(bbox, lc=level["lc"], nx=level["nx"], ny=level["ny"], nz=level["nz"],
+                                    resolution_budget=resolution_budget, debug=debug)
+
+        if debug:
+            print("[DEBUG] Final rounded domain definition:")
+            print(json.dumps(domain, indent=2))
+
+        if mask:
+            with metrics.phase("mask"):
+                attach_geometry_mask(domain, surface[0], surface[1], mask_path=level.get("mask_path"),
+                                     mask_encoding=mask_encoding, debug=debug)
+
+        if assembly:
+            # Same resolution rule per part; the bounds are the part's own. A budget is
+            # shared out between the parts so that together they stay within it.
+            from src.assembly import part_budget
+            budget = part_budget(resolution_budget, len(parts))
+            domain["parts"] = [
+                {"index": part["index"], "tag": part["tag"], "name": part["name"],
+                 **resolve_domain(part["bbox"], lc=level["lc"], nx=level["nx"], ny=level["ny"], nz=level["nz"],
+                                  resolution_budget=budget)}
+                for part in parts
+            ]
+            if mask:
+                from src.assembly import attach_part_masks
+                with metrics.phase("part_masks"):
+                    domain["parts"] = attach_part_masks(domain["parts"], [part["surfaces"] for part in parts],
+                                                        *surface, mask_path=level.get("mask_path"),
+                                                        mask_encoding=mask_encoding, workers=workers, debug=debug)
+
+        if (sdf or tags) and index is None:
+            # The index only depends on the surface, so every level and stage shares it
+            from src.spatial_index import SurfaceIndex
+            with metrics.phase("index"):
+                index = SurfaceIndex(*surface)
+
+        if sdf:
+            with metrics.phase("sdf"):
+                attach_distance_field(domain, *surface, sdf_path=level["sdf_path"], band_cells=sdf_band_cells,
+                                      index=index, debug=debug)
+
+        if tags:
+            with metrics.phase("tags"):
+                attach_boundary_tags(domain, *surface, groups=groups, tags_path=level["tags_path"], index=index,
+                                     debug=debug)
+
+        if cache is not None:
+            with metrics.phase("cache_store"):
+                cache.put(cache_keys[i], domain)
+        domains[i] = domain
+
+    return domains
+
+def attach_geometry_mask(domain, vertices, triangles, mask_path=None, mask_encoding="dense", debug=False):
+    from src.occupancy_mask import compute_occupancy_mask, iter_mask_slabs
+    from src.mask_io import write_mask_slabs
+
+    definition = domain["domain_definition"]
+    shape = [definition["nx"], definition["ny"], definition["nz"]]
+    if mask_path:
+        # Binary sidecar: slabs stream into a memmapped .npy beside the JSON
+        descriptor = write_mask_slabs(
+            mask_path, shape, iter_mask_slabs(definition, vertices, triangles), encoding=mask_encoding
+        )
+        domain["geometry_mask"] = {"path": os.path.basename(mask_path), **descriptor}
+        solid = descriptor["solid_cells"]
+    else:
+        occupancy = compute_occupancy_mask(definition, vertices, triangles)
+        domain["geometry_mask_flat"] = occupancy.tolist()
+        domain["geometry_mask_shape"] = shape
+        solid = int(occupancy.sum())
     if debug:
-        print("[DEBUG] Final rounded domain definition:")
-        print(json.dumps(domain, indent=2))
+        print(f"[DEBUG] Geometry mask: {solid} solid of {shape[0] * shape[1] * shape[2]} cells.")
+    return domain
 
+def attach_distance_field(domain, vertices, triangles, entities=None, sdf_path=None, band_cells=None, index=None,
+                          debug=False):
+    from src.spatial_index import SurfaceIndex
+    from src.distance_field import write_distance_field, DEFAULT_BAND_CELLS
+
+    # One index serves the whole field; it only depends on the surface
+    if index is None:
+        index = SurfaceIndex(vertices, triangles, entities)
+    descriptor = write_distance_field(sdf_path, domain["domain_definition"], vertices, triangles, index=index,
+                                      band_cells=band_cells or DEFAULT_BAND_CELLS, debug=debug)
+    domain["signed_distance"] = {"path": os.path.basename(sdf_path), **descriptor}
+    return domain
+
+def attach_boundary_tags(domain, vertices, triangles, entities, groups=(), tags_path=None, index=None, debug=False):
+    from src.boundary_tags import write_boundary_tags
+
+    descriptor = write_boundary_tags(tags_path, domain["domain_definition"], vertices, triangles, entities,
+                                     groups, index=index, debug=debug)
+    domain["boundary_tags"] = {"path": os.path.basename(tags_path), **descriptor}
     return domain
 
 def load_schema(schema_path):
@@ -63,54 +367,236 @@ def load_schema(schema_path):
     with open(schema_path, "r") as f:
         return json.load(f)
 
+def record_runs(catalog, step, levels, results, status, metrics, error=None):
+    """Record one catalog run per written level, or a single failed run."""
+    try:
+        if status != "ok":
+            catalog.record_run(step, "failed", lc=levels[0].get("lc"), metrics=metrics, error=error)
+            return
+        for level, (domain_json, output) in zip(levels, results):
+            catalog.record_run(step, "ok", domain=domain_json, output_path=output, lc=level.get("lc"), metrics=metrics)
+    except Exception as e:  # Never fail a finished extraction over bookkeeping
+        print(f"[WARN] Run catalog not updated: {e}")
+
+
 def main():
     parser = argparse.ArgumentParser(description="Extract domain definition from STEP file using Gmsh")
-    parser.add_argument("--step", type=str, required=True, help="Path to STEP file")
-    parser.add_argument("--lc", type=float, help="Grid resolution (model units)")
-    parser.add_argument("--nx", type=int, help="Grid resolution in x-direction")
-    parser.add_argument("--ny", type=int, help="Grid resolution in y-direction")
-    parser.add_argument("--nz", type=int, help="Grid resolution in z-direction")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--step", type=str, help="Path to STEP file, or a zip member as archive.zip!/path/part.step")
+    source.add_argument("--batch", type=str, help="Directory of STEP files and zip archives, a zip archive, or manifest listing one path per line")
+    parser.add_argument("--lc", type=float, nargs="+", help="Grid resolution (model units); several values run a sweep that loads the model once")
+    parser.add_argument("--nx", type=int, nargs="+", help="Grid resolution in x-direction (one value, or one per sweep level)")
+    parser.add_argument("--ny", type=int, nargs="+", help="Grid resolution in y-direction (one value, or one per sweep level)")
+    parser.add_argument("--nz", type=int, nargs="+", help="Grid resolution in z-direction (one value, or one per sweep level)")
+    add_budget_arguments(parser)
     parser.add_argument("--schema", type=str, default=SCHEMA_PATH, help="Path to JSON schema")
     parser.add_argument("--output", type=str, help="Path to write domain JSON")
+    parser.add_argument("--output-dir", type=str, help="Directory for per-file domain JSONs in batch mode")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes in batch mode, or for the per-part stages with --assembly")
+    parser.add_argument("--bbox", type=str, choices=BBOX_MODES, default="occ", help="Bounding box source: Gmsh/OCC, streaming STEP pre-scan, or both compared")
+    parser.add_argument("--bbox-tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed pre-scan vs OCC bound difference in crosscheck mode (model units)")
+    parser.add_argument("--mask", action="store_true", help="Add a solid/fluid occupancy mask of the grid cells")
+    parser.add_argument("--mask-format", type=str, choices=["json", "npy", "npy-packed", "npz-blocks"], default="json",
+                        help="Inline JSON list, a memory-mappable .npy sidecar (uint8 or bit-packed), or a block-sparse .npz "
+                             "sidecar for large, mostly uniform domains, referenced from the JSON")
+    parser.add_argument("--sdf", action="store_true", help="Write the signed distance to the surface at every grid node as a float32 .npy sidecar (needs --output)")
+    parser.add_argument("--sdf-band-cells", type=int, help="Half-width, in grid spacings, of the exactly computed band around the surface")
+    parser.add_argument("--tags", action="store_true", help="Label wall-adjacent cells with their nearest physical group / named face in a sparse .npz sidecar (needs --output)")
+    parser.add_argument("--assembly", action="store_true", help="Also list every volume of the model as an indexed part with its own bounding box and sub-domain (and mask with --mask); --max-cells/--max-memory-mb are split evenly between the parts")
+    parser.add_argument("--cache-dir", type=str, default=DEFAULT_CACHE_DIR, help="Directory of the domain result cache")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024), help="Result cache size bound in MiB (LRU eviction)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the result cache and always run Gmsh")
+    parser.add_argument("--purge-cache", action="store_true", help="Delete all result cache entries before running")
+    parser.add_argument("--catalog", type=str, default=DEFAULT_CATALOG_PATH, help="Run catalog database recording every run and its outputs")
+    parser.add_argument("--no-catalog", action="store_true", help="Do not record this run in the run catalog")
+    parser.add_argument("--service-socket", type=str, default=os.environ.get("GMSH_SERVICE_SOCKET"),
+                        help="Use a running gmsh_service on this Unix socket, falling back to in-process extraction")
+    parser.add_argument("--service-timeout", type=float, help="Per-job timeout requested from the service (seconds)")
+    parser.add_argument("--metrics", type=str, help="Append per-phase timing/resource metrics as JSON lines to this file ('-' for stdout)")
+    parser.add_argument("--profile", type=str, help="Write a cProfile dump (pstats) of the run to this file")
     parser.add_argument("--debug", action="store_true", help="Print debug information")
 
     args = parser.parse_args()
 
-    print(f"[INFO] Extracting domain from: {args.step}")
-    print(f"[INFO] Resolution: lc={args.lc}, nx={args.nx}, ny={args.ny}, nz={args.nz}")
-    print(f"[INFO] Schema path: {args.schema}")
+    cache = ResultCache(args.cache_dir, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+    if args.purge_cache:
+        removed = cache.purge()
+        print(f"[INFO] Purged {removed} result cache entr{'y' if removed == 1 else 'ies'} from: {args.cache_dir}")
+        if not (args.step or args.batch):
+            return
+    elif not (args.step or args.batch):
+        parser.error("one of the arguments --step --batch is required")
+    if args.no_cache:
+        cache = None
+    catalog = None
+    if not args.no_catalog:
+        from src.run_catalog import RunCatalog, CatalogError
+        try:
+            catalog = RunCatalog(args.catalog)
+        except CatalogError as e:
+            print(f"[WARN] Run catalog disabled: {e}")
 
     try:
-        domain_json = extract_domain_definition(
-            step_path=args.step,
+        levels = sweep_levels(args.lc, args.nx, args.ny, args.nz)
+    except ValueError as e:
+        parser.error(str(e))
+    sweep = len(levels) > 1
+    if not sweep:  # Single resolution: plain scalars from here on
+        args.lc, args.nx, args.ny, args.nz = (values[0] if values else None for values in (args.lc, args.nx, args.ny, args.nz))
+
+    resolution_budget = budget_from_args(parser, args)
+
+    if args.batch:
+        if not args.output_dir:
+            parser.error("--output-dir is required with --batch")
+        if sweep:
+            parser.error("--batch takes a single resolution; run one batch per sweep level")
+        if args.assembly:
+            parser.error("--assembly takes a single --step; its parts already run on --workers processes")
+        from src.batch_runner import run_batch
+        summary = run_batch(
+            source=args.batch,
+            output_dir=args.output_dir,
             lc=args.lc,
             nx=args.nx,
             ny=args.ny,
             nz=args.nz,
-            debug=args.debug
+            schema_path=args.schema,
+            workers=args.workers,
+            debug=args.debug,
+            cache=cache,
+            metrics_path=args.metrics,
+            resolution_budget=resolution_budget,
+            catalog=catalog
         )
+        if summary["failed"]:
+            raise SystemExit(1)
+        return
 
-        schema = load_schema(args.schema)
-        validate(instance=domain_json, schema=schema)
-        print("[INFO] JSON schema validation passed.")
+    if args.mask and args.mask_format != "json" and not args.output:
+        parser.error("--output is required for binary --mask-format")
+    if args.sdf and not args.output:
+        parser.error("--output is required with --sdf")
+    if args.tags and not args.output:
+        parser.error("--output is required with --tags")
 
-        if args.output:
-            with open(args.output, "w") as f:
-                json.dump(domain_json, f, indent=2)
-            print(f"[INFO] Domain JSON written to: {args.output}")
+    def sidecar_paths(output):
+        mask_path = sdf_path = tags_path = None
+        if args.mask and args.mask_format != "json":
+            from src.mask_io import sidecar_path_for
+            mask_path = sidecar_path_for(output, suffix="_mask.npz" if args.mask_format == "npz-blocks" else "_mask.npy")
+        if args.sdf:
+            from src.mask_io import sidecar_path_for
+            sdf_path = sidecar_path_for(output, suffix="_sdf.npy")
+        if args.tags:
+            from src.mask_io import sidecar_path_for
+            tags_path = sidecar_path_for(output, suffix="_tags.npz")
+        return mask_path, sdf_path, tags_path
+
+    # A sweep writes one output (and set of sidecars) per level
+    outputs = [level_output_path(args.output, level) if sweep and args.output else args.output for level in levels]
+
+    print(f"[INFO] Extracting domain from: {args.step}")
+    if resolution_budget:
+        print(f"[INFO] Resolution budget: max_cells={args.max_cells}, max_memory_mb={args.max_memory_mb}, "
+              f"fields={args.fields}, mode={args.budget_mode}")
+    elif sweep:
+        print(f"[INFO] Resolution sweep: {', '.join(level_label(level) for level in levels)}")
+    else:
+        print(f"[INFO] Resolution: lc={args.lc}, nx={args.nx}, ny={args.ny}, nz={args.nz}")
+    print(f"[INFO] Schema path: {args.schema}")
+
+    metrics = RunMetrics(step=args.step, lc=args.lc, nx=args.nx, ny=args.ny, nz=args.nz,
+                         bbox_mode=args.bbox, mask=args.mask, sdf=args.sdf, tags=args.tags)
+    status = "failed"
+    error = None
+    results = []
+    try:
+        with profiled(args.profile), contextlib.ExitStack() as stack:
+            step_path = args.step
+            from src.zip_ingest import split_member_ref, open_step_source
+            if split_member_ref(step_path)[1] is not None:
+                with metrics.phase("spool"):
+                    step_path = stack.enter_context(open_step_source(args.step))
+            if catalog is not None:
+                # Memoized, so a cache lookup of the same file does not hash it again
+                metrics.set("step_sha256", file_sha256(step_path))
+            shared = dict(
+                bbox_mode=args.bbox,
+                bbox_tolerance=args.bbox_tolerance,
+                mask=args.mask,
+                mask_encoding=MASK_FORMAT_ENCODINGS.get(args.mask_format, "dense"),
+                resolution_budget=resolution_budget,
+                sdf=args.sdf,
+                sdf_band_cells=args.sdf_band_cells,
+                tags=args.tags
+            )
+            if sweep or args.assembly:
+                # In-process only: the point is to open and tessellate the model once, and
+                # per-part stages need a process pool that service workers cannot start
+                if args.service_socket:
+                    print(f"[INFO] {'Resolution sweep' if sweep else 'Assembly mode'} runs in-process so the model is loaded once.")
+                for level, output in zip(levels, outputs):
+                    level["mask_path"], level["sdf_path"], level["tags_path"] = sidecar_paths(output) if output else (None,) * 3
+                domains = extract_domain_sweep(step_path, levels, debug=args.debug, cache=cache, metrics=metrics,
+                                               assembly=args.assembly, workers=args.workers, **shared)
+                results = list(zip(domains, outputs))
+            else:
+                mask_path, sdf_path, tags_path = sidecar_paths(args.output) if args.output else (None,) * 3
+                options = dict(lc=args.lc, nx=args.nx, ny=args.ny, nz=args.nz, mask_path=mask_path, sdf_path=sdf_path,
+                               tags_path=tags_path, **shared)
+                domain_json = None
+                if args.service_socket:
+                    from src.gmsh_service import extract_via_service, ServiceUnavailable
+                    try:
+                        with metrics.phase("service"):
+                            domain_json = extract_via_service(args.service_socket, step_path, timeout=args.service_timeout, **options)
+                        print(f"[INFO] Extracted by Gmsh service on: {args.service_socket}")
+                    except ServiceUnavailable:
+                        print(f"[INFO] No Gmsh service on {args.service_socket}, extracting in-process.")
+                if domain_json is None:
+                    domain_json = extract_domain_definition(step_path=step_path, debug=args.debug, cache=cache,
+                                                            metrics=metrics, **options)
+                results = [(domain_json, args.output)]
+
+            validator = load_schema_validator(args.schema)
+            for domain_json, output in results:
+                with metrics.phase("validate"):
+                    validator.validate(domain_json)
+                print("[INFO] JSON schema validation passed.")
+                if "parts" in domain_json:
+                    print(f"[INFO] Assembly parts: {len(domain_json['parts'])}")
+
+                if output:
+                    with metrics.phase("write"):
+                        with open(output, "w") as f:
+                            json.dump(domain_json, f, indent=2)
+                    print(f"[INFO] Domain JSON written to: {output}")
+        status = "ok"
 
-    except ValidationError as e:
-        print(f"[ERROR] Schema validation failed: {e.message}")
-        raise
     except Exception as e:
-        print(f"[ERROR] Unexpected failure: {e}")
+        error = f"{type(e).__name__}: {e}"
+        from jsonschema import ValidationError
+        if isinstance(e, ValidationError):
+            print(f"[ERROR] Schema validation failed: {e.message}")
+        else:
+            print(f"[ERROR] Unexpected failure: {e}")
         raise
     finally:
-        if gmsh.isInitialized():
+        gmsh = sys.modules.get("gmsh")  # Only finalize a session this run could have opened
+        if gmsh is not None and gmsh.isInitialized():
             try:
                 gmsh.finalize()
             except Exception as e:
                 print(f"[WARN] Gmsh finalization error: {e}")
+        if args.metrics:
+            metrics.set("status", status)
+            metrics.emit(args.metrics)
+        if catalog is not None:
+            record_runs(catalog, args.step, levels if sweep else [{"lc": args.lc}], results, status, metrics.as_record(),
+                        error=error)
+        if args.profile:
+            print(f"[INFO] Profile written to: {args.profile}")
 
 if __name__ == "__main__":
     main()
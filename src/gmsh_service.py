@@ -0,0 +1,399 @@
+# src/gmsh_service.py
+
+"""
+Gmsh Service Module
+
+A resident daemon that keeps warm Gmsh worker processes and serves domain
+extraction jobs over a Unix socket, so interactive callers skip the import
+and initialize cost of a cold `gmsh_runner.py` run.
+
+Protocol: one JSON object per line in each direction. Requests carry an
+"op" ("extract" or "ping"); extract requests hold the keyword arguments of
+`extract_domain_definition` under "args" and an optional "timeout" in
+seconds. Responses have "status" "ok" (with "domain" or "stats") or "error"
+(with "kind" one of busy/timeout/crash/failed/bad_request and "error").
+
+Jobs wait in a bounded queue; each worker slot feeds one child process at a
+time, kills it when a job overruns its timeout, and replaces it after a
+crash or after a fixed number of jobs to cap leaked memory.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import socketserver
+import threading
+import time
+
+DEFAULT_SOCKET_PATH = os.environ.get("GMSH_SERVICE_SOCKET", "/tmp/gmsh_service.sock")
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_JOBS_PER_WORKER = 200
+DEFAULT_QUEUE_SIZE = 64
+DEFAULT_JOB_TIMEOUT = 300.0
+CONNECT_TIMEOUT = 1.0
+
+# Request arguments forwarded to extract_domain_definition
+EXTRACT_ARGS = ("step_path", "lc", "nx", "ny", "nz", "bbox_mode", "bbox_tolerance",
+                "mask", "mask_path", "mask_encoding", "resolution_budget", "sdf", "sdf_path", "sdf_band_cells",
+                "tags", "tags_path")
+
+_STOP = object()
+
+
+class GmshServiceError(Exception):
+    """Raised by the client when the service rejects or fails a job."""
+
+
+class ServiceUnavailable(GmshServiceError):
+    """Raised by the client when no service is listening on the socket."""
+
+
+# --- Worker process -----------------------------------------------------------
+
+# Per-process state of the default job handler
+_worker_cache = None
+
+
+def init_gmsh_worker(cache_dir=None, cache_max_bytes=None, debug=False):
+    """Default initializer: one Gmsh session per worker process, kept for its lifetime."""
+    global _worker_cache
+    import gmsh
+    from src.result_cache import ResultCache
+    gmsh.initialize()
+    if cache_dir:
+        _worker_cache = ResultCache(cache_dir, max_bytes=cache_max_bytes)
+    if debug: print(f"[DEBUG] Service worker {os.getpid()} initialized Gmsh.")
+
+
+def extract_job(args):
+    """Default job handler: runs the extraction inside the warm Gmsh session."""
+    from src.gmsh_runner import extract_domain_definition
+    return extract_domain_definition(cache=_worker_cache, **args)
+
+
+def _worker_main(conn, initializer, initargs, handler):
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        try:
+            conn.send(("ok", handler(job)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+    conn.close()
+
+
+class _Job:
+    def __init__(self, args, timeout):
+        self.args = args
+        self.timeout = timeout
+        self.response = None
+        self.done = threading.Event()
+
+    def finish(self, response):
+        self.response = response
+        self.done.set()
+
+
+class _WorkerSlot(threading.Thread):
+    """Feeds queued jobs to one child process, replacing it when needed."""
+
+    def __init__(self, service, index):
+        super().__init__(name=f"gmsh-service-slot-{index}", daemon=True)
+        self.service = service
+        self.process = None
+        self.conn = None
+        self.jobs_done = 0
+
+    def _spawn(self):
+        ctx = self.service.mp_context
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.service.initializer, self.service.initargs, self.service.handler),
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.jobs_done = 0
+        self.service._count("spawned")
+
+    def _kill(self):
+        if self.process is not None:
+            self.process.kill()
+            self.process.join()
+        if self.conn is not None:
+            self.conn.close()
+        self.process = self.conn = None
+
+    def _retire(self):
+        """Graceful stop: let the child leave its loop and finalize."""
+        try:
+            self.conn.send(None)
+            self.process.join(timeout=5)
+        except (OSError, ValueError):
+            pass
+        self._kill()
+
+    def run(self):
+        self._spawn()  # Pre-warm so the first job does not pay the start-up
+        while True:
+            job = self.service.jobs.get()
+            if job is _STOP:
+                break
+            job.finish(self._execute(job))
+        if self.process is not None:
+            self._retire()
+
+    def _replace(self, graceful=False):
+        self._retire() if graceful else self._kill()
+        self._spawn()
+
+    def _execute(self, job):
+        if self.process is None or not self.process.is_alive():
+            self._replace()
+        try:
+            self.conn.send(job.args)
+            finished = self.conn.poll(job.timeout)
+        except (OSError, ValueError) as e:
+            self._replace()
+            self.service._count("crashes")
+            return {"status": "error", "kind": "crash", "error": f"Worker unreachable: {e}"}
+        if not finished:
+            self._replace()
+            self.service._count("timeouts")
+            return {"status": "error", "kind": "timeout", "error": f"Job exceeded {job.timeout}s"}
+        try:
+            status, payload = self.conn.recv()
+        except (EOFError, OSError):
+            self.process.join(timeout=1)
+            exitcode = self.process.exitcode
+            self._replace()
+            self.service._count("crashes")
+            return {"status": "error", "kind": "crash", "error": f"Worker exited (code {exitcode})"}
+
+        self.jobs_done += 1
+        if self.jobs_done >= self.service.max_jobs_per_worker:
+            self._replace(graceful=True)
+            self.service._count("recycled")
+        if status == "ok":
+            self.service._count("completed")
+            return {"status": "ok", "domain": payload}
+        self.service._count("failed")
+        return {"status": "error", "kind": "failed", "error": payload}
+
+
+# --- Server -------------------------------------------------------------------
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response = {"status": "error", "kind": "bad_request", "error": f"Invalid JSON: {e}"}
+            else:
+                response = self.server.service.dispatch(request)
+            self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class GmshService:
+    """
+    Resident extraction service.
+
+    `handler(args) -> dict` runs in the worker processes after
+    `initializer(*initargs)`; both must be importable module-level callables
+    because workers are started with the "spawn" method.
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, workers=DEFAULT_WORKERS,
+                 max_jobs_per_worker=DEFAULT_MAX_JOBS_PER_WORKER, queue_size=DEFAULT_QUEUE_SIZE,
+                 job_timeout=DEFAULT_JOB_TIMEOUT, handler=extract_job, initializer=init_gmsh_worker,
+                 initargs=()):
+        self.socket_path = socket_path
+        self.max_jobs_per_worker = max(1, max_jobs_per_worker)
+        self.job_timeout = job_timeout
+        self.handler = handler
+        self.initializer = initializer
+        self.initargs = tuple(initargs)
+        self.mp_context = multiprocessing.get_context("spawn")
+        self.jobs = queue.Queue(maxsize=max(1, queue_size))
+        self.slots = [_WorkerSlot(self, i) for i in range(max(1, workers))]
+        self.stats = {"spawned": 0, "completed": 0, "failed": 0, "timeouts": 0,
+                      "crashes": 0, "recycled": 0, "rejected": 0}
+        self._stats_lock = threading.Lock()
+        self.started = time.time()
+        self.server = None
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def snapshot(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats.update(workers=len(self.slots), queued=self.jobs.qsize(),
+                     uptime_s=round(time.time() - self.started, 3))
+        return stats
+
+    def dispatch(self, request):
+        op = request.get("op")
+        if op == "ping":
+            return {"status": "ok", "stats": self.snapshot()}
+        if op != "extract":
+            return {"status": "error", "kind": "bad_request", "error": f"Unknown op: {op!r}"}
+
+        args = request.get("args") or {}
+        unknown = sorted(set(args) - set(EXTRACT_ARGS))
+        if unknown or "step_path" not in args:
+            return {"status": "error", "kind": "bad_request",
+                    "error": f"Expected step_path and optional {EXTRACT_ARGS[1:]}, got unknown {unknown}"}
+        job = _Job(args, float(request.get("timeout") or self.job_timeout))
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            self._count("rejected")
+            return {"status": "error", "kind": "busy", "error": "Job queue is full"}
+        job.done.wait()
+        return job.response
+
+    def start(self):
+        """Bind the socket and start worker slots; returns immediately."""
+        if os.path.exists(self.socket_path):
+            try:
+                ping(self.socket_path)
+            except ServiceUnavailable:
+                os.remove(self.socket_path)  # Stale socket from a dead daemon
+            else:
+                raise GmshServiceError(f"A service is already listening on {self.socket_path}")
+        for slot in self.slots:
+            slot.start()
+        self.server = _ThreadingUnixServer(self.socket_path, _RequestHandler)
+        self.server.service = self
+        threading.Thread(target=self.server.serve_forever, name="gmsh-service-accept", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        for _ in self.slots:
+            self.jobs.put(_STOP)
+        for slot in self.slots:
+            slot.join()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# --- Client -------------------------------------------------------------------
+
+def request(socket_path, message, timeout=None):
+    """Send one request and return the decoded response."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(socket_path)
+        except (FileNotFoundError, ConnectionRefusedError, socket.timeout) as e:
+            raise ServiceUnavailable(f"No Gmsh service on {socket_path}: {e}") from e
+        sock.settimeout(timeout)
+        sock.sendall((json.dumps(message) + "\n").encode("utf-8"))
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    finally:
+        sock.close()
+    if not line:
+        raise GmshServiceError("Gmsh service closed the connection without a response")
+    return json.loads(line)
+
+
+def ping(socket_path):
+    return request(socket_path, {"op": "ping"}, timeout=CONNECT_TIMEOUT)["stats"]
+
+
+def extract_via_service(socket_path, step_path, timeout=None, **options):
+    """
+    Run extract_domain_definition in the service. Paths are made absolute
+    because the daemon has its own working directory.
+    """
+    args = {"step_path": os.path.abspath(step_path), **options}
+    for key in ("mask_path", "sdf_path", "tags_path"):
+        if args.get(key):
+            args[key] = os.path.abspath(args[key])
+    message = {"op": "extract", "args": args}
+    if timeout:
+        message["timeout"] = timeout
+    response = request(socket_path, message)
+    if response["status"] != "ok":
+        raise GmshServiceError(f"Gmsh service {response['kind']}: {response['error']}")
+    return response["domain"]
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt  # SIGTERM shuts down like Ctrl-C
+
+
+def main():
+    from src.result_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+
+    parser = argparse.ArgumentParser(description="Resident Gmsh domain-extraction service")
+    parser.add_argument("--socket", type=str, default=DEFAULT_SOCKET_PATH, help="Unix socket path")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Warm Gmsh worker processes")
+    parser.add_argument("--max-jobs", type=int, default=DEFAULT_MAX_JOBS_PER_WORKER, help="Jobs before a worker is recycled")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE, help="Pending jobs before requests are rejected as busy")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_JOB_TIMEOUT, help="Default per-job timeout in seconds")
+    parser.add_argument("--cache-dir", type=str, default=DEFAULT_CACHE_DIR, help="Directory of the domain result cache")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024), help="Result cache size bound in MiB")
+    parser.add_argument("--no-cache", action="store_true", help="Workers always run Gmsh")
+    parser.add_argument("--ping", action="store_true", help="Print the stats of a running service and exit")
+    parser.add_argument("--debug", action="store_true", help="Print debug information")
+    args = parser.parse_args()
+
+    if args.ping:
+        try:
+            print(json.dumps(ping(args.socket), indent=2))
+        except ServiceUnavailable as e:
+            print(f"[ERROR] {e}")
+            raise SystemExit(1)
+        return
+
+    initargs = (None if args.no_cache else args.cache_dir, int(args.cache_max_mb * 1024 * 1024), args.debug)
+    service = GmshService(socket_path=args.socket, workers=args.workers, max_jobs_per_worker=args.max_jobs,
+                          queue_size=args.queue_size, job_timeout=args.timeout, initargs=initargs)
+    service.start()
+    signal.signal(signal.SIGTERM, _interrupt)
+    print(f"[INFO] Gmsh service listening on {args.socket} with {args.workers} worker(s)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("[INFO] Shutting down Gmsh service.")
+    finally:
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# src/mask_io.py
+
+"""
+Mask I/O Module
+
+Writes occupancy masks as binary .npy sidecars next to the domain JSON and
+reads them back memory-mapped. Slabs are streamed straight into a memmapped
+file, so neither the writer nor a reader ever needs the whole grid in RAM or
+as a Python list.
+
+The array is stored C-ordered with shape (nz, ny, nx) ("zyx" axis order),
+which matches the x-fastest order of geometry_mask_flat. The "packbits"
+encoding packs eight x-cells per byte (little bit order) along the last axis.
+The "blocks" encoding is the block-sparse .npz of src.sparse_grid, for large
+domains that are mostly uniform fluid or solid.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+MASK_ENCODINGS = ("dense", "packbits", "blocks")
+AXIS_ORDER = "zyx"
+_BITORDER = "little"
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class MaskFileError(Exception):
+    """Raised when a mask sidecar is missing or does not match its descriptor."""
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sidecar_path_for(output_path, suffix="_mask.npy"):
+    """Mask sidecar path that sits beside the domain JSON it belongs to."""
+    stem, _ = os.path.splitext(output_path)
+    return stem + suffix
+
+
+def write_mask_slabs(path, shape, slabs, encoding="dense", block_size=None):
+    """
+    Stream (k_start, k_stop, slab) tuples with slab shaped (k, ny, nx) into a
+    memory-mapped .npy file (or a block-sparse .npz for "blocks") and return
+    its descriptor (without the path).
+    """
+    if encoding not in MASK_ENCODINGS:
+        raise ValueError(f"Unknown mask encoding '{encoding}', expected one of {MASK_ENCODINGS}")
+    if encoding == "blocks":
+        from src.sparse_grid import SparseMask, DEFAULT_BLOCK_SIZE
+        return SparseMask.from_slabs(shape, slabs, block_size=block_size or DEFAULT_BLOCK_SIZE).save(path)
+
+    nx, ny, nz = shape
+    stored_shape = (nz, ny, nx) if encoding == "dense" else (nz, ny, (nx + 7) // 8)
+    array = np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=stored_shape)
+    solid = 0
+    try:
+        for k_start, k_stop, slab in slabs:
+            solid += int(np.count_nonzero(slab))
+            if encoding == "dense":
+                array[k_start:k_stop] = slab
+            else:
+                array[k_start:k_stop] = np.packbits(slab, axis=-1, bitorder=_BITORDER)
+        array.flush()
+    finally:
+        del array
+
+    descriptor = {
+        "format": "npy",
+        "encoding": encoding,
+        "shape": [nz, ny, nx],
+        "dtype": "uint8",
+        "axis_order": AXIS_ORDER,
+        "sha256": file_checksum(path),
+        "solid_cells": solid,
+    }
+    if encoding == "packbits":
+        descriptor["bitorder"] = _BITORDER
+    return descriptor
+
+
+def _resolve(descriptor, base_dir):
+    path = descriptor["path"]
+    return path if os.path.isabs(path) else os.path.join(base_dir, path)
+
+
+def verify_mask_file(descriptor, base_dir="."):
+    """True when the sidecar exists and its SHA-256 matches the descriptor."""
+    path = _resolve(descriptor, base_dir)
+    return os.path.isfile(path) and file_checksum(path) == descriptor.get("sha256")
+
+
+def load_mask_array(descriptor, base_dir=".", mmap_mode="r", verify=False):
+    """
+    Open the stored array of a mask descriptor, memory-mapped by default.
+    For "packbits" this is the packed array and for "blocks" a SparseMask;
+    use read_mask_slab to get dense cells.
+    """
+    path = _resolve(descriptor, base_dir)
+    if not os.path.isfile(path):
+        raise MaskFileError(f"Missing mask file: {path}")
+    if verify and file_checksum(path) != descriptor.get("sha256"):
+        raise MaskFileError(f"Checksum mismatch for mask file: {path}")
+    if descriptor["encoding"] == "blocks":
+        from src.sparse_grid import load_sparse_mask
+        return load_sparse_mask(path, shape=descriptor["shape"])
+    array = np.load(path, mmap_mode=mmap_mode)
+    nz, ny, nx = descriptor["shape"]
+    expected = (nz, ny, nx) if descriptor["encoding"] == "dense" else (nz, ny, (nx + 7) // 8)
+    if array.shape != expected or array.dtype != np.uint8:
+        raise MaskFileError(f"Mask file {path} has shape {array.shape}/{array.dtype}, expected {expected}/uint8")
+    return array
+
+
+def read_mask_slab(descriptor, k_start, k_stop, base_dir=".", array=None):
+    """Return the dense uint8 z-slab [k_start, k_stop) with shape (k, ny, nx)."""
+    if array is None:
+        array = load_mask_array(descriptor, base_dir=base_dir)
+    if descriptor["encoding"] == "blocks":
+        return array.expand(z_range=(k_start, k_stop))
+    slab = array[k_start:k_stop]
+    if descriptor["encoding"] == "packbits":
+        nx = descriptor["shape"][2]
+        slab = np.unpackbits(slab, axis=-1, count=nx, bitorder=descriptor.get("bitorder", _BITORDER))
+    return np.asarray(slab)
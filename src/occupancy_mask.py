@@ -0,0 +1,163 @@
+# src/occupancy_mask.py
+
+"""
+Occupancy Mask Module
+
+Classifies the cell centers of the structured nx/ny/nz grid as solid (1) or
+fluid (0) against a closed surface tessellation using ray parity.
+
+Instead of testing cells one by one, one ray is cast along +z through every
+(x, y) column of cell centers. Each triangle is intersected with the columns
+under its xy footprint in vectorized batches, and every crossing flips the
+inside/outside parity from the first cell center above it. The mask is then
+produced slab by slab along z with a cumulative XOR, so peak memory depends
+on the slab size and the number of surface crossings, not on nx*ny*nz.
+
+Flat mask order is x fastest, then y, then z: index = i + nx * (j + ny * k),
+i.e. a C-ordered array of shape (nz, ny, nx).
+"""
+
+import numpy as np
+
+# Cells per z-slab produced at once (uint8 mask plus transient work arrays)
+DEFAULT_SLAB_CELLS = 1 << 24
+
+# Triangles intersected per batch when building column crossings
+DEFAULT_TRIANGLE_BATCH = 1 << 16
+
+# Rays are nudged off the exact column centers by this fraction of a cell so
+# that they do not graze shared triangle edges or vertices of axis-aligned
+# tessellations (which would double-count or miss a crossing).
+_RAY_JITTER = (7.3e-7, 3.1e-7)
+
+
+def grid_spacing(domain_definition):
+    """Return (origin, spacing, shape) of the cell grid as float/int tuples in x, y, z order."""
+    d = domain_definition
+    shape = (int(d["nx"]), int(d["ny"]), int(d["nz"]))
+    origin = (float(d["min_x"]), float(d["min_y"]), float(d["min_z"]))
+    spacing = (
+        (float(d["max_x"]) - origin[0]) / shape[0],
+        (float(d["max_y"]) - origin[1]) / shape[1],
+        (float(d["max_z"]) - origin[2]) / shape[2],
+    )
+    return origin, spacing, shape
+
+
+def column_crossings(vertices, triangles, domain_definition, triangle_batch=DEFAULT_TRIANGLE_BATCH):
+    """
+    Intersect the +z rays through every cell-center column with the surface.
+
+    Returns (columns, flip_k): the flat column index j * nx + i of each
+    crossing and the first z cell index whose center lies above it (nz when
+    the crossing is above the grid). Both are int64 arrays sorted by flip_k.
+    """
+    (x0, y0, z0), (dx, dy, dz), (nx, ny, nz) = grid_spacing(domain_definition)
+    ray_dx = _RAY_JITTER[0] * dx
+    ray_dy = _RAY_JITTER[1] * dy
+
+    columns_out = []
+    flips_out = []
+    for start in range(0, len(triangles), triangle_batch):
+        tri = vertices[triangles[start:start + triangle_batch]]  # (B, 3, 3)
+        ax, ay, az = tri[:, 0, 0], tri[:, 0, 1], tri[:, 0, 2]
+        bx, by, bz = tri[:, 1, 0], tri[:, 1, 1], tri[:, 1, 2]
+        cx, cy, cz = tri[:, 2, 0], tri[:, 2, 1], tri[:, 2, 2]
+
+        # Signed doubled area of the xy projection; vertical triangles are
+        # parallel to the rays and never produce a crossing.
+        det = (bx - ax) * (cy - ay) - (cx - ax) * (by - ay)
+        usable = np.abs(det) > 1e-300
+
+        # Column index ranges under each projected footprint
+        i_lo = np.ceil((np.minimum(np.minimum(ax, bx), cx) - x0 - ray_dx) / dx - 0.5)
+        i_hi = np.floor((np.maximum(np.maximum(ax, bx), cx) - x0 - ray_dx) / dx - 0.5)
+        j_lo = np.ceil((np.minimum(np.minimum(ay, by), cy) - y0 - ray_dy) / dy - 0.5)
+        j_hi = np.floor((np.maximum(np.maximum(ay, by), cy) - y0 - ray_dy) / dy - 0.5)
+        i_lo = np.clip(i_lo, 0, nx).astype(np.int64)
+        i_hi = np.clip(i_hi, -1, nx - 1).astype(np.int64)
+        j_lo = np.clip(j_lo, 0, ny).astype(np.int64)
+        j_hi = np.clip(j_hi, -1, ny - 1).astype(np.int64)
+        width = np.maximum(i_hi - i_lo + 1, 0)
+        height = np.maximum(j_hi - j_lo + 1, 0)
+        counts = np.where(usable, width * height, 0)
+        total = int(counts.sum())
+        if total == 0:
+            continue
+
+        # Expand (triangle, column) candidate pairs without a Python loop
+        owner = np.repeat(np.arange(len(tri)), counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        w = width[owner]
+        ci = i_lo[owner] + offsets % w
+        cj = j_lo[owner] + offsets // w
+        px = x0 + (ci + 0.5) * dx + ray_dx
+        py = y0 + (cj + 0.5) * dy + ray_dy
+
+        # Barycentric coordinates of the ray point in the projected triangle
+        inv = 1.0 / det[owner]
+        u = ((px - ax[owner]) * (cy[owner] - ay[owner]) - (cx[owner] - ax[owner]) * (py - ay[owner])) * inv
+        v = ((bx[owner] - ax[owner]) * (py - ay[owner]) - (px - ax[owner]) * (by[owner] - ay[owner])) * inv
+        hit = (u >= 0.0) & (v >= 0.0) & (u + v <= 1.0)
+        if not hit.any():
+            continue
+
+        owner, u, v = owner[hit], u[hit], v[hit]
+        z_hit = az[owner] + u * (bz[owner] - az[owner]) + v * (cz[owner] - az[owner])
+        flip_k = np.floor((z_hit - z0) / dz - 0.5).astype(np.int64) + 1
+        columns_out.append(cj[hit] * nx + ci[hit])
+        flips_out.append(np.clip(flip_k, 0, nz))
+
+    if not columns_out:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+
+    columns = np.concatenate(columns_out)
+    flips = np.concatenate(flips_out)
+    order = np.argsort(flips, kind="stable")
+    return columns[order], flips[order]
+
+
+def iter_mask_slabs(domain_definition, vertices, triangles, slab_cells=DEFAULT_SLAB_CELLS, crossings=None):
+    """
+    Yield (k_start, k_stop, slab) with slab a uint8 array of shape
+    (k_stop - k_start, ny, nx) holding 1 for solid and 0 for fluid cells.
+
+    `crossings` may carry a precomputed column_crossings() result.
+    """
+    _, _, (nx, ny, nz) = grid_spacing(domain_definition)
+    n_columns = nx * ny
+    depth = max(1, min(nz, slab_cells // n_columns))
+    columns, flips = crossings if crossings is not None else column_crossings(vertices, triangles, domain_definition)
+
+    parity = np.zeros(n_columns, dtype=np.uint8)
+    for k_start in range(0, nz, depth):
+        k_stop = min(nz, k_start + depth)
+        lo = np.searchsorted(flips, k_start, side="left")
+        hi = np.searchsorted(flips, k_stop, side="left")
+        # Parity flips per (local k, column), reduced mod 2
+        toggles = np.bincount(
+            (flips[lo:hi] - k_start) * n_columns + columns[lo:hi],
+            minlength=(k_stop - k_start) * n_columns
+        ).astype(np.uint8) & 1
+        toggles = toggles.reshape(k_stop - k_start, n_columns)
+        slab = np.bitwise_xor.accumulate(toggles, axis=0)
+        slab ^= parity
+        parity = slab[-1].copy()
+        yield k_start, k_stop, slab.reshape(k_stop - k_start, ny, nx)
+
+
+def compute_occupancy_mask(domain_definition, vertices, triangles, slab_cells=DEFAULT_SLAB_CELLS, out=None):
+    """
+    Build the full solid/fluid mask as a flat uint8 array in x-fastest order.
+
+    `out` may be any preallocated writable uint8 buffer of nx*ny*nz elements
+    (e.g. a NumPy memmap) so that large masks never sit in RAM at once.
+    """
+    _, _, (nx, ny, nz) = grid_spacing(domain_definition)
+    if out is None:
+        out = np.empty(nx * ny * nz, dtype=np.uint8)
+    plane = nx * ny
+    for k_start, k_stop, slab in iter_mask_slabs(domain_definition, vertices, triangles, slab_cells=slab_cells):
+        out[k_start * plane:k_stop * plane] = slab.reshape(-1)
+    return out
@@ -0,0 +1,332 @@
+# src/pipeline_orchestrator.py
+
+"""
+Pipeline Orchestrator Module
+
+Runs download → extract → upload as overlapping stages instead of three
+scripts in sequence, so the first domain JSONs are uploaded while later
+models are still downloading:
+
+    lister ─▶ [download queue] ─▶ download threads ─▶ [extract queue]
+        ─▶ Gmsh process pool (batch_runner workers) ─▶ upload threads
+
+Both queues are bounded; a stage that gets ahead blocks until the next one
+catches up, which caps the models sitting on local disk. Extraction admits
+at most `workers + queue_size` files between submission and upload, so
+finished results cannot pile up either. A Gmsh worker that dies (a crash, an
+out-of-memory kill) fails the files in flight on its pool, which is then
+replaced so the remaining files still run. Zip archives are expanded into their
+STEP members (see zip_ingest) as soon as they are downloaded. Transfers go
+through a transfer_store store, so the same run works against Dropbox or a
+local directory. A RunCatalog, if given, records every download, extraction
+and upload.
+"""
+
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+from src.zip_ingest import STEP_EXTENSIONS, ARCHIVE_EXTENSIONS, is_archive, list_step_members, member_ref
+from src.resolution_planner import add_budget_arguments, budget_from_args
+from src.result_cache import ResultCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+from src.run_catalog import RunCatalog
+from src.run_metrics import emit_record
+
+DEFAULT_TRANSFER_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 8
+SUMMARY_FILENAME = "pipeline_summary.json"
+SCHEMA_PATH = "schemas/domain_schema.json"
+
+# Queue sentinel: no more work for the consuming stage
+_DONE = object()
+
+
+def _remote_join(folder, relative):
+    return "/".join([folder.rstrip("/")] + relative.replace(os.sep, "/").split("/"))
+
+
+class _Run:
+    """Shared state of one pipeline run; records are appended from several threads."""
+
+    def __init__(self, started):
+        self.started = started
+        self.lock = threading.Lock()
+        self.records = []
+        self.downloaded = 0
+        self.first_upload_s = None
+
+    def elapsed(self):
+        return round(time.perf_counter() - self.started, 4)
+
+    def add(self, record):
+        with self.lock:
+            self.records.append(record)
+        if record["status"] == "ok":
+            print(f"[INFO] ✅ {record['step']} → {record.get('remote', record['output'])}")
+        else:
+            print(f"[ERROR] ❌ {record['step']} ({record['stage']}): {record['error']}")
+
+
+def _lister(store, remote_folder, download_queue, transfer_workers, run):
+    try:
+        for entry in store.list_files(remote_folder):
+            if entry.name.lower().endswith(STEP_EXTENSIONS + ARCHIVE_EXTENSIONS):
+                download_queue.put(entry)  # Blocks while the downloaders are behind
+    except Exception as e:
+        run.add({"step": remote_folder, "status": "failed", "stage": "list", "error": f"{type(e).__name__}: {e}"})
+    finally:
+        for _ in range(transfer_workers):
+            download_queue.put(_DONE)
+
+
+def _downloader(store, work_dir, download_queue, extract_queue, run, debug, catalog):
+    while True:
+        entry = download_queue.get()
+        if entry is _DONE:
+            return
+        try:
+            local_path = store.download(entry, work_dir)
+            refs = ([member_ref(local_path, member) for member in list_step_members(local_path, debug=debug)]
+                    if is_archive(local_path) else [local_path])
+        except Exception as e:
+            run.add({"step": entry.path, "status": "failed", "stage": "download", "error": f"{type(e).__name__}: {e}"})
+            if catalog is not None:
+                catalog.record_transfer("download", os.path.join(work_dir, entry.name), entry.path, status="failed",
+                                        content_hash=entry.content_hash, error=f"{type(e).__name__}: {e}")
+            continue
+        if catalog is not None:
+            catalog.record_transfer("download", local_path, entry.path, content_hash=entry.content_hash)
+        with run.lock:
+            run.downloaded += 1
+        if debug: print(f"[DEBUG] Downloaded {entry.path} ({entry.size} bytes) at {run.elapsed()}s")
+        for ref in refs:
+            extract_queue.put(ref)  # Blocks while extraction is behind
+
+
+def _uploader(store, upload_folder, output_dir, upload_queue, slots, run, metrics_path, catalog, lc):
+    while True:
+        item = upload_queue.get()
+        if item is _DONE:
+            return
+        slots.release()
+        ref, output_path, future = item
+        try:
+            record = future.result()
+        except Exception as e:  # The worker process itself died
+            record = {"step": ref, "output": output_path, "status": "failed", "error": f"{type(e).__name__}: {e}"}
+        metrics = record.pop("metrics", None)
+        if metrics and metrics_path:
+            emit_record(metrics, metrics_path)
+        if catalog is not None:
+            from src.batch_runner import catalog_record
+            catalog_record(catalog, record, metrics, lc=lc, source="pipeline")
+        if record["status"] != "ok":
+            record["stage"] = "extract"
+        elif upload_folder:
+            remote = _remote_join(upload_folder, os.path.relpath(record["output"], output_dir))
+            try:
+                store.upload(record["output"], remote)
+                record["remote"] = remote
+                with run.lock:
+                    if run.first_upload_s is None:
+                        run.first_upload_s = run.elapsed()
+            except Exception as e:
+                record.update(status="failed", stage="upload", error=f"{type(e).__name__}: {e}")
+            if catalog is not None:
+                catalog.record_transfer("upload", record["output"], remote,
+                                        status="ok" if record["status"] == "ok" else "failed", error=record.get("error"))
+        run.add(record)
+
+
+def run_pipeline(store, remote_folder, work_dir, output_dir=None, upload_folder=None, lc=None, nx=None, ny=None,
+                 nz=None, schema_path=SCHEMA_PATH, workers=1, transfer_workers=DEFAULT_TRANSFER_WORKERS,
+                 queue_size=DEFAULT_QUEUE_SIZE, debug=False, cache=None, metrics_path=None, resolution_budget=None,
+                 catalog=None):
+    """
+    Download the STEP files and zip archives of `remote_folder` from `store`
+    into `work_dir`, extract each model on a pool of `workers` Gmsh processes
+    into `output_dir` (default: work_dir/domains) and upload every domain JSON
+    to `upload_folder` as soon as it is written (default: `remote_folder`;
+    "" keeps results local). Returns the summary dict, also written to
+    output_dir.
+
+    Per-file failures are recorded with the stage that failed rather than
+    aborting the run; invalid resolution arguments fail before any transfer.
+    """
+    if not lc and not (nx and ny and nz) and not resolution_budget:
+        raise ValueError("Either --lc or all of --nx, --ny, --nz must be provided.")
+    # Deferred: batch_runner loads Gmsh, which only the worker processes need
+    from src.batch_runner import output_path_for, _init_worker, _process_file
+    from src.gmsh_runner import load_schema
+
+    output_dir = output_dir or os.path.join(work_dir, "domains")
+    upload_folder = remote_folder if upload_folder is None else upload_folder
+    os.makedirs(work_dir, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+    workers = max(1, workers)
+    transfer_workers = max(1, transfer_workers)
+    schema = load_schema(schema_path)
+
+    run = _Run(time.perf_counter())
+    download_queue = queue.Queue(maxsize=queue_size)
+    extract_queue = queue.Queue(maxsize=queue_size)
+    # Unbounded on purpose: `slots` already bounds what extraction can hand over
+    upload_queue = queue.Queue()
+    slots = threading.BoundedSemaphore(workers + queue_size)
+
+    print(f"[INFO] Pipeline: {remote_folder} → {output_dir} with {transfer_workers} transfer thread(s) "
+          f"and {workers} Gmsh worker(s), queues of {queue_size}")
+    lister = threading.Thread(target=_lister, args=(store, remote_folder, download_queue, transfer_workers, run),
+                              name="pipeline-lister", daemon=True)
+    downloaders = [
+        threading.Thread(target=_downloader, args=(store, work_dir, download_queue, extract_queue, run, debug, catalog),
+                         name=f"pipeline-download-{i}", daemon=True)
+        for i in range(transfer_workers)
+    ]
+    uploaders = [
+        threading.Thread(target=_uploader,
+                         args=(store, upload_folder, output_dir, upload_queue, slots, run, metrics_path, catalog, lc),
+                         name=f"pipeline-upload-{i}", daemon=True)
+        for i in range(transfer_workers)
+    ]
+
+    def close_extract_queue():
+        for thread in downloaders:
+            thread.join()
+        extract_queue.put(_DONE)
+
+    def new_pool(mp_context=None):
+        return concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                      initargs=(schema, debug, cache), mp_context=mp_context)
+
+    planned = {}
+    pool = new_pool()
+    try:
+        try:
+            # The first task starts the workers; do it before any transfer thread exists
+            pool.submit(os.getpid).result()
+        except BrokenProcessPool:
+            pass  # Workers that cannot start fail the files one by one below
+        for thread in [lister] + downloaders + uploaders:
+            thread.start()
+        threading.Thread(target=close_extract_queue, name="pipeline-closer", daemon=True).start()
+
+        while True:
+            ref = extract_queue.get()
+            if ref is _DONE:
+                break
+            output_path = output_path_for(ref, output_dir)
+            if output_path in planned:
+                run.add({"step": ref, "output": output_path, "status": "failed", "stage": "extract",
+                         "error": f"Output name collision with {planned[output_path]}"})
+                continue
+            planned[output_path] = ref
+            slots.acquire()  # Blocks while the uploaders are behind
+            task = (ref, output_path, lc, nx, ny, nz, resolution_budget)
+            try:
+                future = pool.submit(_process_file, task)
+            except BrokenProcessPool:
+                # A worker died: the uploaders record its files as failed extractions. The
+                # transfer threads are running by now, so the new pool spawns instead of forking.
+                print("[WARN] A Gmsh worker process died; restarting the worker pool.")
+                pool.shutdown(wait=False)
+                pool = new_pool(multiprocessing.get_context("spawn"))
+                future = pool.submit(_process_file, task)
+            future.add_done_callback(lambda done, ref=ref, output_path=output_path:
+                                     upload_queue.put((ref, output_path, done)))
+    finally:
+        pool.shutdown(wait=True)
+
+    for _ in uploaders:
+        upload_queue.put(_DONE)
+    for thread in [lister] + uploaders:
+        thread.join()
+
+    records = sorted(run.records, key=lambda r: r["step"])
+    failed = sum(1 for r in records if r["status"] != "ok")
+    summary = {
+        "source": remote_folder,
+        "downloaded": run.downloaded,
+        "total": len(records),
+        "succeeded": len(records) - failed,
+        "failed": failed,
+        "workers": workers,
+        "transfer_workers": transfer_workers,
+        "queue_size": queue_size,
+        "first_upload_s": run.first_upload_s,
+        "elapsed_s": run.elapsed(),
+        "files": records
+    }
+    summary_path = os.path.join(output_dir, SUMMARY_FILENAME)
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=2)
+    print(f"[INFO] Pipeline summary written to: {summary_path} ({summary['succeeded']}/{summary['total']} succeeded)")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download, extract and upload STEP models as one overlapped pipeline")
+    parser.add_argument("--remote-folder", type=str, default="/engineering_simulations_pipeline", help="Folder to read models from")
+    parser.add_argument("--upload-folder", type=str, help="Folder to upload domain JSONs to (default: --remote-folder)")
+    parser.add_argument("--work-dir", type=str, required=True, help="Local directory for downloaded models")
+    parser.add_argument("--output-dir", type=str, help="Local directory for domain JSONs (default: <work-dir>/domains)")
+    parser.add_argument("--local-store", type=str, help="Use this directory as the remote store instead of Dropbox (offline runs)")
+    parser.add_argument("--no-upload", action="store_true", help="Keep the domain JSONs local")
+    parser.add_argument("--lc", type=float, help="Grid resolution (model units)")
+    parser.add_argument("--nx", type=int, help="Grid resolution in x-direction")
+    parser.add_argument("--ny", type=int, help="Grid resolution in y-direction")
+    parser.add_argument("--nz", type=int, help="Grid resolution in z-direction")
+    add_budget_arguments(parser)
+    parser.add_argument("--schema", type=str, default=SCHEMA_PATH, help="Path to JSON schema")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Gmsh worker processes")
+    parser.add_argument("--transfer-workers", type=int, default=DEFAULT_TRANSFER_WORKERS, help="Download and upload threads (each)")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE, help="Capacity of the download and extract queues")
+    parser.add_argument("--cache-dir", type=str, default=DEFAULT_CACHE_DIR, help="Directory of the domain result cache")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024), help="Result cache size bound in MiB (LRU eviction)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the result cache and always run Gmsh")
+    parser.add_argument("--metrics", type=str, help="Append per-file metrics as JSON lines to this file ('-' for stdout)")
+    parser.add_argument("--catalog", type=str, help="Record downloads, runs and uploads in this run catalog database")
+    parser.add_argument("--debug", action="store_true", help="Print debug information")
+    args = parser.parse_args()
+    resolution_budget = budget_from_args(parser, args)
+    cache = None if args.no_cache else ResultCache(args.cache_dir, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+
+    if args.local_store:
+        from src.transfer_store import LocalStore
+        store = LocalStore(args.local_store)
+    else:
+        from src.transfer_store import DropboxStore
+        store = DropboxStore.from_credentials(os.environ["REFRESH_TOKEN"], os.environ["APP_KEY"], os.environ["APP_SECRET"],
+                                              max_connections=2 * args.transfer_workers)
+    summary = run_pipeline(
+        store,
+        remote_folder=args.remote_folder,
+        work_dir=args.work_dir,
+        output_dir=args.output_dir,
+        upload_folder="" if args.no_upload else args.upload_folder,
+        lc=args.lc,
+        nx=args.nx,
+        ny=args.ny,
+        nz=args.nz,
+        schema_path=args.schema,
+        workers=args.workers,
+        transfer_workers=args.transfer_workers,
+        queue_size=args.queue_size,
+        debug=args.debug,
+        cache=cache,
+        metrics_path=args.metrics,
+        resolution_budget=resolution_budget,
+        catalog=RunCatalog(args.catalog) if args.catalog else None
+    )
+    if summary["failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# src/resolution_planner.py
+
+"""
+Resolution Planner Module
+
+Chooses nx, ny, nz from a memory budget instead of a hand-picked `lc`.
+The caller gives a cell budget, or a byte budget together with the number
+of per-cell fields and the bytes per value, and the planner returns the
+finest grid over the bounding box that fits:
+
+- "uniform": the smallest single spacing `lc` whose grid fits, counted the
+  same way as `compute_resolution` (floor(extent / lc), at least 1).
+- "per-axis": starts from the uniform grid and keeps refining the axis with
+  the coarsest spacing while the budget allows.
+
+An optional minimum feature size and cells-per-feature raise the counts to
+resolve that feature on every axis; when that cannot fit, planning fails
+rather than silently producing an under-resolved grid.
+"""
+
+import math
+
+PLAN_MODES = ("uniform", "per-axis")
+DEFAULT_BYTES_PER_VALUE = 8  # float64 fields
+DEFAULT_MIN_CELLS_PER_FEATURE = 4
+
+_BISECTION_STEPS = 200
+
+
+class ResolutionBudgetError(Exception):
+    """Raised when no grid satisfying the constraints fits in the budget."""
+
+
+def cell_budget(max_cells=None, max_bytes=None, fields=1, bytes_per_value=DEFAULT_BYTES_PER_VALUE):
+    """Effective cell budget: the tighter of the cell and byte budgets."""
+    if max_cells is None and max_bytes is None:
+        raise ValueError("A resolution budget needs max_cells or max_bytes.")
+    if fields < 1 or bytes_per_value < 1:
+        raise ValueError("fields and bytes_per_value must be positive.")
+    budgets = []
+    if max_cells is not None:
+        budgets.append(int(max_cells))
+    if max_bytes is not None:
+        budgets.append(int(max_bytes // (fields * bytes_per_value)))
+    budget = min(budgets)
+    if budget < 1:
+        raise ResolutionBudgetError(f"Budget allows {budget} cells; at least one is required.")
+    return budget
+
+
+def estimate_memory(nx, ny, nz, fields=1, bytes_per_value=DEFAULT_BYTES_PER_VALUE):
+    cells = nx * ny * nz
+    return {"cells": cells, "fields": fields, "bytes_per_value": bytes_per_value,
+            "bytes": cells * fields * bytes_per_value}
+
+
+def _counts(extents, lc):
+    return [max(1, math.floor(extent / lc)) for extent in extents]
+
+
+def _cells(counts):
+    return counts[0] * counts[1] * counts[2]
+
+
+def _uniform_counts(extents, budget):
+    """Counts for the smallest lc whose grid has at most `budget` cells."""
+    hi = max(extents)
+    if hi <= 0:
+        return [1, 1, 1], 0.0
+    lo = hi / (budget + 1)  # Finer than any fitting grid on the longest axis
+    for _ in range(_BISECTION_STEPS):
+        mid = 0.5 * (lo + hi)
+        if mid <= lo or mid >= hi:
+            break
+        if _cells(_counts(extents, mid)) <= budget:
+            hi = mid
+        else:
+            lo = mid
+    return _counts(extents, hi), hi
+
+
+def _refine_per_axis(extents, counts, budget):
+    """Refine the coarsest axis that still fits, until none does."""
+    counts = list(counts)
+    while True:
+        candidates = sorted(
+            (i for i in range(3) if extents[i] > 0),
+            key=lambda i: extents[i] / counts[i], reverse=True
+        )
+        for i in candidates:
+            trial = counts[:i] + [counts[i] + 1] + counts[i + 1:]
+            if _cells(trial) <= budget:
+                counts = trial
+                break
+        else:
+            return counts
+
+
+def _enforce_feature_size(extents, counts, budget, min_feature_size, min_cells_per_feature):
+    spacing = min_feature_size / min_cells_per_feature
+    minimum = [max(1, math.ceil(extent / spacing)) for extent in extents]
+    if _cells(minimum) > budget:
+        raise ResolutionBudgetError(
+            f"Resolving features of {min_feature_size} with {min_cells_per_feature} cells each needs "
+            f"{minimum[0]}x{minimum[1]}x{minimum[2]} = {_cells(minimum)} cells, budget is {budget}."
+        )
+    counts = [max(n, m) for n, m in zip(counts, minimum)]
+    while _cells(counts) > budget:
+        # Give back cells on the finest axis that is above its minimum
+        i = min((i for i in range(3) if counts[i] > minimum[i]), key=lambda i: extents[i] / counts[i])
+        counts[i] -= 1
+    return counts
+
+
+def plan_resolution(bbox, max_cells=None, max_bytes=None, fields=1, bytes_per_value=DEFAULT_BYTES_PER_VALUE,
+                    mode="uniform", min_feature_size=None, min_cells_per_feature=DEFAULT_MIN_CELLS_PER_FEATURE):
+    """
+    Plan the finest grid over `bbox` (min_x, min_y, min_z, max_x, max_y, max_z)
+    that fits the budget. Returns {"nx", "ny", "nz", "lc", "memory_estimate"},
+    where lc is the uniform spacing the plan started from.
+    """
+    if mode not in PLAN_MODES:
+        raise ValueError(f"Unknown resolution plan mode '{mode}', expected one of {PLAN_MODES}")
+    budget = cell_budget(max_cells, max_bytes, fields, bytes_per_value)
+    extents = [max(0.0, bbox[3] - bbox[0]), max(0.0, bbox[4] - bbox[1]), max(0.0, bbox[5] - bbox[2])]
+
+    counts, lc = _uniform_counts(extents, budget)
+    if mode == "per-axis":
+        counts = _refine_per_axis(extents, counts, budget)
+    if min_feature_size:
+        counts = _enforce_feature_size(extents, counts, budget, min_feature_size, min_cells_per_feature)
+
+    estimate = estimate_memory(*counts, fields=fields, bytes_per_value=bytes_per_value)
+    estimate["budget_cells"] = budget
+    return {"nx": counts[0], "ny": counts[1], "nz": counts[2], "lc": lc, "memory_estimate": estimate}
+
+
+def add_budget_arguments(parser):
+    """Add the resolution budget options shared by the command-line tools."""
+    parser.add_argument("--max-cells", type=int, help="Choose the finest resolution with at most this many cells (instead of --lc/--nx/--ny/--nz)")
+    parser.add_argument("--max-memory-mb", type=float, help="Choose the finest resolution whose fields fit in this many MiB")
+    parser.add_argument("--fields", type=int, default=1, help="Values stored per cell, for --max-memory-mb and the memory estimate")
+    parser.add_argument("--bytes-per-value", type=int, default=DEFAULT_BYTES_PER_VALUE, help="Bytes per stored value (8 for float64)")
+    parser.add_argument("--budget-mode", type=str, choices=PLAN_MODES, default="uniform", help="One spacing for all axes, or per-axis refinement within the budget")
+    parser.add_argument("--min-feature-size", type=float, help="Smallest feature (model units) that must be resolved")
+    parser.add_argument("--min-cells-per-feature", type=int, default=DEFAULT_MIN_CELLS_PER_FEATURE, help="Cells across --min-feature-size")
+
+
+def budget_from_args(parser, args):
+    """
+    The plan_resolution keyword arguments given by add_budget_arguments
+    options, or None when neither --max-cells nor --max-memory-mb is set.
+    """
+    if args.max_cells is None and args.max_memory_mb is None:
+        return None
+    if args.lc or args.nx or args.ny or args.nz:
+        parser.error("--max-cells/--max-memory-mb cannot be combined with --lc or --nx/--ny/--nz")
+    return {
+        "max_cells": args.max_cells,
+        "max_bytes": int(args.max_memory_mb * 1024 * 1024) if args.max_memory_mb is not None else None,
+        "fields": args.fields,
+        "bytes_per_value": args.bytes_per_value,
+        "mode": args.budget_mode,
+        "min_feature_size": args.min_feature_size,
+        "min_cells_per_feature": args.min_cells_per_feature,
+    }
@@ -0,0 +1,161 @@
+# src/result_cache.py
+
+"""
+Result Cache Module
+
+Content-addressed disk cache for extracted domain definitions. Entries are
+keyed by the STEP file's SHA-256, the resolution arguments and the installed
+Gmsh version, so a hit can be returned without opening Gmsh at all. The
+cache is bounded in bytes and evicts least-recently-used entries, with
+recency tracked through each entry file's mtime.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from importlib import metadata
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "GMSH_RUNNER_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "gmsh_runner")
+)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Bump when the cached payload layout changes so stale entries miss cleanly
+CACHE_FORMAT_VERSION = 1
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+_ENTRY_SUFFIX = ".json"
+
+# (realpath, size, mtime_ns) -> digest, so the cache key and the run catalog
+# hash each STEP file once per process
+_digests = {}
+
+
+def file_sha256(path):
+    """Hash a file in fixed-size chunks so large STEP files stay out of memory."""
+    st = os.stat(path)
+    identity = (os.path.realpath(path), st.st_size, st.st_mtime_ns)
+    if identity in _digests:
+        return _digests[identity]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    _digests[identity] = digest.hexdigest()
+    return _digests[identity]
+
+
+def gmsh_version():
+    """Installed Gmsh version, read from package metadata without loading the library."""
+    try:
+        return metadata.version("gmsh")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+class ResultCache:
+    """Size-bounded LRU cache of domain definitions stored as JSON files."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def make_key(self, step_path, lc=None, nx=None, ny=None, nz=None, **extra):
+        """
+        Build the cache key for a STEP file and resolution request. When `lc`
+        is given the explicit nx/ny/nz are ignored by the extractor, so they are
+        dropped from the key as well. Extra keyword arguments are folded in for
+        callers whose output depends on further options.
+        """
+        if lc:
+            nx = ny = nz = None
+        material = {
+            "format": CACHE_FORMAT_VERSION,
+            "step_sha256": file_sha256(step_path),
+            "gmsh": gmsh_version(),
+            "lc": lc, "nx": nx, "ny": ny, "nz": nz,
+        }
+        material.update(extra)
+        encoded = json.dumps(material, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + _ENTRY_SUFFIX)
+
+    def get(self, key):
+        """Return the cached domain for `key`, or None on a miss."""
+        path = self._entry_path(key)
+        try:
+            with open(path, "r") as f:
+                domain = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        # Refresh recency for LRU eviction
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return domain
+
+    def put(self, key, domain):
+        """Store `domain` under `key` atomically, then enforce the size bound."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(domain, f)
+            os.replace(tmp_path, self._entry_path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def _entries(self):
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            if not name.endswith(_ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue  # Removed concurrently by another process
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def size_bytes(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Remove least-recently-used entries until the cache fits in max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        return removed
+
+    def purge(self):
+        """Delete every cache entry. Returns the number of entries removed."""
+        removed = 0
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
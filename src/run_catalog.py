@@ -0,0 +1,307 @@
+# src/run_catalog.py
+
+"""
+Run Catalog Module
+
+Local SQLite index of what the pipeline has processed, so "is this model
+already done at this resolution?" and dashboard queries are single indexed
+lookups instead of directory and remote-folder crawls.
+
+- runs: one row per extraction (per sweep level), with the STEP SHA-256,
+  bounding box, nx/ny/nz, cell count, cache outcome and timings;
+- outputs: the domain JSON and sidecars written by a run, with upload status;
+- transfers: every download and upload done by the transfer scripts.
+
+Every call opens its own short-lived connection, so threads, batch workers
+and separate scripts can share one catalog file; WAL mode keeps readers from
+blocking the writer.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+
+DEFAULT_CATALOG_PATH = os.environ.get(
+    "GMSH_RUNNER_CATALOG",
+    os.path.join(os.path.expanduser("~"), ".cache", "gmsh_runner", "catalog.sqlite")
+)
+
+# Bump with a migration in _SCHEMA when the tables change
+CATALOG_VERSION = 1
+
+# Seconds a writer waits for another writer's lock
+_BUSY_TIMEOUT_S = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    recorded_at REAL NOT NULL,
+    source TEXT NOT NULL,
+    step_path TEXT NOT NULL,
+    step_sha256 TEXT,
+    step_bytes INTEGER,
+    status TEXT NOT NULL,
+    error TEXT,
+    lc REAL,
+    nx INTEGER, ny INTEGER, nz INTEGER,
+    cells INTEGER,
+    min_x REAL, max_x REAL, min_y REAL, max_y REAL, min_z REAL, max_z REAL,
+    cache TEXT,
+    wall_s REAL,
+    phases TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_step_sha256 ON runs (step_sha256);
+CREATE INDEX IF NOT EXISTS runs_dims ON runs (nx, ny, nz);
+CREATE TABLE IF NOT EXISTS outputs (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    sha256 TEXT,
+    upload_status TEXT NOT NULL DEFAULT 'pending',
+    remote_path TEXT,
+    uploaded_at REAL
+);
+CREATE INDEX IF NOT EXISTS outputs_run_id ON outputs (run_id);
+CREATE INDEX IF NOT EXISTS outputs_path ON outputs (path);
+CREATE TABLE IF NOT EXISTS transfers (
+    id INTEGER PRIMARY KEY,
+    recorded_at REAL NOT NULL,
+    direction TEXT NOT NULL,
+    local_path TEXT NOT NULL,
+    remote_path TEXT,
+    content_hash TEXT,
+    status TEXT NOT NULL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS transfers_local_path ON transfers (local_path);
+"""
+
+# Sidecar descriptors a domain JSON may reference
+SIDECAR_KINDS = ("geometry_mask", "signed_distance", "boundary_tags")
+
+_BBOX_KEYS = ("min_x", "max_x", "min_y", "max_y", "min_z", "max_z")
+
+
+class CatalogError(Exception):
+    """Raised when the catalog file cannot be opened or has an unknown layout."""
+
+
+class RunCatalog:
+    """SQLite catalog of runs, outputs and transfers at `path`."""
+
+    def __init__(self, path=DEFAULT_CATALOG_PATH):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with self._connect() as db:
+                version = db.execute("PRAGMA user_version").fetchone()[0]
+                if version not in (0, CATALOG_VERSION):
+                    raise CatalogError(f"Catalog {path} has layout version {version}, expected {CATALOG_VERSION}")
+                db.execute("PRAGMA journal_mode=WAL")
+                db.executescript(_SCHEMA)
+                db.execute(f"PRAGMA user_version = {CATALOG_VERSION}")
+        except (sqlite3.Error, OSError) as e:  # e.g. "file is not a database"
+            raise CatalogError(f"Cannot open catalog {path}: {e}") from e
+
+    def _connect(self):
+        try:
+            db = sqlite3.connect(self.path, timeout=_BUSY_TIMEOUT_S)
+            db.execute("PRAGMA foreign_keys = ON")
+        except sqlite3.Error as e:
+            raise CatalogError(f"Cannot open catalog {self.path}: {e}") from e
+        db.row_factory = sqlite3.Row
+        return _Connection(db)
+
+    # --- Recording --------------------------------------------------------------
+    def record_run(self, step_path, status, domain=None, output_path=None, step_sha256=None, lc=None,
+                   metrics=None, error=None, source="runner"):
+        """
+        Record one extraction and the files it wrote; returns the run id.
+        `domain` is the domain JSON dict (its sidecar descriptors are listed
+        as outputs beside `output_path`) and `metrics` a RunMetrics record.
+        """
+        metrics = metrics or {}
+        definition = (domain or {}).get("domain_definition") or {}
+        dims = [definition.get(axis) for axis in ("nx", "ny", "nz")]
+        cells = dims[0] * dims[1] * dims[2] if all(dims) else None
+        row = {
+            "recorded_at": time.time(),
+            "source": source,
+            "step_path": step_path,
+            "step_sha256": step_sha256 or metrics.get("step_sha256"),
+            "step_bytes": metrics.get("step_bytes"),
+            "status": status,
+            "error": error,
+            "lc": lc,
+            "nx": dims[0], "ny": dims[1], "nz": dims[2],
+            "cells": cells,
+            **{key: definition.get(key) for key in _BBOX_KEYS},
+            "cache": metrics.get("cache"),
+            "wall_s": metrics.get("total_wall_s", metrics.get("elapsed_s")),
+            "phases": json.dumps(metrics["phases"]) if metrics.get("phases") else None,
+        }
+        outputs = []
+        if output_path:
+            from src.result_cache import file_sha256
+            output_path = os.path.abspath(output_path)
+            outputs.append(("domain", output_path, file_sha256(output_path) if os.path.isfile(output_path) else None))
+            # Assembly parts carry their own mask sidecars beside the combined one
+            for owner in [domain or {}] + (domain or {}).get("parts", []):
+                for kind in SIDECAR_KINDS:
+                    descriptor = owner.get(kind)
+                    if descriptor:
+                        outputs.append((kind, os.path.join(os.path.dirname(output_path), descriptor["path"]),
+                                        descriptor.get("sha256")))
+
+        with self._connect() as db:
+            run_id = db.execute(
+                f"INSERT INTO runs ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})", list(row.values())
+            ).lastrowid
+            db.executemany("INSERT INTO outputs (run_id, kind, path, sha256) VALUES (?, ?, ?, ?)",
+                           [(run_id, kind, path, sha256) for kind, path, sha256 in outputs])
+        return run_id
+
+    def record_transfer(self, direction, local_path, remote_path=None, status="ok", content_hash=None, error=None):
+        """
+        Record a download or upload with status "ok", "unchanged" (skipped, the
+        remote copy already matches) or "failed". An upload also sets the
+        upload status of the catalogued outputs at `local_path`.
+        """
+        local_path = os.path.abspath(local_path)
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO transfers (recorded_at, direction, local_path, remote_path, content_hash, status, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), direction, local_path, remote_path, content_hash, status, error)
+            )
+            if direction == "upload":
+                uploaded = status in ("ok", "unchanged")
+                db.execute(
+                    "UPDATE outputs SET upload_status = ?, remote_path = ?, uploaded_at = ? WHERE path = ?",
+                    ("uploaded" if uploaded else "failed", remote_path, time.time() if uploaded else None, local_path)
+                )
+
+    # --- Queries ----------------------------------------------------------------
+    def find_runs(self, step_sha256=None, nx=None, ny=None, nz=None, lc=None, status=None, limit=50):
+        """Runs matching every given field, newest first, as dicts."""
+        filters = {"step_sha256": step_sha256, "nx": nx, "ny": ny, "nz": nz, "lc": lc, "status": status}
+        clauses = [(f"{column} = ?", value) for column, value in filters.items() if value is not None]
+        where = f"WHERE {' AND '.join(c for c, _ in clauses)}" if clauses else ""
+        with self._connect() as db:
+            rows = db.execute(f"SELECT * FROM runs {where} ORDER BY id DESC LIMIT ?",
+                              [v for _, v in clauses] + [int(limit)]).fetchall()
+        return [dict(row) for row in rows]
+
+    def completed_run(self, step_sha256, nx=None, ny=None, nz=None, lc=None):
+        """Newest successful run of this STEP content at this resolution, or None."""
+        runs = self.find_runs(step_sha256=step_sha256, nx=nx, ny=ny, nz=nz, lc=lc, status="ok", limit=1)
+        return runs[0] if runs else None
+
+    def outputs(self, run_id=None, upload_status=None, limit=100):
+        """Catalogued outputs, optionally of one run or with one upload status."""
+        filters = {"run_id": run_id, "upload_status": upload_status}
+        clauses = [(f"{column} = ?", value) for column, value in filters.items() if value is not None]
+        where = f"WHERE {' AND '.join(c for c, _ in clauses)}" if clauses else ""
+        with self._connect() as db:
+            rows = db.execute(f"SELECT * FROM outputs {where} ORDER BY id DESC LIMIT ?",
+                              [v for _, v in clauses] + [int(limit)]).fetchall()
+        return [dict(row) for row in rows]
+
+    def stats(self):
+        """Counts of runs by status, outputs by upload status and transfers by direction."""
+        with self._connect() as db:
+            return {
+                "runs": dict(db.execute("SELECT status, COUNT(*) FROM runs GROUP BY status").fetchall()),
+                "distinct_models": db.execute("SELECT COUNT(DISTINCT step_sha256) FROM runs").fetchone()[0],
+                "outputs": dict(db.execute("SELECT upload_status, COUNT(*) FROM outputs GROUP BY upload_status").fetchall()),
+                "transfers": dict(db.execute("SELECT direction, COUNT(*) FROM transfers GROUP BY direction").fetchall()),
+            }
+
+
+class _Connection:
+    """Commit-or-rollback context that also closes the connection."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.db.commit()
+            else:
+                self.db.rollback()
+        finally:
+            self.db.close()
+
+
+def _print_rows(rows, columns, as_json):
+    if as_json:
+        for row in rows:
+            print(json.dumps(row))
+        return
+    print("\t".join(columns))
+    for row in rows:
+        print("\t".join("" if row.get(c) is None else str(row[c]) for c in columns))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the run catalog of processed STEP models")
+    parser.add_argument("--catalog", type=str, default=DEFAULT_CATALOG_PATH, help="Catalog database path")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per row")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    runs = commands.add_parser("runs", help="List runs, newest first")
+    done = commands.add_parser("done", help="Exit 0 if the STEP file was already processed at this resolution")
+    for sub in (runs, done):
+        sub.add_argument("--step", type=str, help="STEP file to match by content hash")
+        sub.add_argument("--sha256", type=str, help="STEP content hash to match")
+        sub.add_argument("--lc", type=float, help="Grid resolution (model units)")
+        sub.add_argument("--nx", type=int)
+        sub.add_argument("--ny", type=int)
+        sub.add_argument("--nz", type=int)
+    runs.add_argument("--status", type=str, choices=["ok", "failed"])
+    runs.add_argument("--limit", type=int, default=50)
+    outputs = commands.add_parser("outputs", help="List outputs and their upload status")
+    outputs.add_argument("--run", type=int, help="Only the outputs of this run id")
+    outputs.add_argument("--upload-status", type=str, choices=["pending", "uploaded", "failed"])
+    outputs.add_argument("--limit", type=int, default=100)
+    commands.add_parser("stats", help="Counts by status")
+    args = parser.parse_args(argv)
+
+    catalog = RunCatalog(args.catalog)
+    if args.command in ("runs", "done"):
+        step_sha256 = args.sha256
+        if args.step:
+            from src.result_cache import file_sha256
+            step_sha256 = file_sha256(args.step)
+        if args.command == "done":
+            if not step_sha256:
+                parser.error("done needs --step or --sha256")
+            run = catalog.completed_run(step_sha256, nx=args.nx, ny=args.ny, nz=args.nz, lc=args.lc)
+            if run is None:
+                print("[INFO] Not processed at this resolution.")
+                raise SystemExit(1)
+            outputs = catalog.outputs(run_id=run["id"])
+            print(f"[INFO] Done in run {run['id']}: {', '.join(o['path'] for o in outputs) or 'no outputs recorded'}")
+            return
+        rows = catalog.find_runs(step_sha256=step_sha256, nx=args.nx, ny=args.ny, nz=args.nz, lc=args.lc,
+                                 status=args.status, limit=args.limit)
+        _print_rows(rows, ["id", "status", "step_path", "nx", "ny", "nz", "cells", "cache", "wall_s"], args.json)
+    elif args.command == "outputs":
+        rows = catalog.outputs(run_id=args.run, upload_status=args.upload_status, limit=args.limit)
+        _print_rows(rows, ["run_id", "kind", "upload_status", "path", "remote_path"], args.json)
+    else:
+        json.dump(catalog.stats(), sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# src/run_metrics.py
+
+"""
+Run Metrics Module
+
+Structured timing and resource figures for one extraction run. Phases record
+wall and CPU time (re-entering a phase accumulates), values hold facts such
+as file size, entity counts or cache outcome, and the finished record is
+emitted as one JSON line so many runs can be appended to the same file.
+"""
+
+import cProfile
+import json
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 2)
+
+
+class RunMetrics:
+    def __init__(self, **labels):
+        self.labels = labels
+        self.phases = {}
+        self.values = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            entry = self.phases.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0})
+            entry["wall_s"] += time.perf_counter() - wall
+            entry["cpu_s"] += time.process_time() - cpu
+
+    def set(self, name, value):
+        self.values[name] = value
+
+    def as_record(self):
+        return {
+            "timestamp": round(time.time(), 3),
+            **self.labels,
+            "phases": {
+                name: {key: round(seconds, 6) for key, seconds in entry.items()}
+                for name, entry in self.phases.items()
+            },
+            **self.values,
+            "total_wall_s": round(time.perf_counter() - self._started, 6),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+    def emit(self, path):
+        emit_record(self.as_record(), path)
+
+
+def emit_record(record, path):
+    """Append a metrics record as a JSON line to `path` ("-" for stdout)."""
+    line = json.dumps(record)
+    if path == "-":
+        print(line, flush=True)
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a") as f:
+        f.write(line + "\n")
+
+
+@contextmanager
+def profiled(dump_path=None):
+    """cProfile the block and dump pstats to `dump_path`; no-op without a path."""
+    if not dump_path:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(dump_path)
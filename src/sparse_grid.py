@@ -0,0 +1,190 @@
+# src/sparse_grid.py
+
+"""
+Sparse Grid Module
+
+Block-sparse ("brick map") storage for occupancy masks of large, mostly
+homogeneous domains. The cell grid is cut into cubic blocks of block_size
+cells per axis; a block table holds one int32 code per block:
+
+- FLUID_BLOCK (-1) / SOLID_BLOCK (-2): the whole block is fluid / solid;
+- k >= 0: the block is mixed and its cells are brick k, stored bit-packed
+  (little bit order, z-y-x within the block) in the bricks array.
+
+Only blocks near the geometry cost a brick; far-field blocks cost four
+bytes. The table gives O(1) lookup and any region expands to a dense array
+without touching the rest of the grid. On disk the mask is a single
+uncompressed .npz holding the table, the bricks and the grid shape.
+"""
+
+import os
+
+import numpy as np
+
+from src.mask_io import file_checksum, MaskFileError, AXIS_ORDER
+
+DEFAULT_BLOCK_SIZE = 8
+FLUID_BLOCK = -1
+SOLID_BLOCK = -2
+_BITORDER = "little"
+
+
+class SparseMask:
+    """
+    Occupancy mask of grid shape (nx, ny, nz) as a block table (bz, by, bx)
+    of int32 codes and bricks (n_mixed, block_size**3 // 8) of packed bits.
+    """
+
+    def __init__(self, shape, block_size, blocks, bricks):
+        if block_size < 2 or block_size & (block_size - 1):
+            raise ValueError(f"block_size must be a power of two >= 2, got {block_size}")
+        self.shape = tuple(int(n) for n in shape)
+        self.block_size = int(block_size)
+        self.blocks = np.asarray(blocks, dtype=np.int32)
+        self.bricks = np.asarray(bricks, dtype=np.uint8).reshape(-1, self.block_size ** 3 // 8)
+
+    # --- Construction ---------------------------------------------------------
+    @classmethod
+    def from_slabs(cls, shape, slabs, block_size=DEFAULT_BLOCK_SIZE):
+        """
+        Build from (k_start, k_stop, slab) tuples with slab shaped (k, ny, nx),
+        as yielded by iter_mask_slabs; only one block layer is held at a time.
+        """
+        nx, ny, nz = shape
+        b = block_size
+        bx, by, bz = -(-nx // b), -(-ny // b), -(-nz // b)
+        blocks = np.empty((bz, by, bx), dtype=np.int32)
+        # Cells of each block inside the grid (edge blocks are partial)
+        inside_y = np.minimum(b, ny - b * np.arange(by))
+        inside_x = np.minimum(b, nx - b * np.arange(bx))
+
+        bricks = []
+        n_bricks = 0
+        layer = np.zeros((b, by * b, bx * b), dtype=np.uint8)
+        filled = 0  # Cell layers of the current block layer received so far
+
+        def flush(kb, depth):
+            nonlocal n_bricks
+            cells = layer.reshape(b, by, b, bx, b).transpose(1, 3, 0, 2, 4)  # (by, bx, bz, by, bx) per block
+            counts = cells.sum(axis=(2, 3, 4), dtype=np.int64)
+            full = depth * inside_y[:, None] * inside_x[None, :]
+            codes = np.where(counts == 0, FLUID_BLOCK, np.where(counts == full, SOLID_BLOCK, 0))
+            mixed = codes == 0
+            m = int(mixed.sum())
+            codes[mixed] = n_bricks + np.arange(m)
+            if m:
+                bricks.append(np.packbits(cells[mixed].reshape(m, -1), axis=1, bitorder=_BITORDER))
+                n_bricks += m
+            blocks[kb] = codes
+
+        for k_start, k_stop, slab in slabs:
+            k = k_start
+            while k < k_stop:
+                kb, offset = divmod(k, b)
+                take = min(b - offset, k_stop - k)
+                layer[offset:offset + take, :ny, :nx] = slab[k - k_start:k - k_start + take]
+                filled = offset + take
+                k += take
+                if filled == b or k == nz:
+                    flush(kb, filled)
+                    layer[:] = 0
+                    filled = 0
+
+        empty = np.empty((0, b ** 3 // 8), dtype=np.uint8)
+        return cls(shape, b, blocks, np.concatenate(bricks) if bricks else empty)
+
+    @classmethod
+    def from_dense(cls, mask, block_size=DEFAULT_BLOCK_SIZE):
+        """Build from a dense (nz, ny, nx) uint8 mask."""
+        nz, ny, nx = mask.shape
+        return cls.from_slabs((nx, ny, nz), [(0, nz, mask)], block_size=block_size)
+
+    # --- Queries ----------------------------------------------------------------
+    def block_counts(self):
+        return {
+            "fluid": int(np.count_nonzero(self.blocks == FLUID_BLOCK)),
+            "solid": int(np.count_nonzero(self.blocks == SOLID_BLOCK)),
+            "mixed": int(len(self.bricks)),
+        }
+
+    def expand(self, x_range=None, y_range=None, z_range=None):
+        """
+        Dense uint8 array (k, j, i) of the cells in [start, stop) ranges per
+        axis (whole axis when omitted), decoded one block layer at a time.
+        """
+        nx, ny, nz = self.shape
+        b = self.block_size
+        (x0, x1), (y0, y1), (z0, z1) = (
+            _clip_range(r, n) for r, n in ((x_range, nx), (y_range, ny), (z_range, nz))
+        )
+        out = np.zeros((z1 - z0, y1 - y0, x1 - x0), dtype=np.uint8)
+        j = np.arange(y0, y1)
+        i = np.arange(x0, x1)
+        for kb in range(z0 // b, -(-z1 // b)):
+            ks = np.arange(max(z0, kb * b), min(z1, kb * b + b))
+            if ks.size == 0:
+                continue
+            codes = self.blocks[kb][np.ix_(j // b, i // b)]
+            rows = ks - z0
+            out[rows[0]:rows[-1] + 1, codes == SOLID_BLOCK] = 1
+            jj, ii = np.nonzero(codes >= 0)
+            if jj.size:
+                bit = ((ks[:, None] % b) * b + (j[jj] % b)[None, :]) * b + (i[ii] % b)[None, :]
+                packed = self.bricks[codes[jj, ii][None, :], bit >> 3]
+                out[rows[:, None], jj[None, :], ii[None, :]] = (packed >> (bit & 7).astype(np.uint8)) & 1
+        return out
+
+    def solid_cells(self):
+        """Solid cells inside the grid, counted without expanding the mask."""
+        nx, ny, nz = self.shape
+        b = self.block_size
+        kb, jb, ib = np.nonzero(self.blocks == SOLID_BLOCK)
+        cells = ((np.minimum(b, nz - b * kb)) * (np.minimum(b, ny - b * jb)) * (np.minimum(b, nx - b * ib))).sum()
+        # Cells past the grid edge are stored as fluid, so brick bits count as-is
+        bits = np.unpackbits(self.bricks, axis=1, bitorder=_BITORDER).sum(dtype=np.int64) if len(self.bricks) else 0
+        return int(cells + bits)
+
+    # --- Storage ----------------------------------------------------------------
+    def save(self, path):
+        """Write the .npz sidecar and return its descriptor (without the path)."""
+        nx, ny, nz = self.shape
+        with open(path, "wb") as f:
+            np.savez(f, blocks=self.blocks, bricks=self.bricks,
+                     shape=np.array(self.shape, dtype=np.int64), block_size=np.array(self.block_size))
+        return {
+            "format": "npz",
+            "encoding": "blocks",
+            "shape": [nz, ny, nx],
+            "dtype": "uint8",
+            "axis_order": AXIS_ORDER,
+            "block_size": self.block_size,
+            "block_counts": self.block_counts(),
+            "bitorder": _BITORDER,
+            "sha256": file_checksum(path),
+            "solid_cells": self.solid_cells(),
+        }
+
+
+def _clip_range(bounds, n):
+    if bounds is None:
+        return 0, n
+    start, stop = bounds
+    start, stop = max(0, int(start)), min(n, int(stop))
+    return start, max(start, stop)
+
+
+def load_sparse_mask(path, shape=None):
+    """Read a block-sparse mask .npz; `shape` (nz, ny, nx) is checked when given."""
+    if not os.path.isfile(path):
+        raise MaskFileError(f"Missing mask file: {path}")
+    with np.load(path) as data:
+        mask = SparseMask(tuple(data["shape"]), int(data["block_size"]), data["blocks"], data["bricks"])
+    nx, ny, nz = mask.shape
+    b = mask.block_size
+    expected_blocks = (-(-nz // b), -(-ny // b), -(-nx // b))
+    if mask.blocks.shape != expected_blocks or (shape is not None and list(shape) != [nz, ny, nx]):
+        raise MaskFileError(f"Mask file {path} has block table {mask.blocks.shape} for grid {[nz, ny, nx]}, "
+                            f"expected {expected_blocks} for {list(shape) if shape is not None else [nz, ny, nx]}")
+    if mask.blocks.max(initial=FLUID_BLOCK) >= len(mask.bricks):
+        raise MaskFileError(f"Mask file {path} references bricks beyond the {len(mask.bricks)} stored.")
+    return mask
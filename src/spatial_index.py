@@ -0,0 +1,421 @@
+# src/spatial_index.py
+
+"""
+Spatial Index Module
+
+A uniform-bin index over the tessellated surface triangles of a model, built
+once and queried with whole batches of points:
+
+- nearest(points): distance to, index of and closest point on the nearest
+  triangle, optionally limited to a search radius (narrow bands);
+- contains(points): inside/outside of the closed surface by +z ray parity;
+- entities_overlapping(boxes): per-entity bounding-box overlap tests.
+
+Triangles are registered in every bin their bounding box touches, stored in
+CSR form (bin_start / bin_triangles), with a coarse occupancy grid on top so
+searches skip empty space in blocks. A nearest query first takes an estimate
+from the closest occupied bin, then visits the occupied bins that could still
+beat it nearest first, pruning bins and triangles by box distance as the
+estimate tightens. Points far from a large convex patch still see many nearly
+equidistant triangles; pass max_distance for narrow-band work.
+
+The index only depends on the geometry, so one instance serves every grid
+resolution requested for the model.
+"""
+
+import numpy as np
+
+# Average triangle references per bin the bin grid is sized for
+DEFAULT_TRIANGLES_PER_BIN = 8
+
+# Upper bound on bins per triangle (empty interior bins cost memory only)
+MAX_BIN_RATIO = 8
+
+# Upper bound on bins along one axis (bounds memory on long, thin models)
+MAX_BINS_PER_AXIS = 256
+
+# Points processed together per query batch (bounds candidate-pair arrays)
+DEFAULT_POINT_BATCH = 1 << 12
+
+# Bins examined per point in the first round of a nearest query (doubles each round)
+_BINS_PER_ROUND = 8
+
+# Bins per axis grouped into one coarse occupancy block
+_COARSE_FACTOR = 4
+
+# Rays are nudged off the query points by this fraction of a bin so they do
+# not graze shared edges of axis-aligned tessellations
+_RAY_JITTER = (7.3e-7, 3.1e-7)
+
+
+def _expand(counts):
+    """(owner, offset) pairs for a ragged expansion with the given counts."""
+    total = int(counts.sum())
+    owner = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owner, offsets
+
+
+def _box_distance2(points, lo, hi):
+    """Squared distance from each point to the matching axis-aligned box."""
+    gap = np.maximum(np.maximum(lo - points, points - hi), 0.0)
+    return np.einsum("ij,ij->i", gap, gap)
+
+
+def _safe_divide(num, den):
+    return np.divide(num, den, out=np.zeros_like(num), where=den != 0)
+
+
+def closest_points_on_triangles(p, a, b, c):
+    """
+    Closest point on each triangle (a, b, c) to the matching point p, all
+    (K, 3) arrays. Vectorized Voronoi-region method (Ericson, RTCD 5.1.5).
+    """
+    def dot(u, v):
+        return np.einsum("ij,ij->i", u, v)
+
+    ab, ac, ap = b - a, c - a, p - a
+    d1, d2 = dot(ab, ap), dot(ac, ap)
+    bp = p - b
+    d3, d4 = dot(ab, bp), dot(ac, bp)
+    cp = p - c
+    d5, d6 = dot(ab, cp), dot(ac, cp)
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+
+    denom = va + vb + vc
+    result = a + ab * _safe_divide(vb, denom)[:, None] + ac * _safe_divide(vc, denom)[:, None]
+
+    # Later assignments take precedence, mirroring the early returns of the scalar form
+    region = (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0)
+    w = _safe_divide(d4 - d3, (d4 - d3) + (d5 - d6))
+    result = np.where(region[:, None], b + (c - b) * w[:, None], result)
+    region = (vb <= 0) & (d2 >= 0) & (d6 <= 0)
+    result = np.where(region[:, None], a + ac * _safe_divide(d2, d2 - d6)[:, None], result)
+    region = (d6 >= 0) & (d5 <= d6)
+    result = np.where(region[:, None], c, result)
+    region = (vc <= 0) & (d1 >= 0) & (d3 <= 0)
+    result = np.where(region[:, None], a + ab * _safe_divide(d1, d1 - d3)[:, None], result)
+    region = (d3 >= 0) & (d4 <= d3)
+    result = np.where(region[:, None], b, result)
+    region = (d1 <= 0) & (d2 <= 0)
+    return np.where(region[:, None], a, result)
+
+
+class SurfaceIndex:
+    """
+    Uniform-bin index over a triangle soup.
+
+    vertices (N, 3) float, triangles (M, 3) int; triangle_entities (M,) and
+    entity_tags (E,) / entity_boxes (E, 6) are optional and only carried
+    through for callers that label results by model entity.
+    """
+
+    def __init__(self, vertices, triangles, triangle_entities=None, entity_tags=None, entity_boxes=None,
+                 triangles_per_bin=DEFAULT_TRIANGLES_PER_BIN):
+        self.vertices = np.ascontiguousarray(vertices, dtype=np.float64)
+        self.triangles = np.ascontiguousarray(triangles, dtype=np.int64).reshape(-1, 3)
+        self.triangle_entities = None if triangle_entities is None else np.asarray(triangle_entities)
+        self.entity_tags = np.empty(0, dtype=np.int32) if entity_tags is None else np.asarray(entity_tags)
+        self.entity_boxes = np.empty((0, 6)) if entity_boxes is None else np.asarray(entity_boxes, dtype=np.float64)
+
+        corners = self.vertices[self.triangles]  # (M, 3, 3)
+        self.tri_lo = corners.min(axis=1) if len(corners) else np.zeros((0, 3))
+        self.tri_hi = corners.max(axis=1) if len(corners) else np.zeros((0, 3))
+        self._build_bins(triangles_per_bin)
+        self._dilated = {}  # Occupancy dilated by a bin radius, for narrow-band queries
+
+    # --- Construction ---------------------------------------------------------
+    def _build_bins(self, triangles_per_bin):
+        n = len(self.triangles)
+        if n == 0:
+            self.origin = np.zeros(3)
+            self.bin_size = np.ones(3)
+            self.shape = np.ones(3, dtype=np.int64)
+            self.bin_start = np.zeros(2, dtype=np.int64)
+            self.bin_triangles = np.empty(0, dtype=np.int64)
+            self.bin_counts = np.zeros(1, dtype=np.int64)
+            return
+
+        lo, hi = self.tri_lo.min(axis=0), self.tri_hi.max(axis=0)
+        extent = hi - lo
+        floor = max(float(extent.max()), 1.0) * 1e-9
+        extent = np.maximum(extent, floor)  # flat models still get a finite bin depth
+        # Triangles only occupy the bins along the surface, so size bins from
+        # the triangle area; the volume term caps the bin count at BIN_RATIO * n
+        v = self.vertices[self.triangles]
+        mean_area = 0.5 * np.linalg.norm(np.cross(v[:, 1] - v[:, 0], v[:, 2] - v[:, 0]), axis=1).mean()
+        edge = max(np.sqrt(triangles_per_bin * mean_area), (np.prod(extent) / (MAX_BIN_RATIO * n)) ** (1.0 / 3.0))
+        self.shape = np.clip(np.ceil(extent / edge), 1, MAX_BINS_PER_AXIS).astype(np.int64)
+        self.origin = lo
+        self.bin_size = extent / self.shape
+
+        owner, cells = self._box_cells(self._bin_coords(self.tri_lo), self._bin_coords(self.tri_hi))
+        flat = self._flat(cells)
+        order = np.argsort(flat, kind="stable")
+        self.bin_triangles = owner[order]
+        self.bin_counts = np.bincount(flat, minlength=int(self.shape.prod()))
+        self.bin_start = np.concatenate([[0], np.cumsum(self.bin_counts)]).astype(np.int64)
+
+        # Coarse occupancy lets far-away queries skip empty space in blocks
+        c = _COARSE_FACTOR
+        self.coarse_shape = -(-self.shape // c)
+        occupied = np.zeros(tuple(self.coarse_shape * c), dtype=bool)
+        occupied[:self.shape[0], :self.shape[1], :self.shape[2]] = (self.bin_counts > 0).reshape(tuple(self.shape))
+        self.coarse_occupied = occupied.reshape(
+            self.coarse_shape[0], c, self.coarse_shape[1], c, self.coarse_shape[2], c
+        ).any(axis=(1, 3, 5)).ravel()
+
+    def _bin_coords(self, points):
+        coords = np.floor((np.asarray(points, dtype=np.float64) - self.origin) / self.bin_size).astype(np.int64)
+        return np.clip(coords, 0, self.shape - 1)
+
+    def _flat(self, coords):
+        return (coords[:, 0] * self.shape[1] + coords[:, 1]) * self.shape[2] + coords[:, 2]
+
+    @staticmethod
+    def _box_cells(lo, hi):
+        """(owner, cell) pairs for every bin of the inclusive coordinate boxes lo..hi."""
+        span = hi - lo + 1
+        owner, offset = _expand(span.prod(axis=1))
+        sy, sz = span[owner, 1], span[owner, 2]
+        return owner, lo[owner] + np.stack([offset // (sy * sz), (offset // sz) % sy, offset % sz], axis=1)
+
+    def _candidates(self, owners, flat_bins):
+        """Expand (owner, bin) pairs into (owner, triangle) pairs."""
+        start = self.bin_start[flat_bins]
+        counts = self.bin_start[flat_bins + 1] - start
+        pair, offset = _expand(counts)
+        return owners[pair], self.bin_triangles[start[pair] + offset]
+
+    @staticmethod
+    def _shell(radius):
+        """Integer offsets with Chebyshev norm exactly `radius`."""
+        r = np.arange(-radius, radius + 1)
+        cube = np.stack(np.meshgrid(r, r, r, indexing="ij"), axis=-1).reshape(-1, 3)
+        return cube[np.abs(cube).max(axis=1) == radius]
+
+    # --- Queries ----------------------------------------------------------------
+    def nearest(self, points, max_distance=None, point_batch=DEFAULT_POINT_BATCH):
+        """
+        Nearest surface triangle for every point.
+
+        Returns (distance (P,), triangle (P,) int64, closest (P, 3)). Points with
+        no triangle within `max_distance` get inf, -1 and NaN.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        distance = np.full(len(points), np.inf)
+        triangle = np.full(len(points), -1, dtype=np.int64)
+        closest = np.full((len(points), 3), np.nan)
+        if len(self.triangles) == 0:
+            return distance, triangle, closest
+
+        # Narrow-band queries skip points with no occupied bin in reach up front
+        candidates = np.arange(len(points)) if max_distance is None else np.flatnonzero(
+            self._within_reach(points, max_distance))
+        for start in range(0, len(candidates), point_batch):
+            ids = candidates[start:start + point_batch]
+            d2, tri, cp = self._nearest_batch(points[ids], max_distance)
+            distance[ids], triangle[ids], closest[ids] = np.sqrt(d2), tri, cp
+
+        if max_distance is not None:
+            far = distance > max_distance
+            distance[far], triangle[far], closest[far] = np.inf, -1, np.nan
+        return distance, triangle, closest
+
+    def _within_reach(self, points, max_distance):
+        """False for points that certainly have no triangle within max_distance."""
+        radius = int(np.ceil(max_distance / float(self.bin_size.min())))
+        dilated = self._dilated.get(radius)
+        if dilated is None:
+            # Box dilation of the occupied bins, one axis at a time via prefix sums
+            grid = (self.bin_counts > 0).reshape(tuple(self.shape))
+            for axis in range(3):
+                n = grid.shape[axis]
+                prefix = np.concatenate([np.zeros_like(np.take(grid, [0], axis=axis), dtype=np.int64),
+                                         np.cumsum(grid, axis=axis, dtype=np.int64)], axis=axis)
+                idx = np.arange(n)
+                grid = (np.take(prefix, np.minimum(idx + radius, n - 1) + 1, axis=axis)
+                        - np.take(prefix, np.maximum(idx - radius, 0), axis=axis)) > 0
+            dilated = self._dilated[radius] = grid.ravel()
+        top = self.origin + self.bin_size * self.shape
+        outside = _box_distance2(points, np.broadcast_to(self.origin, points.shape), np.broadcast_to(top, points.shape))
+        return dilated[self._flat(self._bin_coords(points))] & (outside <= max_distance * max_distance)
+
+    def _evaluate(self, points, pid, tri, best_d2, best_tri, best_cp):
+        """Exact distances for (point, triangle) pairs; keeps the best per point in place."""
+        corners = self.vertices[self.triangles[tri]]
+        cp = closest_points_on_triangles(points[pid], corners[:, 0], corners[:, 1], corners[:, 2])
+        d2 = np.einsum("ij,ij->i", cp - points[pid], cp - points[pid])
+        order = np.lexsort((d2, pid))
+        winners = order[np.unique(pid[order], return_index=True)[1]]
+        winners = winners[d2[winners] < best_d2[pid[winners]]]
+        w_pid = pid[winners]
+        best_d2[w_pid], best_tri[w_pid], best_cp[w_pid] = d2[winners], tri[winners], cp[winners]
+
+    def _seed(self, points, home, max_radius, best_d2, best_tri, best_cp):
+        """
+        First estimate per point from the triangles of the closest occupied
+        bin in the nearest occupied shell; points with none in range keep inf.
+        """
+        active = np.arange(len(points))
+        radius = 0
+        while active.size and radius <= max_radius:
+            shell = self._shell(radius)
+            cells = (home[active][:, None, :] + shell[None, :, :]).reshape(-1, 3)
+            owners = np.repeat(active, len(shell))
+            keep = np.all((cells >= 0) & (cells < self.shape), axis=1)
+            cells, owners = cells[keep], owners[keep]
+            occupied = self.bin_counts[self._flat(cells)] > 0
+            cells, owners = cells[occupied], owners[occupied]
+            if owners.size:
+                lo = self.origin + cells * self.bin_size
+                lb = _box_distance2(points[owners], lo, lo + self.bin_size)
+                order = np.lexsort((lb, owners))
+                closest = order[np.unique(owners[order], return_index=True)[1]]
+                pid, tri = self._candidates(owners[closest], self._flat(cells[closest]))
+                self._evaluate(points, pid, tri, best_d2, best_tri, best_cp)
+                found = np.zeros(len(points), dtype=bool)
+                found[owners] = True
+                active = active[~found[active]]
+            radius += 1
+
+    def _nearest_batch(self, points, max_distance):
+        best_d2 = np.full(len(points), np.inf)
+        best_tri = np.full(len(points), -1, dtype=np.int64)
+        best_cp = np.full((len(points), 3), np.nan)
+        home = self._bin_coords(points)
+        step = float(self.bin_size.min())
+        max_radius = int(self.shape.max())
+        if max_distance is not None:
+            max_radius = min(max_radius, int(np.ceil(max_distance / step)) + 1)
+        self._seed(points, home, max_radius, best_d2, best_tri, best_cp)
+        bound = best_d2.copy()
+        if max_distance is not None:
+            bound = np.minimum(bound, max_distance * max_distance)
+        reachable = np.flatnonzero(np.isfinite(bound))
+        if reachable.size == 0:
+            return best_d2, best_tri, best_cp
+
+        # Occupied bins that can still hold something closer than the estimate,
+        # found through the coarse blocks first
+        c = _COARSE_FACTOR
+        radius = np.sqrt(bound)
+        reach = np.ceil(radius[reachable] / (c * step)).astype(np.int64)[:, None]
+        block = home[reachable] // c
+        owner, blocks = self._box_cells(np.clip(block - reach, 0, self.coarse_shape - 1),
+                                        np.clip(block + reach, 0, self.coarse_shape - 1))
+        pid = reachable[owner]
+        flat = (blocks[:, 0] * self.coarse_shape[1] + blocks[:, 1]) * self.coarse_shape[2] + blocks[:, 2]
+        keep = self.coarse_occupied[flat]
+        pid, blocks = pid[keep], blocks[keep]
+        lo = self.origin + blocks * c * self.bin_size
+        keep = _box_distance2(points[pid], lo, lo + c * self.bin_size) <= bound[pid]
+        pid, blocks = pid[keep], blocks[keep]
+
+        reach = np.ceil(radius[pid] / step).astype(np.int64)[:, None]
+        lo = np.maximum(blocks * c, home[pid] - reach)
+        hi = np.minimum(np.minimum(blocks * c + c - 1, self.shape - 1), home[pid] + reach)
+        keep = np.all(lo <= hi, axis=1)
+        owner, cells = self._box_cells(lo[keep], hi[keep])
+        pid = pid[keep][owner]
+        flat = self._flat(cells)
+        occupied = self.bin_counts[flat] > 0
+        pid, flat, cells = pid[occupied], flat[occupied], cells[occupied]
+        lo = self.origin + cells * self.bin_size
+        lb = _box_distance2(points[pid], lo, lo + self.bin_size)
+        keep = lb <= bound[pid]
+        pid, flat, lb = pid[keep], flat[keep], lb[keep]
+
+        # Visit each point's bins nearest first in growing rounds and drop the
+        # rest as soon as the distance found so far rules them out
+        order = np.lexsort((lb, pid))
+        pid, flat, lb = pid[order], flat[order], lb[order]
+        rank = np.arange(len(pid)) - np.searchsorted(pid, pid)
+        first, width = 0, _BINS_PER_ROUND
+        while pid.size:
+            now = rank < first + width
+            t_pid, t_tri = self._candidates(pid[now], flat[now])
+            near = _box_distance2(points[t_pid], self.tri_lo[t_tri], self.tri_hi[t_tri]) <= bound[t_pid]
+            if near.any():
+                # Triangles spanning several of this round's bins are listed once per bin
+                pair = np.unique(t_pid[near] * len(self.triangles) + t_tri[near])
+                self._evaluate(points, pair // len(self.triangles), pair % len(self.triangles),
+                               best_d2, best_tri, best_cp)
+                np.minimum(bound, best_d2, out=bound)
+            later = ~now & (lb <= bound[pid])
+            pid, flat, lb, rank = pid[later], flat[later], lb[later], rank[later]
+            first, width = first + width, width * 2
+        return best_d2, best_tri, best_cp
+
+    def contains(self, points, point_batch=DEFAULT_POINT_BATCH):
+        """True for points inside the closed surface (+z ray parity)."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        inside = np.zeros(len(points), dtype=bool)
+        if len(self.triangles) == 0:
+            return inside
+        for start in range(0, len(points), point_batch):
+            stop = min(len(points), start + point_batch)
+            inside[start:stop] = self._contains_batch(points[start:stop])
+        return inside
+
+    def _contains_batch(self, points):
+        px = points[:, 0] + _RAY_JITTER[0] * self.bin_size[0]
+        py = points[:, 1] + _RAY_JITTER[1] * self.bin_size[1]
+        top = self.origin + self.bin_size * self.shape
+        in_footprint = ((px >= self.origin[0]) & (px <= top[0]) & (py >= self.origin[1]) & (py <= top[1])
+                        & (points[:, 2] <= top[2]))
+        candidates = np.flatnonzero(in_footprint)
+        home = self._bin_coords(np.stack([px, py, points[:, 2]], axis=1)[candidates])
+
+        # Every bin of the point's column from its own bin upwards
+        owner, offset = _expand(self.shape[2] - home[:, 2])
+        cells = home[owner] + np.stack([np.zeros_like(offset), np.zeros_like(offset), offset], axis=1)
+        pid, tri = self._candidates(candidates[owner], self._flat(cells))
+
+        # A triangle spanning several z-bins is listed once per bin
+        pair = np.unique(pid * len(self.triangles) + tri)
+        pid, tri = pair // len(self.triangles), pair % len(self.triangles)
+        corners = self.vertices[self.triangles[tri]]
+        a, b, c = corners[:, 0], corners[:, 1], corners[:, 2]
+        det = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (c[:, 0] - a[:, 0]) * (b[:, 1] - a[:, 1])
+        usable = np.abs(det) > 1e-300
+        inv = _safe_divide(np.ones_like(det), np.where(usable, det, 0.0))
+        qx, qy = px[pid] - a[:, 0], py[pid] - a[:, 1]
+        u = (qx * (c[:, 1] - a[:, 1]) - (c[:, 0] - a[:, 0]) * qy) * inv
+        v = ((b[:, 0] - a[:, 0]) * qy - qx * (b[:, 1] - a[:, 1])) * inv
+        hit = usable & (u >= 0.0) & (v >= 0.0) & (u + v <= 1.0)
+        z_hit = a[:, 2] + u * (b[:, 2] - a[:, 2]) + v * (c[:, 2] - a[:, 2])
+        hit &= z_hit > points[pid, 2]
+        return (np.bincount(pid[hit], minlength=len(points)) % 2).astype(bool)
+
+    def entities_overlapping(self, boxes):
+        """
+        Overlap of query boxes (Q, 6) as (min_x, min_y, min_z, max_x, max_y,
+        max_z) with the entity boxes: a (Q, E) bool matrix, or (E,) for one box.
+        """
+        boxes = np.asarray(boxes, dtype=np.float64)
+        single = boxes.ndim == 1
+        boxes = boxes.reshape(-1, 6)
+        e = self.entity_boxes
+        overlap = np.all(
+            (boxes[:, None, :3] <= e[None, :, 3:]) & (boxes[:, None, 3:] >= e[None, :, :3]), axis=2
+        )
+        return overlap[0] if single else overlap
+
+
+def build_surface_index(mesh_size=None, debug=False):
+    """
+    Tessellate the model in the current Gmsh session and index it, together
+    with the bounding boxes of its surface entities.
+    """
+    from src.surface_tessellation import tessellate_surfaces, entity_bounding_boxes
+
+    vertices, triangles, triangle_entities = tessellate_surfaces(mesh_size=mesh_size, debug=debug)
+    entity_tags, entity_boxes = entity_bounding_boxes(dim=2)
+    index = SurfaceIndex(vertices, triangles, triangle_entities, entity_tags, entity_boxes)
+    if debug:
+        print(f"[DEBUG] Surface index: {len(triangles)} triangles in {tuple(int(n) for n in index.shape)} bins, "
+              f"{len(entity_tags)} entities.")
+    return index
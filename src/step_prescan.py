@@ -0,0 +1,298 @@
+# src/step_prescan.py
+
+"""
+STEP Pre-scan Module
+
+Computes a conservative bounding box straight from STEP (ISO 10303-21) text
+without loading the model through OpenCASCADE. The file is streamed in
+fixed-size blocks and split into entity statements; every 3D
+CARTESIAN_POINT widens the box, and circles, ellipses, spheres and tori are
+padded by their radii around their placement origin (in the plane normal to
+the placement axis where applicable) so curved extents that bulge past their
+control points stay inside the box. Coordinates are scaled
+from the file's length unit to the unit OpenCASCADE converts STEP data to
+on import (millimetres by default), matching gmsh.model.getBoundingBox.
+
+Memory is bounded by the number of curved primitives and placements, not by
+the number of points or the size of the file.
+"""
+
+import argparse
+import json
+import math
+import re
+import sys
+
+READ_BLOCK_SIZE = 1024 * 1024
+DEFAULT_TARGET_UNIT = "MM"
+DEFAULT_TOLERANCE = 0.01
+
+# Length units in metres
+_SI_PREFIXES = {
+    "$": 1.0, "EXA.": 1e18, "PETA.": 1e15, "TERA.": 1e12, "GIGA.": 1e9,
+    "MEGA.": 1e6, "KILO.": 1e3, "HECTO.": 1e2, "DECA.": 1e1, "DECI.": 1e-1,
+    "CENTI.": 1e-2, "MILLI.": 1e-3, "MICRO.": 1e-6, "NANO.": 1e-9,
+    "PICO.": 1e-12,
+}
+_CONVERSION_UNITS = {
+    "INCH": 0.0254, "FOOT": 0.3048, "MIL": 0.0000254, "YARD": 0.9144,
+    "MILE": 1609.344, "MILLIMETRE": 1e-3, "MILLIMETER": 1e-3,
+    "CENTIMETRE": 1e-2, "CENTIMETER": 1e-2, "METRE": 1.0, "METER": 1.0,
+    "MICRON": 1e-6, "KILOMETRE": 1e3, "KILOMETER": 1e3,
+}
+_TARGET_UNITS = {"M": 1.0, "CM": 1e-2, "MM": 1e-3, "UM": 1e-6, "IN": 0.0254, "FT": 0.3048}
+
+# A statement ends at ';' followed by the next entity or the end of the section.
+# Splitting on this lookahead keeps the scan in C-level regex code and avoids a
+# per-character string-literal state machine.
+_STATEMENT_END = re.compile(r";\s*(?=#\d|ENDSEC|END-ISO)")
+_ENTITY = re.compile(r"#(\d+)\s*=\s*([A-Z0-9_]*)\s*\(", re.S)
+_STRING = r"'(?:[^']|'')*'"
+_POINT_COORDS = re.compile(r"CARTESIAN_POINT\s*\(\s*" + _STRING + r"\s*,\s*\(([^)]*)\)")
+_DIRECTION_COORDS = re.compile(r"DIRECTION\s*\(\s*" + _STRING + r"\s*,\s*\(([^)]*)\)")
+_REFS = re.compile(r"#(\d+)")
+_REALS = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_SI_LENGTH = re.compile(r"SI_UNIT\s*\(\s*(\$|\.[A-Z]+\.)\s*,\s*\.METRE\.\s*\)")
+_CONVERSION_LENGTH = re.compile(r"CONVERSION_BASED_UNIT\s*\(\s*'([^']*)'")
+
+# Curved primitives bound their extent around the placement origin by an
+# in-plane radius (perpendicular to the placement axis) plus an isotropic one:
+# name -> (placement argument, in-plane radius arguments, isotropic radius arguments)
+_PADDED_ENTITIES = {
+    "CIRCLE": (0, (1,), ()),
+    "ELLIPSE": (0, (1, 2), ()),
+    "SPHERICAL_SURFACE": (0, (), (1,)),
+    "TOROIDAL_SURFACE": (0, (1,), (2,)),
+}
+
+
+class StepPrescanError(Exception):
+    """Raised when a STEP file cannot yield a bounding box by pre-scan."""
+
+
+def iter_statements(step_path, block_size=READ_BLOCK_SIZE):
+    """Yield raw entity statements (without the trailing ';') from a STEP file."""
+    in_data = False
+    tail = ""
+    with open(step_path, "r", encoding="latin-1") as f:
+        for block in iter(lambda: f.read(block_size), ""):
+            buffer = tail + block
+            start = 0
+            for match in _STATEMENT_END.finditer(buffer):
+                statement = buffer[start:match.start()].strip()
+                start = match.end()
+                if not in_data:
+                    # Header entities are skipped until the DATA section opens
+                    if statement.endswith("DATA"):
+                        in_data = True
+                    continue
+                yield statement
+            tail = buffer[start:]
+    tail = tail.strip().rstrip(";").strip()
+    if in_data and tail.startswith("#"):
+        yield tail
+
+
+def _split_args(body):
+    """Split the top-level arguments of an entity body like "'',#12,0.75"."""
+    args, depth, current, in_string = [], 0, [], False
+    for ch in body:
+        if ch == "'":
+            in_string = not in_string
+        elif not in_string:
+            if ch == "(":
+                depth += 1
+            elif ch == ")":
+                depth -= 1
+            elif ch == "," and depth == 0:
+                args.append("".join(current).strip())
+                current = []
+                continue
+        current.append(ch)
+    args.append("".join(current).strip())
+    return args
+
+
+def _length_unit_scale(statement):
+    """Return metres per file unit if the statement defines a length unit."""
+    if "LENGTH_UNIT" not in statement:
+        return None
+    conversion = _CONVERSION_LENGTH.search(statement)
+    if conversion:
+        return _CONVERSION_UNITS.get(conversion.group(1).strip().upper())
+    si = _SI_LENGTH.search(statement)
+    if si:
+        return _SI_PREFIXES.get(si.group(1).lstrip("."))  # ".MILLI." -> "MILLI."
+    return None
+
+
+def _scan(step_path, wanted_points=None):
+    """
+    One streaming pass over the file. Without `wanted_points` this collects
+    the point box, curve padding and unit context; with it, it only returns
+    the coordinates of the requested CARTESIAN_POINT and DIRECTION ids.
+    """
+    lo = [float("inf")] * 3
+    hi = [float("-inf")] * 3
+    points = 0
+    pads = {}
+    placements = {}
+    unit_scales = []
+    found = {}
+
+    for statement in iter_statements(step_path):
+        entity = _ENTITY.match(statement)
+        if entity is None:
+            # Complex (multi-type) instances, e.g. unit definitions
+            if wanted_points is None:
+                scale = _length_unit_scale(statement)
+                if scale is not None:
+                    unit_scales.append(scale)
+            continue
+
+        name = entity.group(2)
+        if name == "DIRECTION":
+            if wanted_points is not None and int(entity.group(1)) in wanted_points:
+                coords = _DIRECTION_COORDS.search(statement)
+                if coords is not None:
+                    values = coords.group(1).split(",")
+                    if len(values) == 3:
+                        found[int(entity.group(1))] = [float(v) for v in values]
+        elif name == "CARTESIAN_POINT":
+            coords = _POINT_COORDS.search(statement)
+            if coords is None:
+                continue
+            values = coords.group(1).split(",")
+            if len(values) != 3:
+                continue  # 2D points live in parameter space
+            if wanted_points is not None:
+                entity_id = int(entity.group(1))
+                if entity_id in wanted_points:
+                    found[entity_id] = [float(v) for v in values]
+                continue
+            x, y, z = float(values[0]), float(values[1]), float(values[2])
+            points += 1
+            if x < lo[0]: lo[0] = x
+            if x > hi[0]: hi[0] = x
+            if y < lo[1]: lo[1] = y
+            if y > hi[1]: hi[1] = y
+            if z < lo[2]: lo[2] = z
+            if z > hi[2]: hi[2] = z
+        elif wanted_points is not None:
+            continue
+        elif name == "AXIS2_PLACEMENT_3D":
+            args = _split_args(statement[entity.end():statement.rfind(")")])[1:]
+            if args and args[0].startswith("#"):
+                axis = args[1] if len(args) > 1 and args[1].startswith("#") else None
+                placements[int(entity.group(1))] = (
+                    int(args[0][1:]), int(axis[1:]) if axis else None
+                )
+        elif name in _PADDED_ENTITIES:
+            placement_index, planar_indices, isotropic_indices = _PADDED_ENTITIES[name]
+            args = _split_args(statement[entity.end():statement.rfind(")")])[1:]
+            try:
+                placement = int(args[placement_index].lstrip("#"))
+                planar = max([float(_REALS.match(args[i]).group(0)) for i in planar_indices], default=0.0)
+                isotropic = sum(float(_REALS.match(args[i]).group(0)) for i in isotropic_indices)
+            except (IndexError, ValueError, AttributeError):
+                continue
+            previous = pads.get(placement, (0.0, 0.0))
+            pads[placement] = (max(planar, previous[0]), max(isotropic, previous[1]))
+        elif "LENGTH_UNIT" in statement:
+            scale = _length_unit_scale(statement)
+            if scale is not None:
+                unit_scales.append(scale)
+
+    if wanted_points is not None:
+        return found
+    return lo, hi, points, pads, placements, unit_scales
+
+
+def _axis_pads(planar, isotropic, axis):
+    """Per-axis half-extent of a planar radius around `axis` plus an isotropic radius."""
+    if axis is None:
+        axis = (0.0, 0.0, 1.0)  # STEP default placement axis
+    norm = math.sqrt(sum(c * c for c in axis)) or 1.0
+    return [planar * math.sqrt(max(0.0, 1.0 - (c / norm) ** 2)) + isotropic for c in axis]
+
+
+def prescan_bounding_box(step_path, target_unit=DEFAULT_TARGET_UNIT):
+    """
+    Compute a conservative bounding box for `step_path` by streaming its text.
+
+    Returns a report dict with the box as (min_x, min_y, min_z, max_x, max_y,
+    max_z) in `target_unit`, the detected file unit scale and scan counters.
+    A file declaring several length units is scaled by the first one in the
+    file and flagged with mixed_units; its box is then not reliable.
+    """
+    if target_unit.upper() not in _TARGET_UNITS:
+        raise ValueError(f"Unsupported target unit: {target_unit}")
+
+    lo, hi, points, pads, placements, unit_scales = _scan(step_path)
+    if points == 0:
+        raise StepPrescanError(f"No 3D CARTESIAN_POINT entities found in {step_path}")
+
+    # Pad curved primitives around their placement origins. The second pass
+    # only fetches the origin points and axis directions actually needed.
+    padded = [(placements[p], pad) for p, pad in pads.items() if p in placements]
+    if padded:
+        wanted = set()
+        for (origin, axis), _ in padded:
+            wanted.add(origin)
+            if axis is not None:
+                wanted.add(axis)
+        values = _scan(step_path, wanted_points=wanted)
+        for (origin, axis), (planar, isotropic) in padded:
+            if origin not in values:
+                continue
+            extents = _axis_pads(planar, isotropic, values.get(axis))
+            for i in range(3):
+                lo[i] = min(lo[i], values[origin][i] - extents[i])
+                hi[i] = max(hi[i], values[origin][i] + extents[i])
+
+    distinct_units = set(unit_scales)
+    file_unit_m = unit_scales[0] if unit_scales else _TARGET_UNITS["MM"]
+    scale = file_unit_m / _TARGET_UNITS[target_unit.upper()]
+    bbox = tuple(v * scale for v in (lo[0], lo[1], lo[2], hi[0], hi[1], hi[2]))
+
+    return {
+        "bbox": bbox,
+        "file_unit_m": file_unit_m,
+        "target_unit": target_unit.upper(),
+        "scale": scale,
+        "points": points,
+        "padded_curves": len(pads),
+        "mixed_units": len(distinct_units) > 1,
+    }
+
+
+def compare_bounding_boxes(fast_bbox, reference_bbox, tolerance=DEFAULT_TOLERANCE):
+    """
+    Return (component, fast, reference, delta) for every bound where the two
+    boxes differ by more than `tolerance` model units; empty when they agree.
+    """
+    names = ["min_x", "min_y", "min_z", "max_x", "max_y", "max_z"]
+    discrepancies = []
+    for name, fast, reference in zip(names, fast_bbox, reference_bbox):
+        delta = fast - reference
+        if abs(delta) > tolerance:
+            discrepancies.append((name, fast, reference, delta))
+    return discrepancies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conservative STEP bounding box by streaming pre-scan")
+    parser.add_argument("step", type=str, help="Path to STEP file")
+    parser.add_argument("--target-unit", type=str, default=DEFAULT_TARGET_UNIT, help="Output length unit (M, CM, MM, UM, IN, FT)")
+    args = parser.parse_args()
+
+    try:
+        report = prescan_bounding_box(args.step, target_unit=args.target_unit)
+    except (OSError, StepPrescanError, ValueError) as e:
+        print(f"[ERROR] Pre-scan failed: {e}")
+        sys.exit(1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
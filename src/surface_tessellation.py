@@ -0,0 +1,100 @@
+# src/surface_tessellation.py
+
+"""
+Surface Tessellation Module
+
+Turns the model loaded in the current Gmsh session into a flat triangle soup
+(vertex array, triangle index array and the surface entity tag of every
+triangle) that NumPy geometry stages can consume without further Gmsh calls.
+"""
+
+import gmsh
+import numpy as np
+
+# Gmsh element type for 3-node triangles
+TRIANGLE_ELEMENT_TYPE = 2
+
+# Elements per 2*pi of curvature; keeps curved faces faithful at coarse sizes
+DEFAULT_CURVATURE_ELEMENTS = 24
+
+
+def tessellate_surfaces(mesh_size=None, curvature_elements=DEFAULT_CURVATURE_ELEMENTS, debug=False):
+    """
+    Mesh all surfaces of the loaded model once and return
+    (vertices (N, 3) float64, triangles (M, 3) int64, triangle_entities (M,) int32).
+
+    Expects an initialized Gmsh session with the model already synchronized.
+    `mesh_size` caps the triangle size; by default only curvature refines it.
+    """
+    gmsh.option.setNumber("Mesh.MeshSizeFromCurvature", curvature_elements)
+    if mesh_size:
+        gmsh.option.setNumber("Mesh.MeshSizeMax", mesh_size)
+    gmsh.model.mesh.generate(2)
+
+    node_tags, coords, _ = gmsh.model.mesh.getNodes()
+    node_tags = np.asarray(node_tags, dtype=np.int64)
+    vertices = np.asarray(coords, dtype=np.float64).reshape(-1, 3)
+
+    # Node tags are not guaranteed to be contiguous; map them to row indices
+    row_of_tag = np.full(int(node_tags.max()) + 1 if node_tags.size else 1, -1, dtype=np.int64)
+    row_of_tag[node_tags] = np.arange(node_tags.size, dtype=np.int64)
+
+    triangles = []
+    entities = []
+    for _, surface_tag in gmsh.model.getEntities(2):
+        element_types, _, element_nodes = gmsh.model.mesh.getElements(2, surface_tag)
+        for element_type, nodes in zip(element_types, element_nodes):
+            if element_type != TRIANGLE_ELEMENT_TYPE:
+                continue
+            tris = row_of_tag[np.asarray(nodes, dtype=np.int64).reshape(-1, 3)]
+            triangles.append(tris)
+            entities.append(np.full(len(tris), surface_tag, dtype=np.int32))
+
+    if triangles:
+        triangles = np.concatenate(triangles)
+        entities = np.concatenate(entities)
+    else:
+        triangles = np.empty((0, 3), dtype=np.int64)
+        entities = np.empty(0, dtype=np.int32)
+
+    if debug:
+        print(f"[DEBUG] Tessellated {len(entities)} triangles over {vertices.shape[0]} nodes.")
+
+    return vertices, triangles, entities
+
+
+def entity_bounding_boxes(dim=2):
+    """
+    Return (tags (E,) int32, boxes (E, 6) float64) for the model entities of
+    dimension `dim`, boxes as (min_x, min_y, min_z, max_x, max_y, max_z).
+    """
+    entities = gmsh.model.getEntities(dim)
+    tags = np.array([tag for _, tag in entities], dtype=np.int32)
+    boxes = np.array([gmsh.model.getBoundingBox(dim, tag) for _, tag in entities], dtype=np.float64).reshape(-1, 6)
+    return tags, boxes
+
+
+def surface_groups(debug=False):
+    """
+    Return [(name, physical_tag, [surface tags])] for the boundary groups of
+    the loaded model: its 2D physical groups or, when it has none, surfaces
+    grouped by entity name (named STEP faces, physical_tag None).
+    """
+    groups = []
+    for dim, tag in gmsh.model.getPhysicalGroups(2):
+        name = gmsh.model.getPhysicalName(dim, tag) or f"group_{tag}"
+        surfaces = [int(s) for s in gmsh.model.getEntitiesForPhysicalGroup(dim, tag)]
+        groups.append((name, int(tag), surfaces))
+
+    if not groups:
+        by_name = {}
+        for dim, tag in gmsh.model.getEntities(2):
+            name = gmsh.model.getEntityName(dim, tag)
+            if name:
+                # Imported names are paths such as "Shapes/Assembly/inlet"
+                by_name.setdefault(name.split("/")[-1], []).append(int(tag))
+        groups = [(name, None, surfaces) for name, surfaces in sorted(by_name.items())]
+
+    if debug:
+        print(f"[DEBUG] Surface groups: {', '.join(f'{name} ({len(s)})' for name, _, s in groups) or 'none'}")
+    return groups
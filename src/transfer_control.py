@@ -0,0 +1,272 @@
+# src/transfer_control.py
+
+"""
+Transfer Control Module
+
+Retry, backoff and adaptive concurrency for the Dropbox transfer scripts.
+
+- AdaptiveLimiter caps in-flight transfers additive-increase /
+  multiplicative-decrease style: after every round of completions it allows
+  one more transfer while throughput keeps improving (undoing a step that
+  made it worse, probing again after a few steady rounds), halves the cap on
+  an error, and on HTTP 429 also holds every new transfer until the
+  server's Retry-After has passed.
+- call_with_retry runs one transfer through the limiter and retries
+  throttled and transient failures (429, 5xx, dropped connections) with
+  exponential backoff and full jitter; anything else fails at once.
+- dropbox_client builds a client that refreshes an expired access token by
+  itself, and leaves retries to call_with_retry so throttling reaches the
+  limiter instead of being slept off inside one worker thread.
+"""
+
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+TOKEN_URL = "https://api.dropbox.com/oauth2/token"
+
+# Dropbox short-lived access tokens last four hours; the client refreshes
+# ahead of this and also whenever the API reports the token expired
+ASSUMED_TOKEN_LIFETIME_S = 4 * 3600
+
+DEFAULT_MAX_ATTEMPTS = 6
+DEFAULT_BASE_DELAY_S = 0.5
+DEFAULT_MAX_DELAY_S = 60.0
+
+# Wait after a 429 that carries no Retry-After (the SDK's own default)
+DEFAULT_RETRY_AFTER_S = 5.0
+
+# In-flight transfers before the limiter has measured anything
+DEFAULT_INITIAL_CONCURRENCY = 4
+
+# Relative throughput change between rounds that counts as better or worse
+DEFAULT_THROUGHPUT_TOLERANCE = 0.05
+
+# Completions per throughput measurement at the lowest limits, where a single
+# transfer is too noisy a sample
+MIN_ROUND_COMPLETIONS = 4
+
+# Steady rounds after which the limiter probes one step higher again
+PROBE_AFTER_ROUNDS = 4
+
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+# Failure kinds reported to AdaptiveLimiter.release
+THROTTLED, TRANSIENT, FATAL = "throttled", "transient", "fatal"
+
+
+class TransferHTTPError(Exception):
+    """Raised for a non-2xx response outside the Dropbox SDK, e.g. the token endpoint."""
+
+    def __init__(self, status_code, message, retry_after=None):
+        super().__init__(f"HTTP {status_code}: {message}")
+        self.status_code = status_code
+        self.text = message
+        self.retry_after = retry_after
+
+
+def classify_error(error):
+    """
+    Return (kind, retry_after) for a failed transfer: THROTTLED with the
+    server's wait in seconds (or None), TRANSIENT, or FATAL.
+    """
+    import dropbox
+    if isinstance(error, dropbox.exceptions.RateLimitError):
+        return THROTTLED, error.backoff
+    if isinstance(error, TransferHTTPError) and error.status_code in RETRYABLE_STATUS:
+        return (THROTTLED, error.retry_after) if error.status_code == 429 else (TRANSIENT, None)
+    if isinstance(error, dropbox.exceptions.InternalServerError):
+        return TRANSIENT, None
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                          requests.exceptions.ChunkedEncodingError)):
+        return TRANSIENT, None
+    return FATAL, None
+
+
+def parse_retry_after(value):
+    """
+    Seconds to wait for a Retry-After header: delay-seconds or an HTTP-date
+    (RFC 9110), clamped at 0. None when the header is missing or unreadable.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:  # HTTP-dates are GMT
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt, base_delay=DEFAULT_BASE_DELAY_S, max_delay=DEFAULT_MAX_DELAY_S):
+    """Full-jitter exponential backoff before retry number `attempt` (1-based)."""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+
+
+class AdaptiveLimiter:
+    """
+    Bound on concurrent transfers that adapts between `minimum` and
+    `maximum`, starting at `initial`. Threads call acquire() before a
+    transfer and release() with its outcome after it; minimum == maximum
+    gives a fixed limit.
+    """
+
+    def __init__(self, maximum, initial=None, minimum=1, tolerance=DEFAULT_THROUGHPUT_TOLERANCE):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.limit = min(self.maximum, max(self.minimum, initial or DEFAULT_INITIAL_CONCURRENCY))
+        self.tolerance = tolerance
+        self.peak = self.limit
+        self.throttled = 0
+        self.errors = 0
+        self._in_flight = 0
+        self._hold_until = 0.0
+        self._previous_rate = None
+        self._grew = False
+        self._steady = 0
+        self._cond = threading.Condition()
+        self._start_round()
+
+    def _start_round(self):
+        self._round_started = time.perf_counter()
+        self._round_done = 0
+        self._round_bytes = 0
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                wait = self._hold_until - time.monotonic()
+                if wait <= 0 and self._in_flight < self.limit:
+                    self._in_flight += 1
+                    return
+                self._cond.wait(timeout=wait if wait > 0 else None)
+
+    def release(self, outcome=None, nbytes=0, retry_after=None):
+        """`outcome` is None for success or a failure kind from classify_error."""
+        with self._cond:
+            self._in_flight -= 1
+            if outcome is None:
+                self._completed(nbytes)
+            elif outcome == THROTTLED:
+                self.throttled += 1
+                self._decrease()
+                wait = DEFAULT_RETRY_AFTER_S if retry_after is None else retry_after
+                self._hold_until = max(self._hold_until, time.monotonic() + wait)
+            elif outcome == TRANSIENT:
+                self.errors += 1
+                self._decrease()
+            self._cond.notify_all()
+
+    def _decrease(self):
+        self.limit = max(self.minimum, self.limit // 2)
+        self._previous_rate = None
+        self._grew = False
+        self._start_round()
+
+    def _completed(self, nbytes):
+        self._round_done += 1
+        self._round_bytes += nbytes
+        if self._round_done < max(self.limit, MIN_ROUND_COMPLETIONS):
+            return
+        # One round: as many completions as the limit allows in flight, or a few more
+        elapsed = max(time.perf_counter() - self._round_started, 1e-9)
+        rate = (self._round_bytes or self._round_done) / elapsed
+        previous = self._previous_rate
+        if previous is None or rate > previous * (1 + self.tolerance) or self._steady >= PROBE_AFTER_ROUNDS:
+            self.limit = min(self.maximum, self.limit + 1)
+            self._grew, self._steady = True, 0
+        elif rate < previous * (1 - self.tolerance) and self._grew:
+            # The last step up did not pay off: undo it, then hold
+            self.limit = max(self.minimum, self.limit - 1)
+            self._grew, self._steady = False, 0
+        else:
+            self._grew = False
+            self._steady += 1
+        self.peak = max(self.peak, self.limit)
+        self._previous_rate = rate
+        self._start_round()
+
+    def stats(self):
+        with self._cond:
+            return {"limit": self.limit, "peak": self.peak, "throttled": self.throttled, "errors": self.errors}
+
+
+def call_with_retry(fn, *args, limiter=None, nbytes=0, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                    base_delay=DEFAULT_BASE_DELAY_S, max_delay=DEFAULT_MAX_DELAY_S, **kwargs):
+    """
+    Call fn(*args, **kwargs) inside a `limiter` slot, retrying throttled and
+    transient failures up to `max_attempts` calls in all. A 429 waits for its
+    Retry-After; other retries back off exponentially. The last error is
+    raised once attempts run out, fatal errors right away.
+    """
+    for attempt in range(1, max_attempts + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            kind, retry_after = classify_error(e)
+            if limiter is not None:
+                limiter.release(kind, retry_after=retry_after)
+            if kind == FATAL or attempt == max_attempts:
+                raise
+            if kind == THROTTLED:
+                time.sleep(DEFAULT_RETRY_AFTER_S if retry_after is None else retry_after)
+            else:
+                time.sleep(backoff_delay(attempt, base_delay, max_delay))
+            continue
+        if limiter is not None:
+            limiter.release(nbytes=nbytes)
+        return result
+
+
+def _request_token(refresh_token, client_id, client_secret, url, session):
+    response = (session or requests).post(url, data={
+        "grant_type": "refresh_token",
+        "refresh_token": refresh_token,
+        "client_id": client_id,
+        "client_secret": client_secret
+    })
+    if response.status_code != 200:
+        raise TransferHTTPError(response.status_code, response.text,
+                                retry_after=parse_retry_after(response.headers.get("Retry-After")))
+    return response.json()["access_token"]
+
+
+def refresh_access_token(refresh_token, client_id, client_secret, url=TOKEN_URL, session=None,
+                         max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Exchange the refresh token for an access token, retrying throttling and server errors."""
+    try:
+        return call_with_retry(_request_token, refresh_token, client_id, client_secret, url, session,
+                               max_attempts=max_attempts)
+    except TransferHTTPError as e:
+        raise Exception(f"Failed to refresh access token: Status Code {e.status_code}, Response: {e.text}") from e
+
+
+def dropbox_client(access_token, refresh_token, client_id, client_secret, max_connections=DEFAULT_INITIAL_CONCURRENCY,
+                   session=None):
+    """
+    Dropbox client for `access_token` that refreshes it through the refresh
+    token when it is about to expire or is rejected as expired. The SDK's own
+    retries are off: call_with_retry handles them with the limiter.
+    """
+    import dropbox
+    return dropbox.Dropbox(
+        access_token,
+        oauth2_refresh_token=refresh_token,
+        oauth2_access_token_expiration=datetime.utcnow() + timedelta(seconds=ASSUMED_TOKEN_LIFETIME_S),
+        app_key=client_id,
+        app_secret=client_secret,
+        session=session or dropbox.create_session(max_connections=max(1, max_connections)),
+        max_retries_on_error=0,
+        max_retries_on_rate_limit=0
+    )
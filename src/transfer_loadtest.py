@@ -0,0 +1,397 @@
+# src/transfer_loadtest.py
+
+"""
+Transfer Load Test Module
+
+Offline benchmark for the Dropbox transfer layer. FakeDropboxServer is a
+local HTTP server that speaks the subset of the Dropbox API the transfer
+scripts use (token refresh, folder listing, download, upload sessions and
+batch commits) with configurable latency, per-request bandwidth, a capacity
+beyond which it answers 429 with Retry-After, random throttling and 5xx
+errors, and short token lifetimes. local_session() points the real Dropbox
+SDK at it, so the download and upload code paths run unchanged.
+
+    python -m src.transfer_loadtest --files 64 --size-kb 256 --latency-ms 40 --capacity 12 --mode both
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from src.dropbox_sync import dropbox_content_hash_bytes
+
+_TIMESTAMP = "2024-01-01T00:00:00Z"
+
+# Files of the benchmark folder get an extension the download script accepts
+BENCH_FOLDER = "/bench"
+UPLOAD_FOLDER = "/bench_upload"
+
+
+class FakeDropboxServer:
+    """
+    In-memory Dropbox stand-in on 127.0.0.1. Use as a context manager or call
+    start()/stop(); `url` is set once started and `stats` counts requests,
+    throttled and failed responses and the peak of concurrent requests.
+
+    - latency_s: added to every request;
+    - bandwidth: bytes per second of one request body or download (None: unlimited);
+    - capacity: concurrent requests served; more are answered 429 (None: unlimited);
+    - throttle_rate / error_rate: probability of a random 429 / 503;
+    - retry_after_s: Retry-After of every 429 (whole seconds, as Dropbox sends);
+    - token_lifetime_s: access tokens expire after this (None: never).
+    """
+
+    def __init__(self, latency_s=0.0, bandwidth=None, capacity=None, throttle_rate=0.0, error_rate=0.0,
+                 retry_after_s=1, token_lifetime_s=None, page_size=100, seed=0):
+        self.latency_s = latency_s
+        self.bandwidth = bandwidth
+        self.capacity = capacity
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.retry_after_s = int(retry_after_s)
+        self.token_lifetime_s = token_lifetime_s
+        self.page_size = page_size
+        self.files = {}
+        self.display = {}
+        self.sessions = {}
+        self.tokens = {}
+        self.stats = {"requests": 0, "throttled": 0, "errors": 0, "expired": 0, "refreshes": 0, "peak_concurrent": 0}
+        self.url = None
+        self._active = 0
+        self._ids = itertools.count(1)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = None
+
+    # --- Lifecycle --------------------------------------------------------------
+    def start(self):
+        server = self
+
+        class Handler(_Handler):
+            fake = server
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        threading.Thread(target=self._httpd.serve_forever, name="fake-dropbox", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- Content ----------------------------------------------------------------
+    def put_file(self, path, data):
+        with self._lock:
+            self.files[path.lower()] = bytes(data)
+            self.display[path.lower()] = path
+
+    def metadata(self, path):
+        data = self.files[path]
+        return {
+            ".tag": "file", "name": self.display[path].rsplit("/", 1)[-1], "id": f"id:{path}",
+            "client_modified": _TIMESTAMP, "server_modified": _TIMESTAMP, "rev": "0123456789abcdef",
+            "size": len(data), "path_lower": path, "path_display": self.display[path],
+            "content_hash": dropbox_content_hash_bytes(data),
+        }
+
+    def issue_token(self):
+        with self._lock:
+            token = f"token-{next(self._ids)}"
+            self.tokens[token] = time.monotonic() + self.token_lifetime_s if self.token_lifetime_s else None
+            self.stats["refreshes"] += 1
+        return token
+
+    # --- Request admission --------------------------------------------------------
+    def admit(self):
+        """Return None to serve the request, else the HTTP status to refuse it with."""
+        with self._lock:
+            self.stats["requests"] += 1
+            if self.capacity is not None and self._active >= self.capacity:
+                self.stats["throttled"] += 1
+                return 429
+            roll = self._random.random()
+            if roll < self.throttle_rate:
+                self.stats["throttled"] += 1
+                return 429
+            if roll < self.throttle_rate + self.error_rate:
+                self.stats["errors"] += 1
+                return 503
+            self._active += 1
+            self.stats["peak_concurrent"] = max(self.stats["peak_concurrent"], self._active)
+            return None
+
+    def finish(self):
+        with self._lock:
+            self._active -= 1
+
+    def token_state(self, header):
+        """"ok", "expired" or "invalid" for an Authorization header."""
+        token = (header or "").split("Bearer ", 1)[-1]
+        with self._lock:
+            if token not in self.tokens:
+                return "invalid"
+            expires = self.tokens[token]
+            if expires is not None and time.monotonic() >= expires:
+                self.stats["expired"] += 1
+                return "expired"
+            return "ok"
+
+    def bandwidth_delay(self, nbytes):
+        if self.bandwidth:
+            time.sleep(nbytes / self.bandwidth)
+
+    # --- Routes -----------------------------------------------------------------
+    def list_folder(self, arg):
+        folder = arg["path"].lower().rstrip("/")
+        with self._lock:
+            paths = sorted(p for p in self.files if p.rsplit("/", 1)[0] == folder)
+        if not paths and not any(p.startswith(folder + "/") for p in self.files):
+            return 409, {"error_summary": "path/not_found/", "error": {".tag": "path", "path": {".tag": "not_found"}}}
+        return 200, self._page(folder, paths, 0)
+
+    def list_folder_continue(self, arg):
+        folder, start = arg["cursor"].rsplit("|", 1)
+        with self._lock:
+            paths = sorted(p for p in self.files if p.rsplit("/", 1)[0] == folder)
+        return 200, self._page(folder, paths, int(start))
+
+    def _page(self, folder, paths, start):
+        stop = start + self.page_size
+        with self._lock:
+            entries = [self.metadata(p) for p in paths[start:stop]]
+        return {"entries": entries, "cursor": f"{folder}|{stop}", "has_more": stop < len(paths)}
+
+    def session_start(self, arg, body):
+        with self._lock:
+            session_id = f"session-{next(self._ids)}"
+            self.sessions[session_id] = {"data": bytearray(body), "closed": arg.get("close", False)}
+        return 200, {"session_id": session_id}
+
+    def session_append(self, arg, body):
+        cursor = arg["cursor"]
+        with self._lock:
+            session = self.sessions.get(cursor["session_id"])
+            if session is None:
+                return 409, {"error_summary": "not_found/", "error": {".tag": "not_found"}}
+            if cursor["offset"] != len(session["data"]):
+                return 409, {"error_summary": "incorrect_offset/",
+                             "error": {".tag": "incorrect_offset", "correct_offset": len(session["data"])}}
+            session["data"].extend(body)
+            session["closed"] = arg.get("close", False)
+        return 200, None
+
+    def finish_batch(self, arg):
+        results = []
+        for entry in arg["entries"]:
+            cursor, path = entry["cursor"], entry["commit"]["path"]
+            with self._lock:
+                session = self.sessions.pop(cursor["session_id"], None)
+            if session is None or cursor["offset"] != len(session["data"]):
+                results.append({".tag": "failure", "failure": {".tag": "lookup_failed",
+                                                               "lookup_failed": {".tag": "not_found"}}})
+                continue
+            self.put_file(path, session["data"])
+            with self._lock:
+                metadata = self.metadata(path.lower())
+            metadata.pop(".tag")  # A success entry is the file metadata struct itself
+            results.append({".tag": "success", **metadata})
+        return 200, {"entries": results}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    fake = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, payload=None, body=None, headers=()):
+        if body is None:
+            body = json.dumps(payload).encode("utf-8")
+            headers = list(headers) + [("Content-Type", "application/json")]
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        fake = self.fake
+        refused = fake.admit()
+        if refused == 429:
+            return self._send(429, {"error_summary": "too_many_requests/",
+                                    "error": {"reason": {".tag": "too_many_requests"}, "retry_after": fake.retry_after_s}},
+                              headers=[("Retry-After", str(fake.retry_after_s))])
+        if refused == 503:
+            return self._send(503, body=b"Service Unavailable", headers=[("Content-Type", "text/plain")])
+        try:
+            time.sleep(fake.latency_s)
+            fake.bandwidth_delay(len(body))
+            self._route(fake, body)
+        finally:
+            fake.finish()
+
+    def _route(self, fake, body):
+        path = urllib.parse.urlsplit(self.path).path
+        if path == "/oauth2/token":
+            return self._send(200, {"access_token": fake.issue_token(), "token_type": "bearer",
+                                    "expires_in": fake.token_lifetime_s or 14400})
+        state = fake.token_state(self.headers.get("Authorization"))
+        if state != "ok":
+            tag = "expired_access_token" if state == "expired" else "invalid_access_token"
+            return self._send(401, {"error_summary": f"{tag}/", "error": {".tag": tag}})
+
+        header_arg = json.loads(self.headers.get("Dropbox-API-Arg") or "null")
+        if path == "/2/files/download":
+            key = header_arg["path"].lower()
+            if key not in fake.files:
+                return self._send(409, {"error_summary": "path/not_found/",
+                                        "error": {".tag": "path", "path": {".tag": "not_found"}}})
+            data = fake.files[key]
+            fake.bandwidth_delay(len(data))
+            return self._send(200, body=data, headers=[("Content-Type", "application/octet-stream"),
+                                                       ("Dropbox-API-Result", json.dumps(fake.metadata(key)))])
+        routes = {
+            "/2/files/list_folder": lambda: fake.list_folder(json.loads(body)),
+            "/2/files/list_folder/continue": lambda: fake.list_folder_continue(json.loads(body)),
+            "/2/files/upload_session/start": lambda: fake.session_start(header_arg or {}, body),
+            "/2/files/upload_session/append_v2": lambda: fake.session_append(header_arg, body),
+            "/2/files/upload_session/finish_batch_v2": lambda: fake.finish_batch(json.loads(body)),
+        }
+        if path not in routes:
+            return self._send(400, body=f"Unknown route {path}".encode("utf-8"), headers=[("Content-Type", "text/plain")])
+        status, payload = routes[path]()
+        self._send(status, payload)
+
+
+class _LocalAdapter(requests.adapters.HTTPAdapter):
+    """Sends every https:// request to `base_url` instead, keeping the path."""
+
+    def __init__(self, base_url, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url.rstrip("/")
+
+    def send(self, request, **kwargs):
+        parts = urllib.parse.urlsplit(request.url)
+        request.url = self.base_url + parts.path + (f"?{parts.query}" if parts.query else "")
+        return super().send(request, **kwargs)
+
+
+def local_session(base_url, max_connections=16):
+    """requests session that routes the Dropbox SDK's API and content hosts to a FakeDropboxServer."""
+    session = requests.Session()
+    session.mount("https://", _LocalAdapter(base_url, pool_connections=4, pool_maxsize=max(1, max_connections)))
+    return session
+
+
+def local_client(server, max_connections=16):
+    """Dropbox client for `server`, authorised through its token endpoint like the transfer scripts."""
+    from src.transfer_control import dropbox_client, refresh_access_token
+    session = local_session(server.url, max_connections=max_connections)
+    access_token = refresh_access_token("refresh", "key", "secret", session=session)
+    return dropbox_client(access_token, "refresh", "key", "secret", session=session)
+
+
+def run_load_test(server, files=32, size=256 * 1024, workers=16, fixed=False, work_dir=None):
+    """
+    Download `files` files of `size` bytes from `server` and upload them
+    back, with `workers` as the concurrency ceiling (or, with `fixed`, as a
+    constant). Returns per-direction throughput and limiter statistics.
+    """
+    from src.download_dropbox_files import list_downloadable_entries, download_entries
+    from src.transfer_control import AdaptiveLimiter
+    from src.upload_to_dropbox import upload_files
+
+    rng = random.Random(size)
+    for i in range(files):
+        server.put_file(f"{BENCH_FOLDER}/part_{i:04d}.step", rng.randbytes(size))
+    dbx = local_client(server, max_connections=workers)
+
+    def limiter():
+        return AdaptiveLimiter(workers, initial=workers, minimum=workers) if fixed else AdaptiveLimiter(workers)
+
+    report = {"mode": "fixed" if fixed else "adaptive", "files": files, "bytes": files * size, "workers": workers}
+    with tempfile.TemporaryDirectory(dir=work_dir) as local, open(os.devnull, "w") as log:
+        started = time.perf_counter()
+        entries = list_downloadable_entries(dbx, BENCH_FOLDER, log)
+        download_limiter = limiter()
+        downloaded, failed = download_entries(dbx, entries, local, log, limiter=download_limiter)
+        report["download"] = _direction(started, len(downloaded), len(failed), files * size, download_limiter)
+
+        started = time.perf_counter()
+        upload_limiter = limiter()
+        uploads = [(os.path.join(local, name), f"{UPLOAD_FOLDER}/{name}") for name in sorted(downloaded)]
+        uploaded, failed = upload_files(dbx, uploads, limiter=upload_limiter)
+        report["upload"] = _direction(started, len(uploaded), len(failed), files * size, upload_limiter)
+    report["server"] = dict(server.stats)
+    return report
+
+
+def _direction(started, done, failed, nbytes, limiter):
+    elapsed = time.perf_counter() - started
+    return {"done": done, "failed": failed, "seconds": round(elapsed, 3),
+            "mb_per_s": round(nbytes / (1024 * 1024) / elapsed, 2), **limiter.stats()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Dropbox transfer layer against a local fake server")
+    parser.add_argument("--files", type=int, default=32, help="Files to download and upload back")
+    parser.add_argument("--size-kb", type=int, default=256, help="Size of each file in KiB")
+    parser.add_argument("--workers", type=int, default=16, help="Concurrency ceiling (the fixed level with --mode fixed)")
+    parser.add_argument("--mode", type=str, choices=["adaptive", "fixed", "both"], default="both", help="Concurrency control to measure")
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="Server latency added to every request")
+    parser.add_argument("--bandwidth-mb", type=float, help="Per-request bandwidth in MiB/s (default: unlimited)")
+    parser.add_argument("--capacity", type=int, default=8, help="Concurrent requests the server serves before answering 429")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Probability of a random 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of a random 503")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After of every 429, in seconds")
+    parser.add_argument("--token-lifetime", type=float, help="Access token lifetime in seconds, to exercise refreshes")
+    parser.add_argument("--json", action="store_true", help="Print the reports as JSON")
+    args = parser.parse_args(argv)
+
+    reports = []
+    for fixed in {"adaptive": [False], "fixed": [True], "both": [True, False]}[args.mode]:
+        server = FakeDropboxServer(
+            latency_s=args.latency_ms / 1000, capacity=args.capacity, throttle_rate=args.throttle_rate,
+            error_rate=args.error_rate, retry_after_s=args.retry_after, token_lifetime_s=args.token_lifetime,
+            bandwidth=args.bandwidth_mb * 1024 * 1024 if args.bandwidth_mb else None
+        )
+        with server:
+            reports.append(run_load_test(server, files=args.files, size=args.size_kb * 1024, workers=args.workers,
+                                         fixed=fixed))
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+    for report in reports:
+        for direction in ("download", "upload"):
+            r = report[direction]
+            print(f"[INFO] {report['mode']:>8} {direction:>8}: {r['done']}/{report['files']} in {r['seconds']}s "
+                  f"({r['mb_per_s']} MiB/s), concurrency ended at {r['limit']} (peak {r['peak']}), "
+                  f"{r['throttled']} throttled, {r['errors']} error(s), {r['failed']} failed")
+        server_stats = report["server"]
+        print(f"[INFO] {report['mode']:>8}   server: {server_stats['requests']} requests, {server_stats['throttled']} "
+              f"429s, peak {server_stats['peak_concurrent']} concurrent, {server_stats['refreshes']} token refresh(es)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# src/transfer_store.py
+
+"""
+Transfer Store Module
+
+The storage side of the pipeline behind one small interface, so stages that
+move files do not care where the files live:
+
+- list_files(folder) -> [RemoteEntry] for the regular files of a folder;
+- download(entry, local_folder) -> local path, complete or absent;
+- upload(local_path, remote_path), overwriting.
+
+DropboxStore talks to Dropbox through the existing transfer helpers;
+LocalStore keeps the "remote" side in a local directory, which makes the
+whole pipeline runnable offline and in tests. Both are safe to share
+between transfer threads.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+from collections import namedtuple
+
+from src.dropbox_sync import dropbox_content_hash
+
+# A remote file: `path` is the store's own path, `content_hash` the Dropbox content hash
+RemoteEntry = namedtuple("RemoteEntry", ["name", "path", "size", "content_hash"])
+
+
+class TransferError(Exception):
+    """Raised when a store cannot complete a transfer."""
+
+
+class LocalStore:
+    """
+    Store rooted at a local directory; remote paths such as "/folder/name"
+    map below `root`. `delay` (seconds) is added to every transfer to stand
+    in for network latency.
+    """
+
+    def __init__(self, root, delay=0.0):
+        self.root = os.path.abspath(root)
+        self.delay = delay
+
+    def _local(self, remote_path):
+        path = os.path.normpath(os.path.join(self.root, remote_path.lstrip("/")))
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise TransferError(f"Remote path escapes the store root: {remote_path}")
+        return path
+
+    def list_files(self, folder):
+        directory = self._local(folder)
+        if not os.path.isdir(directory):
+            raise TransferError(f"Remote folder not found: {folder}")
+        entries = []
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path) and not name.startswith("."):
+                remote = f"{folder.rstrip('/')}/{name}"
+                entries.append(RemoteEntry(name, remote, os.path.getsize(path), dropbox_content_hash(path)))
+        return entries
+
+    def download(self, entry, local_folder):
+        time.sleep(self.delay)
+        return _copy_atomic(self._local(entry.path), os.path.join(local_folder, entry.name))
+
+    def upload(self, local_path, remote_path):
+        time.sleep(self.delay)
+        _copy_atomic(local_path, self._local(remote_path))
+
+
+class DropboxStore:
+    """
+    Store backed by a Dropbox client; the client is shared by all threads.
+    Transfers are retried on throttling and transient errors, and `limiter`
+    (a transfer_control.AdaptiveLimiter) bounds how many run at once.
+    """
+
+    def __init__(self, dbx, limiter=None):
+        self.dbx = dbx
+        self.limiter = limiter
+
+    @classmethod
+    def from_credentials(cls, refresh_token, client_id, client_secret, max_connections=4):
+        """One token refresh and one pooled session for every transfer thread."""
+        from src.transfer_control import AdaptiveLimiter, dropbox_client, refresh_access_token
+        access_token = refresh_access_token(refresh_token, client_id, client_secret)
+        return cls(dropbox_client(access_token, refresh_token, client_id, client_secret, max_connections=max_connections),
+                   limiter=AdaptiveLimiter(max_connections))
+
+    def list_files(self, folder):
+        import dropbox
+        from src.transfer_control import call_with_retry
+        entries = []
+        result = call_with_retry(self.dbx.files_list_folder, folder)
+        while True:
+            for entry in result.entries:
+                if isinstance(entry, dropbox.files.FileMetadata):
+                    entries.append(RemoteEntry(entry.name, entry.path_lower, entry.size, entry.content_hash))
+            if not result.has_more:
+                return entries
+            result = call_with_retry(self.dbx.files_list_folder_continue, result.cursor)
+
+    def download(self, entry, local_folder):
+        from types import SimpleNamespace
+        from src.download_dropbox_files import download_entry
+        from src.transfer_control import call_with_retry
+        return call_with_retry(download_entry, self.dbx, SimpleNamespace(name=entry.name, path_lower=entry.path),
+                               local_folder, limiter=self.limiter, nbytes=entry.size)
+
+    def upload(self, local_path, remote_path):
+        from src.upload_to_dropbox import upload_files
+        from src.transfer_control import AdaptiveLimiter
+        # Share the store's limiter so uploads from every thread count against one bound
+        _, failed = upload_files(self.dbx, [(local_path, remote_path)], limiter=self.limiter or AdaptiveLimiter(1))
+        if failed:
+            raise TransferError(f"Upload failed: {local_path} → {remote_path}")
+
+
+def _copy_atomic(source, destination, chunk_size=1024 * 1024):
+    """Copy through a hidden .part file so `destination` only appears complete."""
+    folder = os.path.dirname(destination) or "."
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=f".{os.path.basename(destination)}.", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out, open(source, "rb") as f:
+            shutil.copyfileobj(f, out, chunk_size)
+        os.replace(tmp_path, destination)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return destination
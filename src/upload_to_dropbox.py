@@ -1,75 +1,187 @@
 import dropbox
 import os
-import requests
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.dropbox_sync import list_remote_hashes, select_uploads
+from src.transfer_control import (
+    AdaptiveLimiter, call_with_retry, dropbox_client, refresh_access_token, DEFAULT_INITIAL_CONCURRENCY
+)
 
-# Function to refresh the access token
-def refresh_access_token(refresh_token, client_id, client_secret):
-    """Refreshes the Dropbox access token using the refresh token."""
-    url = "https://api.dropbox.com/oauth2/token"
-    data = {
-        "grant_type": "refresh_token",
-        "refresh_token": refresh_token,
-        "client_id": client_id,
-        "client_secret": client_secret
-    }
-    response = requests.post(url, data=data)
-    if response.status_code == 200:
-        return response.json()["access_token"]
-    else:
-        # Provide more detailed error message for debugging
-        raise Exception(f"Failed to refresh access token: Status Code {response.status_code}, Response: {response.text}")
+# Ceiling on concurrent upload sessions sharing one access token; the adaptive
+# limiter starts lower and grows while throughput improves
+DEFAULT_MAX_WORKERS = 16
+
+# Bytes sent per upload-session request (Dropbox recommends multiples of 4 MiB;
+# a single request may carry at most 150 MiB)
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Maximum number of entries accepted by one finish-batch call
+FINISH_BATCH_LIMIT = 1000
+
+# Function to resolve CLI paths (files or directories) into upload candidates
+def collect_upload_files(local_paths):
+    """Expands directories into their regular, non-hidden files (sorted)."""
+    files = []
+    for local_path in local_paths:
+        if os.path.isdir(local_path):
+            for name in sorted(os.listdir(local_path)):
+                candidate = os.path.join(local_path, name)
+                if not name.startswith(".") and os.path.isfile(candidate):
+                    files.append(candidate)
+        else:
+            files.append(local_path)
+    return files
+
+# Function to stream one file into a closed upload session
+def upload_session_for_file(dbx, local_file_path, chunk_size=UPLOAD_CHUNK_SIZE):
+    """
+    Uploads the file through an upload session in chunks of `chunk_size` and
+    closes the session. Returns the cursor to commit with a finish call; the
+    file is never read into memory as a whole.
+    """
+    size = os.path.getsize(local_file_path)
+    with open(local_file_path, "rb") as f:
+        first = f.read(chunk_size)
+        offset = len(first)
+        session = dbx.files_upload_session_start(first, close=offset >= size)
+        cursor = dropbox.files.UploadSessionCursor(session_id=session.session_id, offset=offset)
+        while offset < size:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                raise IOError(f"File shrank during upload: {local_file_path}")
+            offset += len(chunk)
+            dbx.files_upload_session_append_v2(chunk, cursor, close=offset >= size)
+            cursor = dropbox.files.UploadSessionCursor(session_id=session.session_id, offset=offset)
+    return cursor
+
+# Function to upload many files: concurrent sessions, then batched commits
+def upload_files(dbx, uploads, max_workers=DEFAULT_MAX_WORKERS, chunk_size=UPLOAD_CHUNK_SIZE, limiter=None):
+    """
+    Uploads (local_path, dropbox_path) pairs concurrently and commits them
+    with finish-batch calls. Returns (uploaded dropbox paths, failed local paths).
+    A throttled or interrupted file is sent again in a new session; `limiter`
+    (default: adaptive, up to `max_workers`) sets how many sessions run at once.
+    """
+    limiter = limiter or AdaptiveLimiter(max_workers, initial=min(max_workers, DEFAULT_INITIAL_CONCURRENCY))
+    uploaded, failed = [], []
+    pending = []
+    with ThreadPoolExecutor(max_workers=max(1, limiter.maximum)) as pool:
+        futures = {
+            pool.submit(call_with_retry, upload_session_for_file, dbx, local_path, chunk_size, limiter=limiter,
+                        nbytes=os.path.getsize(local_path)): (local_path, dropbox_path)
+            for local_path, dropbox_path in uploads
+        }
+        for future in as_completed(futures):
+            local_path, dropbox_path = futures[future]
+            try:
+                cursor = future.result()
+            except Exception as e:
+                print(f"❌ Failed to upload file '{local_path}' to Dropbox: {e}")
+                failed.append(local_path)
+                continue
+            commit = dropbox.files.CommitInfo(path=dropbox_path, mode=dropbox.files.WriteMode.overwrite)
+            pending.append((local_path, dropbox.files.UploadSessionFinishArg(cursor=cursor, commit=commit)))
+
+    # Commit in upload order so the log reads predictably
+    order = {local_path: i for i, (local_path, _) in enumerate(uploads)}
+    pending.sort(key=lambda item: order[item[0]])
+    for start in range(0, len(pending), FINISH_BATCH_LIMIT):
+        batch = pending[start:start + FINISH_BATCH_LIMIT]
+        try:
+            result = call_with_retry(dbx.files_upload_session_finish_batch_v2, [arg for _, arg in batch])
+        except Exception as e:
+            for local_path, _ in batch:
+                print(f"❌ Failed to commit file '{local_path}' to Dropbox: {e}")
+                failed.append(local_path)
+            continue
+        for (local_path, arg), entry in zip(batch, result.entries):
+            if entry.is_success():
+                print(f"✅ Successfully uploaded file to Dropbox: {arg.commit.path}")
+                uploaded.append(arg.commit.path)
+            else:
+                print(f"❌ Failed to commit file '{local_path}' to Dropbox: {entry.get_failure()}")
+                failed.append(local_path)
+    return uploaded, failed
+
+# Function to upload local files to a Dropbox folder with a single token refresh
+def upload_files_to_dropbox(local_paths, dropbox_folder, refresh_token, client_id, client_secret,
+                            max_workers=DEFAULT_MAX_WORKERS, incremental=True, catalog=None):
+    """
+    Uploads files (or directory contents) into `dropbox_folder`. With
+    `incremental`, files whose content hash matches the remote copy are skipped.
+    Every file's outcome is recorded in the RunCatalog `catalog` if given.
+    """
+    files = collect_upload_files(local_paths)
+    uploads = [(path, f"{dropbox_folder}/{os.path.basename(path)}") for path in files]
+    access_token = refresh_access_token(refresh_token, client_id, client_secret)
+    dbx = dropbox_client(access_token, refresh_token, client_id, client_secret, max_connections=max_workers)
+
+    states = {}
+    unchanged = []
+    if incremental:
+        uploads, unchanged = select_uploads(uploads, list_remote_hashes(dbx, dropbox_folder), states)
+        for local_path, _ in unchanged:
+            print(f"⏭️ Unchanged, not uploaded: {local_path}")
+    uploaded, failed = upload_files(dbx, uploads, max_workers=max_workers)
+    for state in states.values():
+        state.save()
+    if catalog is not None:
+        for local_path, dropbox_path in unchanged:
+            catalog.record_transfer("upload", local_path, dropbox_path, status="unchanged")
+        for local_path, dropbox_path in uploads:
+            catalog.record_transfer("upload", local_path, dropbox_path,
+                                    status="failed" if local_path in failed else "ok")
+    return uploaded, failed
 
 # Function to upload a file to Dropbox
 def upload_file_to_dropbox(local_file_path, dropbox_file_path, refresh_token, client_id, client_secret):
     """Uploads a local file to a specified path on Dropbox."""
     try:
-        # Refresh the access token before each upload attempt
         access_token = refresh_access_token(refresh_token, client_id, client_secret)
-        dbx = dropbox.Dropbox(access_token)
-
-        # Open the local file in binary read mode
-        with open(local_file_path, "rb") as f:
-            # Upload the file, overwriting if it already exists
-            dbx.files_upload(f.read(), dropbox_file_path, mode=dropbox.files.WriteMode.overwrite)
-        print(f"✅ Successfully uploaded file to Dropbox: {dropbox_file_path}")
-        return True # Indicate success
+        dbx = dropbox_client(access_token, refresh_token, client_id, client_secret, max_connections=1)
+        _, failed = upload_files(dbx, [(local_file_path, dropbox_file_path)], max_workers=1)
+        return not failed # Indicate success
     except Exception as e:
         print(f"❌ Failed to upload file '{local_file_path}' to Dropbox: {e}")
         return False # Indicate failure
 
 # Entry point for the script
 if __name__ == "__main__":
-    # The script expects 5 command-line arguments:
-    # 1. local_file_path (absolute path to the file to upload)
+    # The script expects 5 or 6 command-line arguments:
+    # 1. local_path (a file, or a directory whose files are all uploaded)
     # 2. dropbox_folder (the destination folder in Dropbox)
     # 3. refresh_token
     # 4. client_id (APP_KEY)
     # 5. client_secret (APP_SECRET)
-    if len(sys.argv) != 6:
-        print("Usage: python src/upload_to_dropbox.py <local_file_path> <dropbox_folder> <refresh_token> <client_id> <client_secret>")
+    # 6. max_workers (optional, ceiling on concurrent uploads)
+    if len(sys.argv) not in (6, 7):
+        print("Usage: python src/upload_to_dropbox.py <local_path> <dropbox_folder> <refresh_token> <client_id> <client_secret> [max_workers]")
         sys.exit(1) # Exit with an error code for incorrect usage
 
     # Parse command-line arguments
-    local_file_to_upload = sys.argv[1]
+    local_path = sys.argv[1]
     dropbox_folder = sys.argv[2]
     refresh_token = sys.argv[3]
     client_id = sys.argv[4]
     client_secret = sys.argv[5]
+    max_workers = int(sys.argv[6]) if len(sys.argv) == 7 else DEFAULT_MAX_WORKERS
 
-    # Extract the filename from the local_file_to_upload path
-    output_file_name = os.path.basename(local_file_to_upload)
-
-    # Construct the full destination path on Dropbox
-    dropbox_file_path = f"{dropbox_folder}/{output_file_name}"
-
-    # Verify that the local file exists before attempting to upload
-    if not os.path.exists(local_file_to_upload):
-        print(f"❌ Error: The output file '{local_file_to_upload}' was not found. Please ensure the preceding steps successfully generated this file.")
-        sys.exit(1) # Exit with an error code if the file is not found
-
-    # Call the upload function
-    if not upload_file_to_dropbox(local_file_to_upload, dropbox_file_path, refresh_token, client_id, client_secret):
-        sys.exit(1) # Exit with an error code if the upload itself fails
-
+    # Verify that the local path exists before attempting to upload
+    if not os.path.exists(local_path):
+        print(f"❌ Error: The output path '{local_path}' was not found. Please ensure the preceding steps successfully generated it.")
+        sys.exit(1) # Exit with an error code if the path is not found
 
+    # Upload everything with one token refresh and batched commits, noting each file in the run catalog
+    from src.run_catalog import RunCatalog, CatalogError, DEFAULT_CATALOG_PATH
+    try:
+        catalog = RunCatalog(DEFAULT_CATALOG_PATH)
+    except CatalogError as e:  # Bookkeeping only: a broken catalog must not stop the upload
+        print(f"⚠️ Run catalog disabled: {e}")
+        catalog = None
+    uploaded, failed = upload_files_to_dropbox(
+        [local_path], dropbox_folder, refresh_token, client_id, client_secret, max_workers=max_workers,
+        catalog=catalog
+    )
+    print(f"📦 Uploaded {len(uploaded)} file(s), {len(failed)} failure(s).")
+    if failed:
+        sys.exit(1) # Exit with an error code if any upload fails
@@ -4,6 +4,7 @@ APP_KEY="${APP_KEY}"
 APP_SECRET="${APP_SECRET}"
 REFRESH_TOKEN="${REFRESH_TOKEN}"
 DROPBOX_UPLOAD_FOLDER="/engineering_simulations_pipeline"
+MAX_WORKERS="${DROPBOX_MAX_WORKERS:-16}"  # Ceiling on concurrent uploads (adapted at run time)
 
 LOCAL_OUTPUT_DIR="$GITHUB_WORKSPACE/data/testing-input-output"
 
@@ -15,27 +16,18 @@ if [ ! -d "$LOCAL_OUTPUT_DIR" ]; then
     exit 1
 fi
 
-# Loop through all files in the directory
-for file in "$LOCAL_OUTPUT_DIR"/*; do
-    if [ -f "$file" ]; then
-        echo "📤 Uploading $file..."
-        python3 src/upload_to_dropbox.py \
-            "$file" \
-            "$DROPBOX_UPLOAD_FOLDER" \
-            "$REFRESH_TOKEN" \
-            "$APP_KEY" \
-            "$APP_SECRET"
-
-        if [ $? -eq 0 ]; then
-            echo "✅ Successfully uploaded $file to Dropbox."
-        else
-            echo "❌ ERROR: Failed to upload $file to Dropbox."
-            exit 1
-        fi
-    fi
-done
-
-echo "🎉 All files uploaded successfully!"
-
-
-
+# Upload every file in the directory in one process (one token refresh, batched commits)
+python3 src/upload_to_dropbox.py \
+    "$LOCAL_OUTPUT_DIR" \
+    "$DROPBOX_UPLOAD_FOLDER" \
+    "$REFRESH_TOKEN" \
+    "$APP_KEY" \
+    "$APP_SECRET" \
+    "$MAX_WORKERS"
+
+if [ $? -eq 0 ]; then
+    echo "🎉 All files uploaded successfully!"
+else
+    echo "❌ ERROR: Failed to upload one or more files to Dropbox."
+    exit 1
+fi
@@ -0,0 +1,124 @@
+# src/zip_ingest.py
+
+"""
+Zip Ingest Module
+
+Reads STEP parts straight out of zip archives without unpacking them. A
+member is addressed as "<archive>.zip!/<member path>"; when it is needed,
+the member alone is decompressed in chunks into a temporary file with the
+same STEP extension (Gmsh picks its reader from the extension) and removed
+as soon as the caller is done. Peak extra disk use is one member per
+consumer instead of the whole archive tree, and each byte is written once.
+"""
+
+import contextlib
+import os
+import posixpath
+import shutil
+import tempfile
+import zipfile
+
+STEP_EXTENSIONS = (".step", ".stp")
+ARCHIVE_EXTENSIONS = (".zip",)
+MEMBER_SEPARATOR = "!/"
+
+# Chunk size for streaming a member out of the archive
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+
+def is_archive(path):
+    """True for an existing file with an archive extension."""
+    return path.lower().endswith(ARCHIVE_EXTENSIONS) and os.path.isfile(path)
+
+
+def member_ref(archive_path, member):
+    """Reference to one member of an archive, usable wherever a STEP path is."""
+    return f"{archive_path}{MEMBER_SEPARATOR}{member}"
+
+
+def split_member_ref(ref):
+    """
+    Split a reference into (archive_path, member), or (ref, None) for a plain
+    path. The separator only counts right after an archive extension.
+    """
+    lowered = ref.lower()
+    for extension in ARCHIVE_EXTENSIONS:
+        marker = lowered.find(extension + MEMBER_SEPARATOR)
+        if marker >= 0:
+            end = marker + len(extension)
+            return ref[:end], ref[end + len(MEMBER_SEPARATOR):]
+    return ref, None
+
+
+def _safe_member(name):
+    """Normalised member path, or None for entries that could escape a directory."""
+    normalized = posixpath.normpath(name.replace("\\", "/"))
+    if normalized.startswith(("/", "../")) or normalized in (".", "..") or ":" in normalized.split("/")[0]:
+        return None
+    return normalized
+
+
+def list_step_members(archive_path, debug=False):
+    """
+    Names of the STEP members of a zip archive, sorted. Directories, macOS
+    resource forks, hidden files and names that would leave the output
+    directory are skipped. Only the central directory is read.
+    """
+    members = []
+    with zipfile.ZipFile(archive_path) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(STEP_EXTENSIONS):
+                continue
+            parts = info.filename.replace("\\", "/").split("/")
+            if parts[0] == "__MACOSX" or parts[-1].startswith("."):
+                continue
+            if _safe_member(info.filename) is None:
+                print(f"[WARN] Skipping unsafe archive member: {info.filename} in {archive_path}")
+                continue
+            members.append(info.filename)
+    if debug: print(f"[DEBUG] {archive_path}: {len(members)} STEP member(s)")
+    return sorted(members)
+
+
+def member_output_stem(ref):
+    """
+    Relative output path (without extension) of an archive member: the
+    archive stem followed by the member's own folders and stem, so parts with
+    the same name in different folders of an archive stay apart.
+    """
+    archive_path, member = split_member_ref(ref)
+    archive_stem = os.path.splitext(os.path.basename(archive_path))[0]
+    member_path = _safe_member(member)
+    if member_path is None:
+        raise ValueError(f"Unsafe archive member path: {member}")
+    return os.path.join(archive_stem, *os.path.splitext(member_path)[0].split("/"))
+
+
+@contextlib.contextmanager
+def spool_member(archive_path, member, spool_dir=None, chunk_size=SPOOL_CHUNK_SIZE):
+    """
+    Stream one member into a temporary file and yield its path; the file is
+    deleted on exit. `spool_dir` defaults to the system temp directory.
+    """
+    extension = os.path.splitext(member)[1].lower() or ".step"
+    with zipfile.ZipFile(archive_path) as archive:
+        info = archive.getinfo(member)
+        fd, spool_path = tempfile.mkstemp(prefix="member_", suffix=extension, dir=spool_dir)
+        try:
+            with os.fdopen(fd, "wb") as out, archive.open(info) as source:
+                shutil.copyfileobj(source, out, chunk_size)
+            yield spool_path
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(spool_path)
+
+
+@contextlib.contextmanager
+def open_step_source(ref, spool_dir=None):
+    """Yield a local path for a STEP path or archive member reference."""
+    archive_path, member = split_member_ref(ref)
+    if member is None:
+        yield ref
+        return
+    with spool_member(archive_path, member, spool_dir=spool_dir) as path:
+        yield path
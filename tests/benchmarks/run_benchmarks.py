@@ -0,0 +1,210 @@
+# tests/benchmarks/run_benchmarks.py
+
+# -----------------------------------------------------------------------------
+# Extraction Pipeline Benchmarks
+# Usage: python3 tests/benchmarks/run_benchmarks.py [--sizes small medium large]
+#                                                   [--update-baseline]
+#                                                   [--require-baseline]
+#
+# Times each phase of the domain extraction separately on synthetic STEP
+# models (gmsh.open, OCC synchronize, getBoundingBox, domain build, schema
+# validation, JSON write) and records the peak RSS of the measuring process.
+# Every model is measured in a fresh spawned process so peak memory is not
+# inherited from a previous, larger model.
+#
+# Results are written as JSON and compared with a stored baseline; any phase
+# or peak memory beyond its tolerance is reported and the script exits 1.
+# Baselines are machine specific: record one with --update-baseline on the
+# machine that will run the comparison. A missing baseline only warns (CI
+# runners are ephemeral and start without one); --require-baseline turns it
+# into a failure on machines that keep their baseline.
+# -----------------------------------------------------------------------------
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(os.path.dirname(BENCHMARK_DIR))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from tests.benchmarks.synthetic_models import MODEL_SIZES, ensure_model, model_name
+
+DEFAULT_MODELS_DIR = os.path.join(BENCHMARK_DIR, "models")
+DEFAULT_RESULTS_PATH = os.path.join(BENCHMARK_DIR, "results.json")
+DEFAULT_BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baseline.json")
+SCHEMA_PATH = os.path.join(REPO_ROOT, "schemas", "domain_schema.json")
+
+PHASES = ("open", "synchronize", "bounding_box", "build_domain", "validate", "write")
+
+# A phase regresses when it is both this much slower relative to the
+# baseline and slower by more than MIN_DELTA_S (sub-millisecond noise guard)
+DEFAULT_TIME_TOLERANCE = 0.25
+DEFAULT_MEMORY_TOLERANCE = 0.15
+MIN_DELTA_S = 0.005
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 2)
+
+
+def measure_model(step_path, cells, repeats):
+    """Run the extraction phases `repeats` times in this process; medians in seconds."""
+    import gmsh
+    from src.gmsh_runner import build_domain
+    from src.domain_definition_writer import load_schema_validator
+
+    validator = load_schema_validator(SCHEMA_PATH)
+    samples = {phase: [] for phase in PHASES}
+    gmsh.initialize()
+    gmsh.option.setNumber("General.Terminal", 0)
+    try:
+        baseline_rss = _peak_rss_mb()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for _ in range(repeats):
+                gmsh.clear()
+                marks = [time.perf_counter()]
+                gmsh.open(step_path)
+                marks.append(time.perf_counter())
+                gmsh.model.occ.synchronize()
+                marks.append(time.perf_counter())
+                bbox = gmsh.model.getBoundingBox(-1, -1)
+                marks.append(time.perf_counter())
+                domain = build_domain(bbox, nx=cells, ny=cells, nz=cells)
+                marks.append(time.perf_counter())
+                validator.validate(domain)
+                marks.append(time.perf_counter())
+                with open(os.path.join(tmp_dir, "domain.json"), "w") as f:
+                    json.dump(domain, f, indent=2)
+                marks.append(time.perf_counter())
+                for phase, start, end in zip(PHASES, marks, marks[1:]):
+                    samples[phase].append(end - start)
+            faces = len(gmsh.model.getEntities(2))
+    finally:
+        gmsh.finalize()
+
+    return {
+        "faces": faces,
+        "file_bytes": os.path.getsize(step_path),
+        "phases": {phase: round(statistics.median(values), 6) for phase, values in samples.items()},
+        "total_s": round(sum(statistics.median(values) for values in samples.values()), 6),
+        "peak_rss_mb": _peak_rss_mb(),
+        "startup_rss_mb": baseline_rss,
+    }
+
+
+def run_benchmarks(sizes, models_dir=DEFAULT_MODELS_DIR, cells=32, repeats=3):
+    """Generate (if needed) and measure every model of the requested tiers."""
+    import gmsh  # noqa: F401  (fail early when the bindings are unavailable)
+    from src.result_cache import gmsh_version
+
+    ctx = multiprocessing.get_context("spawn")
+    models = {}
+    for size in sizes:
+        for kind, n in MODEL_SIZES[size]:
+            name = model_name(kind, n)
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                step_path = pool.submit(ensure_model, kind, n, models_dir).result()
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                result = pool.submit(measure_model, step_path, cells, repeats).result()
+            result["size"] = size
+            models[name] = result
+            print(f"[INFO] {name}: {result['faces']} faces, total {result['total_s']:.4f}s, "
+                  f"peak {result['peak_rss_mb']} MiB")
+
+    return {
+        "environment": {
+            "gmsh": gmsh_version(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "system": platform.system(),
+            "cpu_count": os.cpu_count(),
+        },
+        "cells": cells,
+        "repeats": repeats,
+        "models": models,
+    }
+
+
+def compare_to_baseline(results, baseline, time_tolerance=DEFAULT_TIME_TOLERANCE,
+                        memory_tolerance=DEFAULT_MEMORY_TOLERANCE, min_delta_s=MIN_DELTA_S):
+    """Return human-readable regression lines; models absent on either side are skipped."""
+    regressions = []
+    for name, current in sorted(results["models"].items()):
+        reference = baseline.get("models", {}).get(name)
+        if reference is None:
+            continue
+        for phase in PHASES:
+            now = current["phases"].get(phase)
+            then = reference["phases"].get(phase)
+            if now is None or then is None:
+                continue
+            if now > then * (1 + time_tolerance) and now - then > min_delta_s:
+                regressions.append(
+                    f"{name} {phase}: {now:.6f}s vs baseline {then:.6f}s (+{(now / then - 1) * 100 if then else float('inf'):.0f}%)"
+                )
+        now, then = current["peak_rss_mb"], reference["peak_rss_mb"]
+        if now > then * (1 + memory_tolerance):
+            regressions.append(f"{name} peak_rss_mb: {now} MiB vs baseline {then} MiB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark domain extraction on synthetic STEP models.")
+    parser.add_argument("--sizes", nargs="+", choices=list(MODEL_SIZES), default=["small", "medium"], help="Model tiers to run")
+    parser.add_argument("--models-dir", type=str, default=DEFAULT_MODELS_DIR, help="Where generated STEP models are kept")
+    parser.add_argument("--cells", type=int, default=32, help="Cells per axis of the benchmark domain")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per model (median reported)")
+    parser.add_argument("--output", type=str, default=DEFAULT_RESULTS_PATH, help="Results JSON path")
+    parser.add_argument("--baseline", type=str, default=DEFAULT_BASELINE_PATH, help="Baseline JSON path")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--require-baseline", action="store_true", help="Exit 1 when there is no baseline to compare with")
+    parser.add_argument("--time-tolerance", type=float, default=DEFAULT_TIME_TOLERANCE, help="Allowed relative slowdown per phase")
+    parser.add_argument("--memory-tolerance", type=float, default=DEFAULT_MEMORY_TOLERANCE, help="Allowed relative peak RSS growth")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, models_dir=args.models_dir, cells=args.cells, repeats=args.repeats)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"[INFO] Benchmark results written to: {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"[INFO] Baseline updated: {args.baseline}")
+        return
+
+    if not os.path.isfile(args.baseline):
+        if args.require_baseline:
+            print(f"[ERROR] ❌ No baseline at {args.baseline}; record one with --update-baseline on this runner.")
+            sys.exit(1)
+        print(f"[WARN] No baseline at {args.baseline}; run with --update-baseline to record one.")
+        return
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    if baseline.get("environment") != results["environment"]:
+        print(f"[WARN] Baseline environment differs: {baseline.get('environment')} vs {results['environment']}")
+
+    regressions = compare_to_baseline(results, baseline, time_tolerance=args.time_tolerance,
+                                      memory_tolerance=args.memory_tolerance)
+    if regressions:
+        print(f"[ERROR] ❌ {len(regressions)} benchmark regression(s):")
+        for line in regressions:
+            print(f"        {line}")
+        sys.exit(1)
+    print("[INFO] ✅ No benchmark regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# tests/benchmarks/synthetic_models.py
+
+# -----------------------------------------------------------------------------
+# Synthetic STEP models for the extraction benchmarks.
+# Models are built with the Gmsh OCC kernel and written once into a models
+# directory; later runs reuse the files. Two families scale independently:
+#   block_holes  - one plate drilled with an n x n grid of through holes
+#                  (a single solid whose face count grows with n^2)
+#   assembly     - n x n x n disjoint boxes written as one file
+#                  (6 n^3 faces, stands in for large multi-part assemblies)
+# -----------------------------------------------------------------------------
+
+import os
+
+# gmsh is imported by the functions that build models, so the tier tables and
+# the baseline comparison load without the Gmsh shared library
+
+MODEL_KINDS = ("block_holes", "assembly")
+
+# Benchmark tiers: (kind, n) pairs, from a few faces to tens of thousands
+MODEL_SIZES = {
+    "small": [("block_holes", 2), ("assembly", 2)],
+    "medium": [("block_holes", 12), ("assembly", 8)],
+    "large": [("block_holes", 40), ("assembly", 18)],
+}
+
+
+def model_name(kind, n):
+    return f"{kind}_{n}"
+
+
+def _build_block_holes(n):
+    import gmsh
+    occ = gmsh.model.occ
+    plate = occ.addBox(0, 0, 0, 10 * n, 10 * n, 4)
+    holes = [
+        (3, occ.addCylinder(10 * i + 5, 10 * j + 5, -1, 0, 0, 6, 2.5))
+        for i in range(n) for j in range(n)
+    ]
+    occ.cut([(3, plate)], holes)
+
+
+def _build_assembly(n):
+    import gmsh
+    occ = gmsh.model.occ
+    for i in range(n):
+        for j in range(n):
+            for k in range(n):
+                occ.addBox(3 * i, 3 * j, 3 * k, 2, 2, 2)
+
+
+def generate_model(kind, n, path):
+    """Write a synthetic model to `path` (STEP) and return its face count."""
+    if kind not in MODEL_KINDS:
+        raise ValueError(f"Unknown model kind '{kind}', expected one of {MODEL_KINDS}")
+    import gmsh
+    owns_session = not gmsh.isInitialized()
+    if owns_session:
+        gmsh.initialize()
+    try:
+        gmsh.option.setNumber("General.Terminal", 0)
+        gmsh.clear()
+        gmsh.model.add(model_name(kind, n))
+        _build_block_holes(n) if kind == "block_holes" else _build_assembly(n)
+        gmsh.model.occ.synchronize()
+        faces = len(gmsh.model.getEntities(2))
+
+        # gmsh.write picks the format from the extension, so keep ".step" last
+        tmp_path = f"{path[:-len('.step')]}.partial.step"
+        gmsh.write(tmp_path)
+        os.replace(tmp_path, path)
+        return faces
+    finally:
+        if owns_session:
+            gmsh.finalize()
+
+
+def ensure_model(kind, n, models_dir):
+    """Return the path of a synthetic model, generating it on first use."""
+    os.makedirs(models_dir, exist_ok=True)
+    path = os.path.join(models_dir, f"{model_name(kind, n)}.step")
+    if not os.path.isfile(path):
+        generate_model(kind, n, path)
+    return path
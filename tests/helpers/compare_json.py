@@ -5,74 +5,320 @@
 # Usage: python3 compare_json.py <expected_path> <output_path>
 # Compares two JSON files (expected vs generated) and exits with code 1 on mismatch.
 # Crucially, it saves a detailed diff file on mismatch for manual review.
+#
+# Large arrays (e.g. 'geometry_mask_flat') are never loaded as Python lists:
+# the document is first reduced to a small "skeleton" with those arrays
+# replaced by null, and the arrays themselves are streamed from disk in
+# bounded chunks and compared with NumPy. Binary mask sidecars referenced by
+# a 'geometry_mask' descriptor are compared slab by slab through memmaps.
 # -----------------------------------------------------------------------------
 
 import json
+import re
 import sys
 import argparse
 import difflib
 from pathlib import Path
 
+import numpy as np
+
 # Define the directory where detailed error reports should be saved
 ERROR_OUTPUT_DIR = Path("tests/integration_tests_errors")
 
+# Keys whose array values are streamed instead of parsed, at any depth (an
+# assembly repeats geometry_mask_flat in every part)
+LARGE_ARRAY_KEYS = ("geometry_mask_flat",)
+
+# Number of mismatching indices listed in reports
+MAX_REPORTED_MISMATCHES = 20
+
+READ_BLOCK_SIZE = 1 << 20
+_KEY_LOOKBEHIND = 256
+
+
+def _array_start_pattern(keys):
+    names = b"|".join(re.escape(k.encode("utf-8")) for k in keys)
+    return re.compile(b'"(' + names + b')"\\s*:\\s*\\[')
+
+
+def split_document(path, keys=LARGE_ARRAY_KEYS, block_size=None):
+    """
+    Stream a JSON file once and return (skeleton, array_offsets).
+
+    `skeleton` is the parsed document with every large array replaced by None;
+    `array_offsets` maps each such key to the byte offsets just past the '['
+    of each of its arrays, in document order (keys repeat in nested objects).
+    `block_size` defaults to READ_BLOCK_SIZE, read at call time.
+    """
+    block_size = block_size or READ_BLOCK_SIZE
+    pattern = _array_start_pattern(keys)
+    skeleton_parts = []
+    offsets = {}
+    pending = b""
+    pending_start = 0  # Absolute byte offset of pending[0]
+    skipping = False
+
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            pending += block
+            while True:
+                if skipping:
+                    end = pending.find(b"]")
+                    if end < 0:
+                        pending_start += len(pending)
+                        pending = b""
+                        break
+                    pending_start += end + 1
+                    pending = pending[end + 1:]
+                    skipping = False
+                match = pattern.search(pending)
+                if match is None:
+                    break
+                skeleton_parts.append(pending[:match.end() - 1])
+                skeleton_parts.append(b"null")
+                offsets.setdefault(match.group(1).decode("utf-8"), []).append(pending_start + match.end())
+                pending_start += match.end()
+                pending = pending[match.end():]
+                skipping = True
+            if not block:
+                break
+            if not skipping and len(pending) > _KEY_LOOKBEHIND:
+                # Keep a tail in case a key straddles the block boundary
+                keep = len(pending) - _KEY_LOOKBEHIND
+                skeleton_parts.append(pending[:keep])
+                pending_start += keep
+                pending = pending[keep:]
+
+    if skipping:
+        raise json.JSONDecodeError("Unterminated array", "", pending_start)
+    skeleton_parts.append(pending)
+    skeleton = json.loads(b"".join(skeleton_parts).decode("utf-8"))
+    return skeleton, offsets
+
+
+def iter_array_chunks(path, offset, block_size=None):
+    """Yield float64 NumPy chunks of a flat numeric JSON array starting at `offset`."""
+    block_size = block_size or READ_BLOCK_SIZE
+    with open(path, "rb") as f:
+        f.seek(offset)
+        tail = b""
+        while True:
+            block = f.read(block_size)
+            if not block:
+                raise json.JSONDecodeError("Unterminated array", "", offset)
+            text = tail + block
+            end = text.find(b"]")
+            if end >= 0:
+                body = text[:end].strip()
+                if body:
+                    yield np.array(body.split(b","), dtype=np.float64)
+                return
+            cut = text.rfind(b",")
+            if cut < 0:
+                tail = text
+                continue
+            if text[:cut].strip():
+                yield np.array(text[:cut].split(b","), dtype=np.float64)
+            tail = text[cut + 1:]
+
+
+class MismatchSummary:
+    """Bounded record of an element-wise comparison: counts plus the first few indices."""
+
+    def __init__(self, name, limit=MAX_REPORTED_MISMATCHES):
+        self.name = name
+        self.limit = limit
+        self.expected_length = 0
+        self.output_length = 0
+        self.mismatches = 0
+        self.first = []
+
+    def add(self, start, expected, output):
+        diff = np.flatnonzero(expected != output)
+        self.mismatches += int(diff.size)
+        for index in diff[:max(0, self.limit - len(self.first))]:
+            self.first.append((start + int(index), expected[index].item(), output[index].item()))
+
+    @property
+    def failed(self):
+        return self.mismatches > 0 or self.expected_length != self.output_length
+
+    def report(self):
+        lines = [
+            "=========================================================================",
+            f"⚠️ ARRAY MISMATCH DETECTED: '{self.name}'",
+            f"   Expected length: {self.expected_length}, Generated length: {self.output_length}",
+            f"   Mismatching values over the common length: {self.mismatches}",
+        ]
+        if self.first:
+            lines.append(f"   First {len(self.first)} mismatching indices (index: expected → generated):")
+            lines.extend(f"     {i}: {e} → {o}" for i, e, o in self.first)
+        lines.append("=========================================================================")
+        return "\n".join(lines) + "\n"
+
+
+def _compare_streams(summary, expected_chunks, output_chunks):
+    """Walk two chunk streams in lockstep regardless of how each is chunked."""
+    expected_buf = np.empty(0)
+    output_buf = np.empty(0)
+    position = 0
+    expected_done = output_done = False
+    while True:
+        if expected_buf.size == 0 and not expected_done:
+            expected_buf = next(expected_chunks, None)
+            if expected_buf is None:
+                expected_done, expected_buf = True, np.empty(0)
+            summary.expected_length += expected_buf.size
+        if output_buf.size == 0 and not output_done:
+            output_buf = next(output_chunks, None)
+            if output_buf is None:
+                output_done, output_buf = True, np.empty(0)
+            summary.output_length += output_buf.size
+        if expected_done and output_done:
+            return summary
+        common = min(expected_buf.size, output_buf.size)
+        if common == 0:
+            if expected_done:
+                output_buf = np.empty(0)  # Only counting the surplus from here on
+            if output_done:
+                expected_buf = np.empty(0)
+            continue
+        summary.add(position, expected_buf[:common], output_buf[:common])
+        position += common
+        expected_buf = expected_buf[common:]
+        output_buf = output_buf[common:]
+
+
+def compare_large_array(key, expected_path, expected_offset, output_path, output_offset):
+    summary = MismatchSummary(key)
+    return _compare_streams(
+        summary,
+        iter_array_chunks(expected_path, expected_offset),
+        iter_array_chunks(output_path, output_offset),
+    )
+
+
+def _mask_sidecar(descriptor, json_path):
+    path = Path(descriptor["path"])
+    return path if path.is_absolute() else Path(json_path).parent / path
+
+
+def _iter_mask_rows(descriptor, json_path, rows_per_chunk=64):
+    """Yield the dense sidecar mask as flat uint8 chunks (x fastest), slab by slab."""
+    from src.mask_io import load_mask_array, read_mask_slab
+    base_dir = str(Path(json_path).parent)
+    array = load_mask_array(descriptor, base_dir=base_dir)
+    for k in range(0, array.shape[0], rows_per_chunk):
+        yield read_mask_slab(descriptor, k, k + rows_per_chunk, array=array).reshape(-1)
+
+
+def compare_mask_sidecars(expected_descriptor, expected_path, output_descriptor, output_path):
+    summary = MismatchSummary("geometry_mask")
+    if expected_descriptor.get("shape") == output_descriptor.get("shape") and \
+            expected_descriptor.get("encoding") == output_descriptor.get("encoding") and \
+            expected_descriptor.get("sha256") == output_descriptor.get("sha256"):
+        size = int(np.prod(expected_descriptor["shape"]))
+        summary.expected_length = summary.output_length = size
+        return summary
+    return _compare_streams(
+        summary,
+        _iter_mask_rows(expected_descriptor, expected_path),
+        _iter_mask_rows(output_descriptor, output_path),
+    )
+
+
+def _comparable_descriptor(descriptor):
+    # Paths and encodings may legitimately differ; content is compared separately
+    return {k: v for k, v in descriptor.items()
+            if k not in ("path", "encoding", "bitorder", "sha256")}
+
+
+def _write_error_report(expected_path, output_path, content):
+    try:
+        ERROR_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        error_filename = f"diff_{expected_path.stem}_{output_path.stem}.txt"
+        error_filepath = ERROR_OUTPUT_DIR / error_filename
+        with open(error_filepath, 'w') as f:
+            f.write(content)
+        print(f"📄 Detailed error file saved to: {error_filepath}")
+    except Exception as e:
+        print(f"Error saving detailed error file: {e}")
+
+
+def _cleanup_output(output_path, output_sidecar=None):
+    if output_sidecar is not None:
+        output_sidecar.unlink(missing_ok=True)
+    output_path.unlink(missing_ok=True)
+
 
 def compare_json_outputs(expected_path: str, output_path: str):
     """
     Loads, compares, and prints a unified diff for two JSON files.
     Exits with status 1 on failure (mismatch), 0 on success (match).
-    
+
+    Large arrays and binary mask sidecars are compared in bounded memory;
+    only their mismatch counts and first mismatching indices are reported.
     If the test fails, a detailed error report is saved to the ERROR_OUTPUT_DIR.
     """
     expected_path = Path(expected_path)
     output_path = Path(output_path)
-    
-    # 1. Load files
+
+    # 1. Load document skeletons (large arrays stay on disk)
     try:
-        with open(expected_path) as f:
-            expected = json.load(f)
-        with open(output_path) as f:
-            output = json.load(f)
+        expected, expected_offsets = split_document(expected_path)
+        output, output_offsets = split_document(output_path)
     except FileNotFoundError:
         print(f'❌ INTEGRATION TEST FAILED: Missing generated output file {output_path.name}.')
         sys.exit(1)
-    except json.JSONDecodeError:
+    except (json.JSONDecodeError, UnicodeDecodeError):
         print(f'❌ INTEGRATION TEST FAILED: Generated output file {output_path.name} is invalid JSON.')
         sys.exit(1)
 
-    # 2. Compare content
-    if expected != output:
-        
+    output_mask = output.get("geometry_mask")
+    output_sidecar = None
+    if isinstance(output_mask, dict) and "path" in output_mask:
+        output_sidecar = _mask_sidecar(output_mask, output_path)
+
+    # 2. Compare large arrays and sidecars chunk by chunk
+    array_summaries = []
+    try:
+        for key in sorted(set(expected_offsets) & set(output_offsets)):
+            # Occurrences pair up in document order; a count mismatch shows in the skeletons
+            pairs = list(zip(expected_offsets[key], output_offsets[key]))
+            for i, (expected_offset, output_offset) in enumerate(pairs):
+                array_summaries.append(compare_large_array(
+                    key if len(pairs) == 1 else f"{key} #{i + 1}",
+                    expected_path, expected_offset, output_path, output_offset
+                ))
+        expected_mask = expected.get("geometry_mask")
+        if isinstance(expected_mask, dict) and isinstance(output_mask, dict):
+            array_summaries.append(compare_mask_sidecars(expected_mask, expected_path, output_mask, output_path))
+            expected["geometry_mask"] = _comparable_descriptor(expected_mask)
+            output["geometry_mask"] = _comparable_descriptor(output_mask)
+    except (ValueError, OSError, json.JSONDecodeError) as e:
+        print(f'❌ INTEGRATION TEST FAILED: Could not read array data for {output_path.name}: {e}')
+        _cleanup_output(output_path, output_sidecar)
+        sys.exit(1)
+
+    failed_arrays = [s for s in array_summaries if s.failed]
+
+    # 3. Compare the remaining (small) document structure
+    if expected != output or failed_arrays:
+
         # Initialize output string for console and file
         error_output_content = ""
         error_output_content += f'❌ INTEGRATION TEST FAILED: Output mismatch for {expected_path.name}\n'
+        for summary in failed_arrays:
+            error_output_content += summary.report()
 
-        show_full_diff = True
-        
-        # --- Enhanced Check for Array Length Mismatch ---
-        # This check helps provide better initial error reporting for large array changes.
-        if 'geometry_mask_flat' in expected and 'geometry_mask_flat' in output:
-            expected_mask = expected['geometry_mask_flat']
-            output_mask = output['geometry_mask_flat']
-            
-            if isinstance(expected_mask, list) and isinstance(output_mask, list) and len(expected_mask) != len(output_mask):
-                show_full_diff = False # Suppress the giant diff in console/diff output
-                
-                error_output_content += "=========================================================================\n"
-                error_output_content += f"⚠️ CRITICAL MISMATCH DETECTED: 'geometry_mask_flat' array length differs.\n"
-                error_output_content += f"   Expected length: {len(expected_mask)}, Generated length: {len(output_mask)}\n"
-                error_output_content += "   Full JSON diff suppressed due to array size difference. See full JSON outputs below.\n"
-                error_output_content += "=========================================================================\n"
-                
         # Print initial error content
         print(error_output_content, end='')
 
-        # Convert dicts to sorted, indented JSON strings for use in diff or raw output
-        expected_str = json.dumps(expected, indent=2, sort_keys=True)
-        output_str = json.dumps(output, indent=2, sort_keys=True)
-        
-        if show_full_diff:
-            # If the difference is small enough, calculate and display the unified diff
+        if expected != output:
+            # Large arrays appear as null here; their differences are summarized above
+            expected_str = json.dumps(expected, indent=2, sort_keys=True)
+            output_str = json.dumps(output, indent=2, sort_keys=True)
             diff_lines = list(difflib.unified_diff(
                 expected_str.splitlines(keepends=True),
                 output_str.splitlines(keepends=True),
@@ -83,50 +329,28 @@ def compare_json_outputs(expected_path: str, output_path: str):
 
             diff_header = '\n--- JSON UNIFIED DIFF (Expected vs Generated) ---\n'
             diff_footer = '-------------------------------------------------\n'
-            
+
             # Add diff to both file content and console output
             error_output_content += diff_header
             error_output_content += "".join(diff_lines)
             error_output_content += diff_footer
-            
+
             # Print the diff to console
             print(diff_header, end='')
             sys.stdout.writelines(diff_lines)
             print(diff_footer, end='')
-        else:
-            # If the difference is too large (like mask length mismatch), provide the raw JSONs instead of a diff
-            error_output_content += '\n--- EXPECTED JSON CONTENT ---\n'
-            error_output_content += expected_str
-            error_output_content += '\n-------------------------------\n'
-            
-            error_output_content += '\n--- GENERATED OUTPUT JSON CONTENT ---\n'
-            error_output_content += output_str
-            error_output_content += '\n-------------------------------------\n'
-            
-            # Print a note to console indicating where the full output is saved
-            print('\n--- NOTE: Full raw JSONs included in error report file for inspection. ---')
-
 
         # --- Write Detailed Error File to the integration_tests_errors folder ---
-        try:
-            ERROR_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-            error_filename = f"diff_{expected_path.stem}_{output_path.stem}.txt"
-            error_filepath = ERROR_OUTPUT_DIR / error_filename
-            with open(error_filepath, 'w') as f:
-                f.write(error_output_content)
-            print(f"📄 Detailed error file saved to: {error_filepath}")
-        except Exception as e:
-            print(f"Error saving detailed error file: {e}")
-
+        _write_error_report(expected_path, output_path, error_output_content)
 
         # Clean up temporary output file before exiting on failure
-        output_path.unlink(missing_ok=True)
+        _cleanup_output(output_path, output_sidecar)
         sys.exit(1) # FAIL the CI job on mismatch
     else:
         print(f'✅ INTEGRATION TEST PASSED: {expected_path.name} matches expected output.')
 
     # Clean up temporary output file on success
-    output_path.unlink(missing_ok=True)
+    _cleanup_output(output_path, output_sidecar)
     sys.exit(0) # PASS the CI job on match
 
 
@@ -137,7 +361,3 @@ if __name__ == "__main__":
     args = parser.parse_args()
 
     compare_json_outputs(args.expected_path, args.output_path)
-
-
-
-
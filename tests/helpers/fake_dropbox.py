@@ -0,0 +1,127 @@
+# tests/helpers/fake_dropbox.py
+
+# -----------------------------------------------------------------------------
+# In-memory stand-in for the subset of dropbox.Dropbox used by the transfer
+# scripts. Files live in a dict keyed by lower-cased path; listings page in
+# small batches so pagination code paths are exercised. Upload sessions buffer
+# their bytes until a finish-batch call commits them.
+# -----------------------------------------------------------------------------
+
+import itertools
+import threading
+
+import dropbox
+
+from src.dropbox_sync import dropbox_content_hash_bytes as content_hash
+
+
+class FakeResponse:
+    """Minimal streaming response, mimicking requests.Response."""
+
+    def __init__(self, content):
+        self.content = content
+        self.closed = False
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+class _ListResult:
+    def __init__(self, entries, cursor, has_more):
+        self.entries = entries
+        self.cursor = cursor
+        self.has_more = has_more
+
+
+class _SessionStart:
+    def __init__(self, session_id):
+        self.session_id = session_id
+
+
+class _FinishBatchResult:
+    def __init__(self, entries):
+        self.entries = entries
+
+
+class FakeDropbox:
+    def __init__(self, files=None, page_size=2, fail_downloads=(), fail_commits=()):
+        self.files = {path.lower(): data for path, data in (files or {}).items()}
+        self.display = {path.lower(): path for path in (files or {})}
+        self.page_size = page_size
+        self.fail_downloads = set(fail_downloads)
+        self.fail_commits = {path.lower() for path in fail_commits}
+        self.sessions = {}
+        self.calls = []
+        self._lock = threading.Lock()
+        self._session_ids = itertools.count(1)
+
+    def _record(self, name, *args):
+        with self._lock:
+            self.calls.append((name,) + args)
+
+    def _metadata(self, path):
+        display = self.display.get(path, path)
+        return dropbox.files.FileMetadata(
+            name=display.rsplit("/", 1)[-1], path_lower=path, path_display=display,
+            id=f"id:{path}", size=len(self.files[path]), content_hash=content_hash(self.files[path])
+        )
+
+    def _page(self, folder, start):
+        folder = folder.lower().rstrip("/")
+        paths = sorted(p for p in self.files if p.rsplit("/", 1)[0] == folder)
+        entries = [self._metadata(p) for p in paths[start:start + self.page_size]]
+        has_more = start + self.page_size < len(paths)
+        return _ListResult(entries, f"{folder}|{start + self.page_size}", has_more)
+
+    # --- Listing --------------------------------------------------------------
+    def files_list_folder(self, path):
+        self._record("files_list_folder", path)
+        return self._page(path, 0)
+
+    def files_list_folder_continue(self, cursor):
+        self._record("files_list_folder_continue", cursor)
+        folder, start = cursor.split("|")
+        return self._page(folder, int(start))
+
+    # --- Downloads ------------------------------------------------------------
+    def files_download(self, path):
+        self._record("files_download", path)
+        if path in self.fail_downloads:
+            raise IOError(f"simulated failure for {path}")
+        return self._metadata(path), FakeResponse(self.files[path])
+
+    # --- Uploads --------------------------------------------------------------
+    def files_upload_session_start(self, f, close=False):
+        self._record("files_upload_session_start", len(f), close)
+        with self._lock:
+            session_id = f"session-{next(self._session_ids)}"
+            self.sessions[session_id] = {"data": bytearray(f), "closed": close}
+        return _SessionStart(session_id)
+
+    def files_upload_session_append_v2(self, f, cursor, close=False):
+        self._record("files_upload_session_append_v2", len(f), cursor.offset, close)
+        session = self.sessions[cursor.session_id]
+        if session["closed"] or cursor.offset != len(session["data"]):
+            raise IOError(f"bad append to {cursor.session_id} at offset {cursor.offset}")
+        session["data"].extend(f)
+        session["closed"] = close
+
+    def files_upload_session_finish_batch_v2(self, entries):
+        self._record("files_upload_session_finish_batch_v2", len(entries))
+        results = []
+        for arg in entries:
+            path = arg.commit.path.lower()
+            session = self.sessions.pop(arg.cursor.session_id)
+            if path in self.fail_commits or arg.cursor.offset != len(session["data"]):
+                results.append(dropbox.files.UploadSessionFinishBatchResultEntry.failure(
+                    dropbox.files.UploadSessionFinishError.other
+                ))
+                continue
+            self.files[path] = bytes(session["data"])
+            self.display[path] = arg.commit.path
+            results.append(dropbox.files.UploadSessionFinishBatchResultEntry.success(self._metadata(path)))
+        return _FinishBatchResult(results)
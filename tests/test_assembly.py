@@ -0,0 +1,105 @@
+# tests/test_assembly.py
+
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+from jsonschema import validate
+from src import assembly
+from src.assembly import attach_part_masks, part_budget, part_mask_path, split_surface
+from src.gmsh_runner import build_domain, load_schema, SCHEMA_PATH
+from src.mask_io import load_mask_array, verify_mask_file
+from tests.test_occupancy_mask import box_surface
+
+# Two boxes side by side (surfaces 1 and 2), a third one (surfaces 3 and 4) above them
+BOXES = [((0.0, 0.0, 0.0), (1.0, 1.0, 1.0)), ((2.0, 0.0, 0.0), (3.0, 2.0, 1.0)), ((0.0, 0.0, 2.0), (3.0, 1.0, 4.0))]
+PART_SURFACES = [[1], [2], [3, 4]]
+_mask_part = assembly._mask_part
+
+
+def assembly_surface():
+    vertices, triangles, entities = [], [], []
+    for (lo, hi), surfaces in zip(BOXES, PART_SURFACES):
+        box_vertices, box_triangles = box_surface(lo, hi)
+        triangles.append(box_triangles + sum(len(v) for v in vertices))
+        vertices.append(box_vertices)
+        # Split a box over several surface tags the way Gmsh splits a volume into faces
+        entities.append(np.array(surfaces)[np.arange(len(box_triangles)) % len(surfaces)])
+    return np.concatenate(vertices), np.concatenate(triangles), np.concatenate(entities).astype(np.int32)
+
+
+def assembly_parts(lc=0.25):
+    return [{"index": i, "tag": i + 1, "name": f"box_{i}", **build_domain((*lo, *hi), lc=lc)}
+            for i, (lo, hi) in enumerate(BOXES)]
+
+def _crash_on_box_1(task):
+    part, *_ = task
+    # Crashes once when given a marker file to leave behind, on every attempt otherwise
+    marker = os.environ.get("ASSEMBLY_CRASH_MARKER")
+    if part["name"] == "box_1" and not (marker and os.path.exists(marker)):
+        if marker:
+            open(marker, "w").close()
+        os._exit(1)  # What an out-of-memory kill looks like to the pool
+    return _mask_part(task)
+
+# ✅ Each part gets exactly its own triangles, on a compacted vertex array
+def test_split_surface():
+    vertices, triangles, entities = assembly_surface()
+    for (lo, hi), (part_vertices, part_triangles) in zip(BOXES, split_surface(vertices, triangles, entities,
+                                                                              PART_SURFACES)):
+        box_vertices, box_triangles = box_surface(lo, hi)
+        assert part_triangles.shape == box_triangles.shape and len(part_vertices) == 8
+        assert sorted(map(tuple, part_vertices[part_triangles].reshape(-1, 3))) == \
+            sorted(map(tuple, box_vertices[box_triangles].reshape(-1, 3)))
+    empty_vertices, empty_triangles = next(split_surface(vertices, triangles, entities, [[99]]))
+    assert empty_vertices.shape == (0, 3) and empty_triangles.shape == (0, 3)
+
+# ✅ A process pool gives the same part masks as the in-process path, and they validate
+def test_part_masks_pool_matches_inline():
+    surface = assembly_surface()
+    inline = attach_part_masks(assembly_parts(), PART_SURFACES, *surface, workers=1)
+    pooled = attach_part_masks(assembly_parts(), PART_SURFACES, *surface, workers=3)
+    assert pooled == inline
+    # Every part fills its own bounding box
+    assert [part["geometry_mask_shape"] for part in inline] == [[4, 4, 4], [4, 8, 4], [12, 4, 8]]
+    assert all(set(part["geometry_mask_flat"]) == {1} for part in inline)
+
+    domain = {**build_domain((0.0, 0.0, 0.0, 3.0, 2.0, 4.0), lc=0.5), "parts": inline}
+    validate(instance=domain, schema=load_schema(SCHEMA_PATH))
+
+# ✅ With a sidecar path every part writes its own mask file beside the combined one
+def test_part_mask_sidecars(tmp_path):
+    mask_path = str(tmp_path / "out_mask.npy")
+    parts = attach_part_masks(assembly_parts(), PART_SURFACES, *assembly_surface(), mask_path=mask_path,
+                              mask_encoding="packbits", workers=2)
+    for part in parts:
+        assert part["geometry_mask"]["path"] == f"out_mask_part{part['index']:04d}.npy"
+        assert verify_mask_file(part["geometry_mask"], base_dir=str(tmp_path))
+        assert load_mask_array(part["geometry_mask"], base_dir=str(tmp_path)).all()
+    assert part_mask_path(mask_path, 12).endswith("out_mask_part0012.npy")
+
+    domain = {**build_domain((0.0, 0.0, 0.0, 3.0, 2.0, 4.0), lc=0.5), "parts": parts}
+    validate(instance=domain, schema=load_schema(SCHEMA_PATH))
+
+# ✅ A part lost with a dead worker is masked again on a fresh pool
+def test_part_masks_survive_dead_worker(tmp_path, monkeypatch):
+    inline = attach_part_masks(assembly_parts(), PART_SURFACES, *assembly_surface(), workers=1)
+    monkeypatch.setenv("ASSEMBLY_CRASH_MARKER", str(tmp_path / "crashed"))
+    monkeypatch.setattr(assembly, "_mask_part", _crash_on_box_1)
+    assert attach_part_masks(assembly_parts(), PART_SURFACES, *assembly_surface(), workers=3) == inline
+    assert (tmp_path / "crashed").exists()
+
+# ❌ A part that kills its worker even alone fails the run instead of hanging it
+def test_part_masks_dead_worker_alone(monkeypatch):
+    monkeypatch.delenv("ASSEMBLY_CRASH_MARKER", raising=False)
+    monkeypatch.setattr(assembly, "_mask_part", _crash_on_box_1)
+    with pytest.raises(BrokenProcessPool, match="box_1"):
+        attach_part_masks(assembly_parts(), PART_SURFACES, *assembly_surface(), workers=2)
+
+# ✅ A resolution budget is shared out evenly between the parts
+def test_part_budget():
+    budget = {"max_cells": 1000, "max_bytes": 4096, "fields": 2, "min_feature_size": None}
+    assert part_budget(budget, 3) == {"max_cells": 333, "max_bytes": 1365, "fields": 2, "min_feature_size": None}
+    assert part_budget({"max_cells": None, "max_bytes": 10}, 20)["max_bytes"] == 1
+    assert part_budget(budget, 1) is budget and part_budget(None, 3) is None
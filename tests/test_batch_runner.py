@@ -0,0 +1,117 @@
+# tests/test_batch_runner.py
+
+import os
+
+import pytest
+import src.batch_runner as batch_runner
+from src.batch_runner import collect_step_files, output_path_for, plan_outputs, run_batch
+from src.domain_definition_writer import compile_schema
+from src.gmsh_runner import domain_cache_key
+from src.result_cache import ResultCache
+
+# ✅ Directory source picks up STEP files only, sorted
+def test_collect_step_files_directory(tmp_path):
+    for name in ["b.step", "a.STP", "notes.txt", "c.json"]:
+        (tmp_path / name).write_text("")
+    (tmp_path / "nested.step").mkdir()
+    files = collect_step_files(str(tmp_path))
+    assert files == [str(tmp_path / "a.STP"), str(tmp_path / "b.step")]
+
+# ✅ Manifest source resolves relative paths and skips comments
+def test_collect_step_files_manifest(tmp_path):
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text("# nightly set\nmodels/one.step\n\n/abs/two.step\n")
+    files = collect_step_files(str(manifest))
+    assert files == [str(tmp_path / "models" / "one.step"), "/abs/two.step"]
+
+# ❌ Missing source
+def test_collect_step_files_missing(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        collect_step_files(str(tmp_path / "nope.txt"))
+
+# ✅ Output naming
+def test_output_path_for():
+    assert output_path_for("/in/part.step", "/out") == "/out/part.json"
+
+# ❌ Two inputs with the same stem would overwrite each other
+def test_plan_outputs_collision():
+    with pytest.raises(ValueError):
+        plan_outputs(["/a/part.step", "/b/part.stp"], "/out")
+
+# ❌ Resolution arguments are checked before any worker starts
+def test_run_batch_requires_resolution(tmp_path):
+    with pytest.raises(ValueError):
+        run_batch(str(tmp_path), str(tmp_path / "out"))
+
+def _fake_init(schema, debug, cache):
+    batch_runner._worker_validator = compile_schema(schema)
+
+
+def _crash_on_bad(step_path, metrics, lc, nx, ny, nz, resolution_budget, record):
+    if os.path.basename(step_path) == "bad.step":
+        os._exit(1)  # What a Gmsh/OCC segfault or an OOM kill looks like to the pool
+    return batch_runner.resolve_domain((0.0, 0.0, 0.0, 1.0, 1.0, 1.0), lc=lc)
+
+
+def _fake_init_crash(schema, debug, cache):
+    raise RuntimeError("Gmsh failed to initialize")
+
+# ❌ A worker that dies fails its own file; the rest of the batch still completes
+def test_run_batch_survives_dead_worker(tmp_path, monkeypatch):
+    for name in ["a.step", "bad.step", "c.step", "d.step"]:
+        (tmp_path / name).write_text("")
+    monkeypatch.setattr(batch_runner, "_init_worker", _fake_init)
+    monkeypatch.setattr(batch_runner, "_extract", _crash_on_bad)
+    summary = run_batch(str(tmp_path), str(tmp_path / "out"), lc=0.5, workers=2)
+    status = {os.path.basename(r["step"]): r["status"] for r in summary["files"]}
+    assert status == {"a.step": "ok", "bad.step": "failed", "c.step": "ok", "d.step": "ok"}
+    assert "BrokenProcessPool" in summary["files"][1]["error"]
+
+# ❌ A worker that cannot even initialize fails every file instead of hanging
+def test_run_batch_survives_failing_initializer(tmp_path, monkeypatch):
+    for name in ["a.step", "b.step"]:
+        (tmp_path / name).write_text("")
+    monkeypatch.setattr(batch_runner, "_init_worker", _fake_init_crash)
+    summary = run_batch(str(tmp_path), str(tmp_path / "out"), lc=0.5, workers=2)
+    assert summary["failed"] == 2
+
+# ✅ Files lost with a dead worker are retried on a full pool; only repeat losses are isolated
+def test_run_batch_retries_lost_files_in_parallel(tmp_path, monkeypatch):
+    for name in ["bad.step"] + [f"ok_{i}.step" for i in range(6)]:
+        (tmp_path / name).write_text("")
+    monkeypatch.setattr(batch_runner, "_init_worker", _fake_init)
+    monkeypatch.setattr(batch_runner, "_extract", _crash_on_bad)
+    pools = []
+    run_pool = batch_runner._run_pool
+    monkeypatch.setattr(batch_runner, "_run_pool", lambda tasks, workers, *args:
+                        pools.append((len(tasks), workers)) or run_pool(tasks, workers, *args))
+    summary = run_batch(str(tmp_path), str(tmp_path / "out"), lc=0.5, workers=3)
+    assert summary["succeeded"] == 6 and summary["failed"] == 1
+    assert pools[0] == (7, 3) and pools[1][1] == min(3, pools[1][0])
+    assert all(workers == 1 for _, workers in pools[2:])
+
+
+def _fake_init_cached(schema, debug, cache):
+    _fake_init(schema, debug, cache)
+    batch_runner._worker_cache = cache
+
+
+def _no_gmsh(*args, **kwargs):
+    raise AssertionError("A cache hit must not load the model")
+
+# ✅ Batch workers hit entries stored under the single-run key, and only those
+def test_run_batch_shares_cache_with_single_runs(tmp_path, monkeypatch):
+    step = tmp_path / "in" / "part.step"
+    step.parent.mkdir()
+    step.write_text("ISO-10303-21;\n")
+    cache = ResultCache(str(tmp_path / "cache"))
+    domain = batch_runner.resolve_domain((0.0, 0.0, 0.0, 2.0, 2.0, 2.0), lc=0.5)
+    cache.put(domain_cache_key(cache, str(step), {"lc": 0.5, "mask_path": None}, bbox_mode="occ", mask=False), domain)
+    assert domain_cache_key(cache, str(step), {"lc": 0.5}, mask=True) != domain_cache_key(cache, str(step), {"lc": 0.5})
+
+    monkeypatch.setattr(batch_runner, "_init_worker", _fake_init_cached)
+    monkeypatch.setattr(batch_runner, "load_bounding_box", _no_gmsh)
+    summary = run_batch(str(tmp_path / "in"), str(tmp_path / "out"), lc=0.5, cache=cache)
+    record, = summary["files"]
+    assert (record["status"], record["cache"]) == ("ok", "hit")
+    assert record["domain_definition"] == domain["domain_definition"]
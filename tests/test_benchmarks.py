@@ -0,0 +1,27 @@
+# tests/test_benchmarks.py
+
+from tests.benchmarks.run_benchmarks import compare_to_baseline, PHASES
+
+
+def results_with(phases=None, peak=100.0, name="block_holes_2"):
+    timings = {phase: 0.1 for phase in PHASES}
+    timings.update(phases or {})
+    return {"models": {name: {"phases": timings, "peak_rss_mb": peak}}}
+
+# ✅ Timings within tolerance, or below the noise floor, are not regressions
+def test_compare_within_tolerance():
+    baseline = results_with()
+    assert compare_to_baseline(results_with({"open": 0.12}), baseline) == []
+    tiny = results_with({"validate": 0.0001})
+    assert compare_to_baseline(results_with({"validate": 0.004}), tiny, min_delta_s=0.005) == []
+
+# ❌ Slow phases and memory growth are reported by name
+def test_compare_regressions():
+    regressions = compare_to_baseline(results_with({"open": 0.2}, peak=130.0), results_with())
+    assert len(regressions) == 2
+    assert regressions[0].startswith("block_holes_2 open: 0.200000s")
+    assert "peak_rss_mb" in regressions[1]
+
+# ✅ Models missing from the baseline are skipped
+def test_compare_new_model():
+    assert compare_to_baseline(results_with({"open": 9.0}, name="assembly_18"), results_with()) == []
@@ -0,0 +1,83 @@
+# tests/test_boundary_tags.py
+
+import numpy as np
+import pytest
+from jsonschema import validate
+from src.gmsh_runner import load_schema, attach_boundary_tags, SCHEMA_PATH
+from src.boundary_tags import (
+    lookup_table, iter_boundary_cells, tag_boundary_cells, load_boundary_tags, BoundaryTagError, UNASSIGNED_NAME
+)
+from tests.test_occupancy_mask import box_surface, domain
+
+# Surface tag of each box_surface triangle: z-min, z-max, y-min, y-max, x-min, x-max faces
+BOX_ENTITIES = np.repeat(np.arange(1, 7), 2)
+BOX_GROUPS = [("inlet", 10, [5]), ("outlet", 11, [6]), ("wall", 12, [1, 2, 3, 4])]
+
+
+def dense_boundary(mask):
+    """Reference: fluid cells of a (nz, ny, nx) mask with a solid face neighbour."""
+    padded = np.pad(mask.astype(bool), 1)
+    near = np.zeros_like(padded)
+    for axis in range(3):
+        near |= np.roll(padded, 1, axis=axis) | np.roll(padded, -1, axis=axis)
+    near = near[1:-1, 1:-1, 1:-1]
+    return np.flatnonzero(near & ~mask.astype(bool))
+
+# ✅ Lookup table: label 0 collects ungrouped surfaces, the first group wins shared ones
+def test_lookup_table():
+    table, labels = lookup_table([("inlet", 1, [3]), ("wall", None, [3, 4])], [3, 3, 4, 7, 4])
+    assert [(e["label"], e["name"], e["surfaces"]) for e in table] == [
+        (0, UNASSIGNED_NAME, [7]), (1, "inlet", [3]), (2, "wall", [3, 4])
+    ]
+    assert table[1]["physical_tag"] == 1 and "physical_tag" not in table[2]
+    np.testing.assert_array_equal(labels, [1, 1, 2, 0, 2])
+
+# ✅ Slab-wise detection with look-ahead matches the whole-grid reference
+@pytest.mark.parametrize("depth", [1, 3, 40])
+def test_iter_boundary_cells(depth):
+    mask = (np.random.default_rng(3).random((11, 7, 9)) < 0.2).astype(np.uint8)
+    slabs = ((k, min(k + depth, 11), mask[k:k + depth]) for k in range(0, 11, depth))
+    found = np.concatenate(list(iter_boundary_cells(slabs)))
+    np.testing.assert_array_equal(found, dense_boundary(mask))
+
+# ✅ Box faces: every boundary cell carries the group of the face it touches
+def test_tag_box_faces():
+    vertices, triangles = box_surface((1, 1, 1), (2, 2, 2))
+    definition = domain(((0, 0, 0), (3, 3, 3)), (12, 12, 12))
+    cells, labels, table = tag_boundary_cells(definition, vertices, triangles, BOX_ENTITIES, BOX_GROUPS)
+    # 4 x 4 face cells on each of the six faces
+    assert len(cells) == 96 and np.all(np.diff(cells) > 0)
+    i, j, k = cells % 12, (cells // 12) % 12, cells // 144
+    names = np.array([entry["name"] for entry in table])[labels]
+    assert (names[i == 3] == "inlet").all() and (i == 3).sum() == 16
+    assert (names[i == 8] == "outlet").all() and (i == 8).sum() == 16
+    assert (names[(i > 3) & (i < 8)] == "wall").all()
+    assert [entry["cells"] for entry in table] == [0, 16, 16, 64]
+
+# ✅ Runner attaches a schema-valid descriptor whose sidecar round-trips
+def test_attach_boundary_tags(tmp_path):
+    vertices, triangles = box_surface((1, 1, 1), (2, 2, 2))
+    domain_json = {"domain_definition": domain(((0, 0, 0), (3, 3, 3)), (6, 9, 12))}
+    attach_boundary_tags(domain_json, vertices, triangles, BOX_ENTITIES, groups=BOX_GROUPS,
+                         tags_path=str(tmp_path / "d_tags.npz"))
+    validate(instance=domain_json, schema=load_schema(SCHEMA_PATH))
+    descriptor = domain_json["boundary_tags"]
+    assert descriptor["path"] == "d_tags.npz" and descriptor["dtype"] == "uint8"
+    cells, labels = load_boundary_tags(descriptor, base_dir=str(tmp_path), verify=True)
+    assert cells.dtype == np.uint32 and len(labels) == descriptor["cells"] > 0
+
+# ❌ Missing or altered sidecars are rejected
+def test_load_boundary_tags_errors(tmp_path):
+    vertices, triangles = box_surface((1, 1, 1), (2, 2, 2))
+    domain_json = {"domain_definition": domain(((0, 0, 0), (3, 3, 3)), (6, 6, 6))}
+    attach_boundary_tags(domain_json, vertices, triangles, BOX_ENTITIES, tags_path=str(tmp_path / "t.npz"))
+    descriptor = domain_json["boundary_tags"]
+    assert [entry["name"] for entry in descriptor["groups"]] == [UNASSIGNED_NAME]
+    with pytest.raises(BoundaryTagError):
+        load_boundary_tags(descriptor, base_dir=str(tmp_path / "elsewhere"))
+    with pytest.raises(BoundaryTagError):
+        load_boundary_tags(dict(descriptor, cells=descriptor["cells"] + 1), base_dir=str(tmp_path))
+    with open(tmp_path / "t.npz", "ab") as f:
+        f.write(b"\0")
+    with pytest.raises(BoundaryTagError):
+        load_boundary_tags(descriptor, base_dir=str(tmp_path), verify=True)
@@ -0,0 +1,108 @@
+# tests/test_compare_json.py
+
+import json
+import numpy as np
+import pytest
+from tests.helpers import compare_json
+from tests.helpers.compare_json import split_document, iter_array_chunks, compare_large_array
+
+
+def write_json(path, document, indent=2):
+    path.write_text(json.dumps(document, indent=indent))
+    return path
+
+
+def mask_document(mask):
+    return {
+        "domain_definition": {"nx": len(mask), "ny": 1, "nz": 1},
+        "geometry_mask_flat": list(mask),
+        "geometry_mask_shape": [len(mask), 1, 1]
+    }
+
+# ✅ Large arrays are cut out of the skeleton, even across tiny read blocks
+@pytest.mark.parametrize("block_size", [3, 17, 1 << 20])
+def test_split_document(tmp_path, block_size):
+    path = write_json(tmp_path / "doc.json", mask_document([0, 1, 1, 0, 1]))
+    skeleton, offsets = split_document(path, block_size=block_size)
+    assert skeleton["geometry_mask_flat"] is None
+    assert skeleton["geometry_mask_shape"] == [5, 1, 1]
+    chunks = list(iter_array_chunks(path, offsets["geometry_mask_flat"][0], block_size=block_size))
+    np.testing.assert_array_equal(np.concatenate(chunks), [0, 1, 1, 0, 1])
+
+# ✅ Documents without large arrays parse as usual
+def test_split_document_plain(tmp_path):
+    document = {"domain_definition": {"nx": 4, "ny": 4, "nz": 4}}
+    path = write_json(tmp_path / "doc.json", document)
+    assert split_document(path) == (document, {})
+
+# ✅ Streaming comparison reports counts and the first mismatching indices
+def test_compare_large_array_mismatch(tmp_path, monkeypatch):
+    rng = np.random.default_rng(1)
+    expected = rng.integers(0, 2, 5000)
+    output = expected.copy()
+    output[[7, 4096, 4999]] ^= 1
+    expected_path = write_json(tmp_path / "expected.json", mask_document(expected.tolist()), indent=None)
+    output_path = write_json(tmp_path / "output.json", mask_document(output.tolist()))
+    monkeypatch.setattr(compare_json, "READ_BLOCK_SIZE", 64)
+    _, expected_offsets = split_document(expected_path)
+    _, output_offsets = split_document(output_path)
+    summary = compare_large_array(
+        "geometry_mask_flat",
+        expected_path, expected_offsets["geometry_mask_flat"][0],
+        output_path, output_offsets["geometry_mask_flat"][0]
+    )
+    assert summary.failed
+    assert summary.mismatches == 3
+    assert [i for i, _, _ in summary.first] == [7, 4096, 4999]
+    assert summary.expected_length == summary.output_length == 5000
+    # The small block size really splits the arrays across many reads
+    assert len(list(iter_array_chunks(expected_path, expected_offsets["geometry_mask_flat"][0]))) > 100
+
+# ✅ Length differences are measured without loading either array
+def test_compare_large_array_length(tmp_path):
+    expected_path = write_json(tmp_path / "expected.json", mask_document([1, 0, 1]))
+    output_path = write_json(tmp_path / "output.json", mask_document([1, 0, 1, 1, 1]))
+    summary = compare_large_array(
+        "geometry_mask_flat",
+        expected_path, split_document(expected_path)[1]["geometry_mask_flat"][0],
+        output_path, split_document(output_path)[1]["geometry_mask_flat"][0]
+    )
+    assert summary.failed
+    assert summary.mismatches == 0
+    assert (summary.expected_length, summary.output_length) == (3, 5)
+
+# ✅ End-to-end pass and fail with an error report in the errors folder
+def test_compare_json_outputs_exit_codes(tmp_path, monkeypatch):
+    monkeypatch.setattr(compare_json, "ERROR_OUTPUT_DIR", tmp_path / "errors")
+    expected_path = write_json(tmp_path / "expected.json", mask_document([0, 1, 0, 1]))
+
+    output_path = write_json(tmp_path / "same.json", mask_document([0, 1, 0, 1]), indent=None)
+    with pytest.raises(SystemExit) as exc:
+        compare_json.compare_json_outputs(str(expected_path), str(output_path))
+    assert exc.value.code == 0
+    assert not output_path.exists()
+
+    output_path = write_json(tmp_path / "different.json", mask_document([0, 1, 1, 1]))
+    with pytest.raises(SystemExit) as exc:
+        compare_json.compare_json_outputs(str(expected_path), str(output_path))
+    assert exc.value.code == 1
+    report = (tmp_path / "errors" / "diff_expected_different.txt").read_text()
+    assert "Mismatching values over the common length: 1" in report
+    assert "2: 0.0 → 1.0" in report
+
+# ❌ Repeated array keys (assembly parts) are each compared, not just the last one
+def test_compare_json_outputs_nested_arrays(tmp_path, monkeypatch):
+    monkeypatch.setattr(compare_json, "ERROR_OUTPUT_DIR", tmp_path / "errors")
+
+    def assembly_document(part_masks):
+        return {**mask_document([1, 1]), "parts": [{"index": i, **mask_document(mask)} for i, mask in enumerate(part_masks)]}
+
+    expected_path = write_json(tmp_path / "expected.json", assembly_document([[0, 1], [1, 1]]))
+    skeleton, offsets = split_document(expected_path)
+    assert len(offsets["geometry_mask_flat"]) == 3 and skeleton["parts"][0]["geometry_mask_flat"] is None
+
+    output_path = write_json(tmp_path / "output.json", assembly_document([[1, 1], [1, 1]]))
+    with pytest.raises(SystemExit) as exc:
+        compare_json.compare_json_outputs(str(expected_path), str(output_path))
+    assert exc.value.code == 1
+    assert "geometry_mask_flat #2" in (tmp_path / "errors" / "diff_expected_output.txt").read_text()
@@ -0,0 +1,99 @@
+# tests/test_distance_field.py
+
+import numpy as np
+import pytest
+from jsonschema import validate
+from src.gmsh_runner import load_schema, attach_distance_field, SCHEMA_PATH
+from src.distance_field import (
+    node_domain, write_distance_field, load_distance_field, _sweep, DistanceFieldError
+)
+from src.occupancy_mask import grid_spacing
+from tests.test_occupancy_mask import box_surface, sphere_surface, domain
+
+
+def node_coordinates(definition):
+    origin, spacing, (nx, ny, nz) = grid_spacing(definition)
+    axes = [o + h * np.arange(n + 1) for o, h, n in zip(origin, spacing, (nx, ny, nz))]
+    z, y, x = np.meshgrid(axes[2], axes[1], axes[0], indexing="ij")
+    return x, y, z
+
+# ✅ Node domain puts cell centres on the original grid nodes
+def test_node_domain():
+    origin, spacing, shape = grid_spacing(node_domain(domain(((0, 0, 0), (2, 1, 1)), (4, 2, 2))))
+    assert shape == (5, 3, 3)
+    assert spacing == (0.5, 0.5, 0.5)
+    assert origin[0] + 0.5 * spacing[0] == 0.0
+
+# ✅ Sphere: exact in the band, first-order accurate elsewhere, negative inside
+def test_sphere_distance_field(tmp_path):
+    vertices, triangles = sphere_surface(n=32)
+    definition = domain(((-2, -2, -2), (2, 2, 2)), (24, 24, 24))
+    descriptor = write_distance_field(str(tmp_path / "sdf.npy"), definition, vertices, triangles, band_cells=2)
+    descriptor["path"] = "sdf.npy"
+    field = load_distance_field(descriptor, base_dir=str(tmp_path), verify=True)
+    assert isinstance(field, np.memmap)
+    assert field.shape == (25, 25, 25) and field.dtype == np.float32
+
+    x, y, z = node_coordinates(definition)
+    exact = np.sqrt(x * x + y * y + z * z) - 1.0
+    h = 4.0 / 24
+    band = np.abs(exact) < descriptor["band_width"] - h
+    # Tessellation error of a 32-segment sphere is below 0.01
+    assert np.abs(field - exact)[band].max() < 0.01
+    assert np.abs(field - exact).max() < 1.5 * h
+    clear = np.abs(exact) > 0.02
+    assert ((field < 0) == (exact < 0))[clear].all()
+    assert descriptor["min"] == pytest.approx(float(field.min()))
+    assert descriptor["sweeps"] >= 1
+
+# ✅ Box with anisotropic spacing matches the analytic box distance outside
+def test_box_distance_field_anisotropic(tmp_path):
+    vertices, triangles = box_surface((0.4, 0.4, 0.4), (1.6, 1.0, 0.8))
+    definition = domain(((0, 0, 0), (2, 1.4, 1.2)), (20, 7, 12))
+    write_distance_field(str(tmp_path / "sdf.npy"), definition, vertices, triangles, band_cells=2)
+    field = np.load(tmp_path / "sdf.npy")
+
+    x, y, z = node_coordinates(definition)
+    gap = [np.maximum(np.maximum(lo - c, c - hi), 0.0)
+           for c, lo, hi in ((x, 0.4, 1.6), (y, 0.4, 1.0), (z, 0.4, 0.8))]
+    outside = np.sqrt(gap[0] ** 2 + gap[1] ** 2 + gap[2] ** 2)
+    assert np.abs(field - outside)[outside > 0].max() < 0.2
+    assert (field[(x > 0.5) & (x < 1.5) & (y > 0.5) & (y < 0.9) & (z > 0.5) & (z < 0.7)] < 0).all()
+
+# ✅ Sweeping alone reproduces a planar front on a stretched grid
+def test_sweep_plane_front():
+    field = np.full((12, 5, 4), np.inf, dtype=np.float32)
+    field[0] = 0.0
+    rounds = _sweep(field, np.isfinite(field), (0.1, 0.3, 0.2))
+    assert rounds <= 2
+    np.testing.assert_allclose(field[:, 2, 1], 0.1 * np.arange(12), atol=1e-6)
+
+# ✅ Descriptor attached by the runner validates against the schema
+def test_attach_distance_field_schema(tmp_path):
+    vertices, triangles = box_surface((0, 0, 0), (1, 1, 1))
+    domain_json = {"domain_definition": domain(((0, 0, 0), (1, 1, 1)), (4, 4, 4))}
+    attach_distance_field(domain_json, vertices, triangles, sdf_path=str(tmp_path / "d_sdf.npy"))
+    assert domain_json["signed_distance"]["path"] == "d_sdf.npy"
+    assert domain_json["signed_distance"]["shape"] == [5, 5, 5]
+    validate(instance=domain_json, schema=load_schema(SCHEMA_PATH))
+
+# ❌ Missing or altered sidecars are rejected
+def test_load_distance_field_errors(tmp_path):
+    vertices, triangles = box_surface((0, 0, 0), (1, 1, 1))
+    descriptor = write_distance_field(str(tmp_path / "sdf.npy"), domain(((0, 0, 0), (1, 1, 1)), (2, 2, 2)),
+                                      vertices, triangles)
+    descriptor["path"] = "sdf.npy"
+    with pytest.raises(DistanceFieldError):
+        load_distance_field(descriptor, base_dir=str(tmp_path / "elsewhere"))
+    with open(tmp_path / "sdf.npy", "r+b") as f:
+        f.seek(-1, 2)
+        f.write(b"\x7f")
+    with pytest.raises(DistanceFieldError):
+        load_distance_field(descriptor, base_dir=str(tmp_path), verify=True)
+
+# ✅ An empty surface leaves every node at +inf and records no range
+def test_empty_surface(tmp_path):
+    descriptor = write_distance_field(str(tmp_path / "sdf.npy"), domain(((0, 0, 0), (1, 1, 1)), (2, 2, 2)),
+                                      np.zeros((0, 3)), np.zeros((0, 3), dtype=int))
+    assert descriptor["band_nodes"] == 0 and "min" not in descriptor
+    assert np.isinf(np.load(tmp_path / "sdf.npy")).all()
@@ -85,3 +85,55 @@ def test_near_zero_delta():
 
 
 
+
+# ✅ Bulk validation reports every bad record without raising
+def test_bulk_validation_report():
+    from src.domain_definition_writer import validate_domains_bulk
+    good = {"min_x": 0.0, "max_x": 1.0, "min_y": -1.0, "max_y": 1.0, "min_z": 0.0, "max_z": 5.0,
+            "nx": 10, "ny": 10, "nz": 10}
+    domains = [
+        {"domain_definition": dict(good)},
+        dict(good, max_x=-2.0),
+        dict(good, min_y="abc", nz=0),
+        {k: v for k, v in good.items() if k != "max_z"},
+        dict(good, nx=2.5, min_z=float("nan")),
+        dict(good, nx=1000, ny=1000, nz=1000),
+    ]
+    report = validate_domains_bulk(domains, max_cells=10**8)
+    assert (report["total"], report["valid"], report["invalid"]) == (6, 1, 5)
+    assert report["errors"][1] == ["Invalid domain: max_x (-2.0) < min_x (0.0)"]
+    assert report["errors"][2] == ["Non-numeric bounds for axis 'y'",
+                                   "Invalid resolution: nz must be a positive integer"]
+    assert report["errors"][3] == ["Missing domain bounds for axis 'z'"]
+    assert report["errors"][4] == ["Non-finite bounds for axis 'z'",
+                                   "Invalid resolution: nx must be a positive integer"]
+    assert report["errors"][5] == ["Cell count 1000000000 exceeds limit 100000000"]
+
+# ✅ Bulk results agree with the scalar validator on bounds
+def test_bulk_matches_scalar():
+    import numpy as np
+    from src.domain_definition_writer import validate_domains_bulk
+    rng = np.random.default_rng(0)
+    bounds = rng.uniform(-5, 5, size=(2000, 6))
+    domains = [
+        {"min_x": b[0], "max_x": b[1], "min_y": b[2], "max_y": b[3], "min_z": b[4], "max_z": b[5],
+         "nx": 4, "ny": 4, "nz": 4}
+        for b in bounds.tolist()
+    ]
+    report = validate_domains_bulk(domains)
+    for i, domain in enumerate(domains):
+        try:
+            validate_domain_bounds(domain)
+            assert i not in report["errors"]
+        except DomainValidationError as e:
+            assert report["errors"][i][0] == str(e)
+
+# ✅ Schema validators are compiled once per file and reused
+def test_schema_validator_cached(tmp_path):
+    from src.domain_definition_writer import load_schema_validator, validate_domains_bulk
+    validator = load_schema_validator("schemas/domain_schema.json")
+    assert load_schema_validator("schemas/domain_schema.json") is validator
+    report = validate_domains_bulk([{"domain_definition": {"nx": 1}}], schema_validator=validator)
+    assert any(message.startswith("Schema: domain_definition") for message in report["errors"][0])
+    with pytest.raises(FileNotFoundError):
+        load_schema_validator(str(tmp_path / "missing.json"))
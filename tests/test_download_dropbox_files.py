@@ -0,0 +1,59 @@
+# tests/test_download_dropbox_files.py
+
+import io
+import os
+from src import download_dropbox_files
+from src.download_dropbox_files import list_downloadable_entries, download_entry, download_entries
+from tests.helpers.fake_dropbox import FakeDropbox
+
+REMOTE = {
+    "/pipeline/a.step": b"A" * 5000,
+    "/pipeline/b.STP": b"B" * 10,
+    "/pipeline/flow_data.json": b'{"ok": true}',
+    "/pipeline/notes.txt": b"skip me",
+    "/pipeline/parts.zip": b"PK" + b"Z" * 300,
+}
+
+# ✅ Listing follows pagination and filters by extension
+def test_list_downloadable_entries():
+    dbx = FakeDropbox(REMOTE, page_size=2)
+    log = io.StringIO()
+    entries = list_downloadable_entries(dbx, "/pipeline", log)
+    assert sorted(e.name for e in entries) == ["a.step", "b.STP", "flow_data.json", "parts.zip"]
+    assert "Skipped file (unsupported type): notes.txt" in log.getvalue()
+    assert any(call[0] == "files_list_folder_continue" for call in dbx.calls)
+
+# ✅ A single download streams to a temp file and renames it into place
+def test_download_entry(tmp_path, monkeypatch):
+    dbx = FakeDropbox(REMOTE)
+    entry = dbx._metadata("/pipeline/a.step")
+    path = download_entry(dbx, entry, str(tmp_path), chunk_size=512)
+    assert path == str(tmp_path / "a.step")
+    assert (tmp_path / "a.step").read_bytes() == REMOTE["/pipeline/a.step"]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".part")]
+
+# ✅ Concurrent downloads fetch every file; one failure does not stop the rest
+def test_download_entries_concurrent(tmp_path):
+    dbx = FakeDropbox(REMOTE, fail_downloads={"/pipeline/b.stp"})
+    log = io.StringIO()
+    entries = list_downloadable_entries(dbx, "/pipeline", log)
+    downloaded, failed = download_entries(dbx, entries, str(tmp_path), log, max_workers=3)
+    assert sorted(downloaded) == ["a.step", "flow_data.json", "parts.zip"]
+    assert failed == ["b.STP"]
+    assert (tmp_path / "parts.zip").read_bytes() == REMOTE["/pipeline/parts.zip"]
+    assert not (tmp_path / "b.STP").exists()
+    assert sorted(os.listdir(tmp_path)) == ["a.step", "flow_data.json", "parts.zip"]
+
+# ✅ The access token is refreshed once for the whole run
+def test_single_token_refresh(tmp_path, monkeypatch):
+    refreshes = []
+    monkeypatch.setattr(download_dropbox_files, "refresh_access_token",
+                        lambda *args: refreshes.append(args) or "token")
+    monkeypatch.setattr(download_dropbox_files.dropbox, "Dropbox", lambda *a, **k: FakeDropbox(REMOTE))
+    download_dropbox_files.download_files_from_dropbox(
+        "/pipeline", str(tmp_path / "out"), "r", "id", "secret", str(tmp_path / "log.txt"), max_workers=4
+    )
+    assert len(refreshes) == 1
+    downloaded = sorted(name for name in os.listdir(tmp_path / "out") if not name.startswith("."))
+    assert downloaded == ["a.step", "b.STP", "flow_data.json", "parts.zip"]
+    assert "Download completed." in (tmp_path / "log.txt").read_text()
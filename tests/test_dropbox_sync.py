@@ -0,0 +1,88 @@
+# tests/test_dropbox_sync.py
+
+import hashlib
+import os
+from src import download_dropbox_files, upload_to_dropbox
+from src.dropbox_sync import dropbox_content_hash, SyncState, select_downloads, select_uploads, list_remote_hashes
+from tests.helpers.fake_dropbox import FakeDropbox, content_hash
+
+# ✅ Block-wise hashing follows the Dropbox specification
+def test_dropbox_content_hash(tmp_path):
+    path = tmp_path / "data.bin"
+    data = os.urandom(10_000)
+    path.write_bytes(data)
+    blocks = b"".join(hashlib.sha256(data[i:i + 4096]).digest() for i in range(0, len(data), 4096))
+    assert dropbox_content_hash(path, block_size=4096) == hashlib.sha256(blocks).hexdigest()
+    assert dropbox_content_hash(path) == content_hash(data)
+    assert content_hash(data, block_size=4096) == hashlib.sha256(blocks).hexdigest()
+    (tmp_path / "empty").write_bytes(b"")
+    assert dropbox_content_hash(tmp_path / "empty") == hashlib.sha256(b"").hexdigest()
+
+# ✅ Cached hashes persist and are invalidated by size/mtime changes
+def test_sync_state_cache(tmp_path, monkeypatch):
+    (tmp_path / "a.json").write_bytes(b"one")
+    state = SyncState(str(tmp_path))
+    first = state.content_hash("a.json")
+    state.save()
+    assert (tmp_path / ".dropbox_sync_state.json").exists()
+
+    reloaded = SyncState(str(tmp_path))
+    monkeypatch.setattr("src.dropbox_sync.dropbox_content_hash", lambda *a: "not recomputed")
+    assert reloaded.content_hash("a.json") == first
+    (tmp_path / "a.json").write_bytes(b"changed")
+    assert reloaded.content_hash("a.json") == "not recomputed"
+    assert reloaded.content_hash("missing.json") is None
+
+# ✅ Only new or changed remote files are selected for download
+def test_select_downloads(tmp_path):
+    remote = {"/p/same.step": b"S" * 100, "/p/changed.step": b"new", "/p/new.json": b"{}"}
+    (tmp_path / "same.step").write_bytes(b"S" * 100)
+    (tmp_path / "changed.step").write_bytes(b"old")
+    dbx = FakeDropbox(remote, page_size=10)
+    entries = dbx.files_list_folder("/p").entries
+    to_download, unchanged = select_downloads(entries, SyncState(str(tmp_path)))
+    assert sorted(e.name for e in to_download) == ["changed.step", "new.json"]
+    assert [e.name for e in unchanged] == ["same.step"]
+
+# ✅ Only local files that differ from the remote listing are selected for upload
+def test_select_uploads(tmp_path):
+    (tmp_path / "same.json").write_bytes(b"{}")
+    (tmp_path / "changed.json").write_bytes(b"[1]")
+    (tmp_path / "new.json").write_bytes(b"[2]")
+    dbx = FakeDropbox({"/out/same.json": b"{}", "/out/changed.json": b"[0]"}, page_size=1)
+    remote = list_remote_hashes(dbx, "/out")
+    uploads = [(str(tmp_path / n), f"/out/{n}") for n in ("same.json", "changed.json", "new.json")]
+    to_upload, unchanged = select_uploads(uploads, remote, {})
+    assert [p for _, p in to_upload] == ["/out/changed.json", "/out/new.json"]
+    assert [p for _, p in unchanged] == ["/out/same.json"]
+
+# ✅ A second download run transfers nothing
+def test_incremental_download_run(tmp_path, monkeypatch):
+    remote = {"/pipeline/a.step": b"A" * 5000, "/pipeline/flow_data.json": b"{}"}
+    dbx = FakeDropbox(remote)
+    monkeypatch.setattr(download_dropbox_files, "refresh_access_token", lambda *args: "token")
+    monkeypatch.setattr(download_dropbox_files.dropbox, "Dropbox", lambda *a, **k: dbx)
+    args = ("/pipeline", str(tmp_path / "out"), "r", "id", "secret", str(tmp_path / "log.txt"))
+    download_dropbox_files.download_files_from_dropbox(*args)
+    assert sum(call[0] == "files_download" for call in dbx.calls) == 2
+
+    dbx.calls.clear()
+    download_dropbox_files.download_files_from_dropbox(*args)
+    assert not [call for call in dbx.calls if call[0] == "files_download"]
+    assert "Unchanged, not downloaded: a.step" in (tmp_path / "log.txt").read_text()
+
+# ✅ A second upload run only lists the remote folder
+def test_incremental_upload_run(tmp_path, monkeypatch):
+    (tmp_path / "a.json").write_bytes(b'{"a": 1}')
+    (tmp_path / "b.json").write_bytes(b'{"b": 2}')
+    dbx = FakeDropbox()
+    monkeypatch.setattr(upload_to_dropbox, "refresh_access_token", lambda *args: "token")
+    monkeypatch.setattr(upload_to_dropbox.dropbox, "Dropbox", lambda *a, **k: dbx)
+    args = ([str(tmp_path)], "/out", "r", "id", "secret")
+    assert len(upload_to_dropbox.upload_files_to_dropbox(*args)[0]) == 2
+
+    (tmp_path / "b.json").write_bytes(b'{"b": 3}')
+    dbx.calls.clear()
+    uploaded, failed = upload_to_dropbox.upload_files_to_dropbox(*args)
+    assert (uploaded, failed) == (["/out/b.json"], [])
+    assert dbx.files["/out/b.json"] == b'{"b": 3}'
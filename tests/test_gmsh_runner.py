@@ -3,7 +3,12 @@
 import pytest
 import json
 import os
-from src.gmsh_runner import compute_resolution, round2, extract_domain_definition, load_schema, SCHEMA_PATH
+import src.gmsh_runner as gmsh_runner
+from src.gmsh_runner import (
+    compute_resolution, round2, extract_domain_definition, extract_domain_sweep, sweep_levels, level_output_path,
+    load_schema, SCHEMA_PATH
+)
+from src.result_cache import ResultCache
 from jsonschema import validate, ValidationError
 
 # ✅ Resolution logic
@@ -87,11 +92,44 @@ def test_compute_resolution_large_bounds():
 def test_compute_resolution_small_delta():
     assert compute_resolution(0.0, 0.0001, 0.00001) == 10
 
+# ✅ Sweep levels: lc lists win, single axis values are reused for every level
+def test_sweep_levels():
+    assert sweep_levels(lc=[0.5, 0.25]) == [
+        {"lc": 0.5, "nx": None, "ny": None, "nz": None}, {"lc": 0.25, "nx": None, "ny": None, "nz": None}
+    ]
+    levels = sweep_levels(nx=[8, 16], ny=[4], nz=[2, 4])
+    assert [(l["nx"], l["ny"], l["nz"]) for l in levels] == [(8, 4, 2), (16, 4, 4)]
+    assert len(sweep_levels()) == 1
+    assert level_output_path("out/domain.json", levels[1]) == "out/domain_16x4x4.json"
+    assert level_output_path("domain", {"lc": 0.125}) == "domain_lc0.125.json"
+
+# ❌ Axis lists of different lengths cannot be paired
+def test_sweep_levels_mismatch():
+    with pytest.raises(ValueError):
+        sweep_levels(nx=[8, 16], ny=[4, 8, 16], nz=[2])
+
+# ✅ A sweep reads the model once, matches single runs and only fills cache misses
+def test_extract_domain_sweep(tmp_path, monkeypatch):
+    step = "tests/test_models/test_cube.step"
+    calls = []
+    prescan = gmsh_runner.prescan_bounding_box
+    monkeypatch.setattr(gmsh_runner, "prescan_bounding_box", lambda path: calls.append(path) or prescan(path))
+    levels = sweep_levels(lc=[0.5, 0.25, 0.125])
+    cache = ResultCache(str(tmp_path / "cache"))
+
+    domains = extract_domain_sweep(step, levels[:2], bbox_mode="fast", cache=cache)
+    assert len(calls) == 1
+    for level, domain in zip(levels, domains):
+        assert domain == extract_domain_definition(step, lc=level["lc"], bbox_mode="fast")
+    assert domains[1]["domain_definition"]["nx"] == 2 * domains[0]["domain_definition"]["nx"]
+
+    calls.clear()
+    assert extract_domain_sweep(step, levels[:2], bbox_mode="fast", cache=cache) == domains
+    assert calls == []  # All levels cached: the model is not read at all
+    assert extract_domain_sweep(step, levels, bbox_mode="fast", cache=cache)[:2] == domains
+    assert len(calls) == 1
+
 # ✅ CLI entry point is covered by integration tests
 @pytest.mark.skip(reason="CLI tested via GitHub Actions integration workflow")
 def test_main_cli_entry():
     pass
-
-
-
-
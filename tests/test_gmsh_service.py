@@ -0,0 +1,76 @@
+# tests/test_gmsh_service.py
+
+import os
+import threading
+import time
+import pytest
+from src.gmsh_service import GmshService, GmshServiceError, ServiceUnavailable, request, ping, extract_via_service
+
+
+def fake_job(args):
+    """Stand-in handler; behaviour is selected by the STEP file name."""
+    name = os.path.basename(args["step_path"])
+    if name == "slow.step":
+        time.sleep(30)
+    if name == "crash.step":
+        os._exit(3)
+    if name == "bad.step":
+        raise ValueError("cannot read bad.step")
+    return {"domain_definition": {"nx": args.get("nx")}, "pid": os.getpid()}
+
+
+@pytest.fixture
+def service(tmp_path):
+    with GmshService(str(tmp_path / "svc.sock"), workers=1, max_jobs_per_worker=3,
+                     queue_size=4, job_timeout=10, handler=fake_job, initializer=None) as svc:
+        yield svc
+
+# ✅ Jobs run in a warm worker; relative paths are sent absolute
+def test_extract_roundtrip(service):
+    domain = extract_via_service(service.socket_path, "part.step", nx=4)
+    assert domain["domain_definition"] == {"nx": 4}
+    assert domain["pid"] != os.getpid()
+    assert ping(service.socket_path)["completed"] == 1
+
+# ✅ Workers are recycled after the configured number of jobs
+def test_worker_recycling(service):
+    pids = [extract_via_service(service.socket_path, "part.step")["pid"] for _ in range(4)]
+    assert len(set(pids[:3])) == 1
+    assert pids[3] != pids[0]
+    assert ping(service.socket_path)["recycled"] == 1
+
+# ❌ Timeouts and crashes are reported and the worker is replaced
+def test_timeout_and_crash(service):
+    with pytest.raises(GmshServiceError, match="timeout"):
+        extract_via_service(service.socket_path, "slow.step", timeout=0.5)
+    with pytest.raises(GmshServiceError, match="crash"):
+        extract_via_service(service.socket_path, "crash.step")
+    with pytest.raises(GmshServiceError, match="cannot read bad.step"):
+        extract_via_service(service.socket_path, "bad.step")
+    assert extract_via_service(service.socket_path, "part.step", nx=2)["domain_definition"] == {"nx": 2}
+    stats = ping(service.socket_path)
+    assert (stats["timeouts"], stats["crashes"], stats["failed"]) == (1, 1, 1)
+
+# ❌ A full queue rejects work instead of growing without bound
+def test_queue_full_rejects(tmp_path):
+    with GmshService(str(tmp_path / "svc.sock"), workers=1, queue_size=1, job_timeout=1.0,
+                     handler=fake_job, initializer=None) as svc:
+        threads = [threading.Thread(target=request, args=(svc.socket_path, {"op": "extract", "args": {"step_path": "slow.step"}}))
+                   for _ in range(2)]
+        for t in threads:
+            t.start()
+            time.sleep(0.3)
+        response = request(svc.socket_path, {"op": "extract", "args": {"step_path": "part.step"}})
+        assert response["kind"] == "busy"
+        for t in threads:
+            t.join()
+
+# ❌ Unknown arguments are rejected before queueing
+def test_bad_request(service):
+    response = request(service.socket_path, {"op": "extract", "args": {"step_path": "a.step", "bogus": 1}})
+    assert response["kind"] == "bad_request"
+
+# ❌ Without a daemon the client reports the service as unavailable
+def test_service_unavailable(tmp_path):
+    with pytest.raises(ServiceUnavailable):
+        extract_via_service(str(tmp_path / "missing.sock"), "part.step")
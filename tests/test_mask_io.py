@@ -0,0 +1,78 @@
+# tests/test_mask_io.py
+
+import json
+import numpy as np
+import pytest
+from jsonschema import validate
+from src.gmsh_runner import load_schema, SCHEMA_PATH
+from src.mask_io import (
+    write_mask_slabs, load_mask_array, read_mask_slab, verify_mask_file,
+    sidecar_path_for, MaskFileError
+)
+
+
+def random_mask(shape=(11, 5, 6), seed=0):
+    nx, ny, nz = shape
+    return np.random.default_rng(seed).integers(0, 2, size=(nz, ny, nx), dtype=np.uint8)
+
+
+def slabs_of(mask, depth):
+    for k in range(0, mask.shape[0], depth):
+        yield k, min(k + depth, mask.shape[0]), mask[k:k + depth]
+
+# ✅ Sidecar naming
+def test_sidecar_path_for():
+    assert sidecar_path_for("out/domain.json") == "out/domain_mask.npy"
+
+# ✅ Dense and bit-packed sidecars round-trip through memmapped reads
+@pytest.mark.parametrize("encoding", ["dense", "packbits"])
+def test_roundtrip(tmp_path, encoding):
+    mask = random_mask()
+    path = tmp_path / "mask.npy"
+    descriptor = write_mask_slabs(str(path), (11, 5, 6), slabs_of(mask, 4), encoding=encoding)
+    descriptor["path"] = path.name
+    assert descriptor["shape"] == [6, 5, 11]
+    assert descriptor["axis_order"] == "zyx"
+    assert descriptor["solid_cells"] == int(mask.sum())
+
+    array = load_mask_array(descriptor, base_dir=str(tmp_path), verify=True)
+    assert isinstance(array, np.memmap)
+    np.testing.assert_array_equal(read_mask_slab(descriptor, 0, 6, base_dir=str(tmp_path)), mask)
+    np.testing.assert_array_equal(read_mask_slab(descriptor, 2, 4, array=array), mask[2:4])
+
+# ✅ Bit packing shrinks the payload roughly eightfold
+def test_packbits_size(tmp_path):
+    mask = random_mask(shape=(64, 32, 16))
+    dense = write_mask_slabs(str(tmp_path / "d.npy"), (64, 32, 16), slabs_of(mask, 16))
+    packed = write_mask_slabs(str(tmp_path / "p.npy"), (64, 32, 16), slabs_of(mask, 16), encoding="packbits")
+    assert (tmp_path / "p.npy").stat().st_size * 6 < (tmp_path / "d.npy").stat().st_size
+    assert dense["sha256"] != packed["sha256"]
+
+# ❌ Corrupted or missing sidecars are detected
+def test_checksum_mismatch(tmp_path):
+    path = tmp_path / "mask.npy"
+    descriptor = write_mask_slabs(str(path), (11, 5, 6), slabs_of(random_mask(), 6))
+    descriptor["path"] = path.name
+    assert verify_mask_file(descriptor, base_dir=str(tmp_path))
+    with open(path, "r+b") as f:
+        f.seek(-1, 2)
+        f.write(b"\x07")
+    assert not verify_mask_file(descriptor, base_dir=str(tmp_path))
+    with pytest.raises(MaskFileError):
+        load_mask_array(descriptor, base_dir=str(tmp_path), verify=True)
+    path.unlink()
+    with pytest.raises(MaskFileError):
+        load_mask_array(descriptor, base_dir=str(tmp_path))
+
+# ✅ Descriptor validates against the domain schema
+def test_descriptor_schema(tmp_path):
+    path = tmp_path / "mask.npy"
+    descriptor = write_mask_slabs(str(path), (11, 5, 6), slabs_of(random_mask(), 6), encoding="packbits")
+    domain = {
+        "domain_definition": {
+            "min_x": 0.0, "max_x": 1.0, "min_y": 0.0, "max_y": 1.0,
+            "min_z": 0.0, "max_z": 1.0, "nx": 11, "ny": 5, "nz": 6
+        },
+        "geometry_mask": {"path": path.name, **descriptor}
+    }
+    validate(instance=json.loads(json.dumps(domain)), schema=load_schema(SCHEMA_PATH))
@@ -0,0 +1,108 @@
+# tests/test_occupancy_mask.py
+
+import numpy as np
+import pytest
+from src.occupancy_mask import compute_occupancy_mask, iter_mask_slabs, column_crossings, grid_spacing
+
+
+def box_surface(lo, hi):
+    """Closed, outward-oriented 12-triangle surface of an axis-aligned box."""
+    x0, y0, z0 = lo
+    x1, y1, z1 = hi
+    vertices = np.array([[x, y, z] for z in (z0, z1) for y in (y0, y1) for x in (x0, x1)], dtype=float)
+    triangles = np.array([
+        [0, 2, 1], [1, 2, 3], [4, 5, 6], [5, 7, 6], [0, 1, 4], [1, 5, 4],
+        [2, 6, 3], [3, 6, 7], [0, 4, 2], [2, 4, 6], [1, 3, 5], [3, 7, 5]
+    ])
+    return vertices, triangles
+
+
+def sphere_surface(n=48, radius=1.0):
+    """UV-sphere tessellation with poles, closed and watertight."""
+    thetas = np.linspace(0.0, np.pi, n + 1)[1:-1]
+    phis = np.linspace(0.0, 2.0 * np.pi, 2 * n, endpoint=False)
+    ring = [[radius * np.sin(t) * np.cos(p), radius * np.sin(t) * np.sin(p), radius * np.cos(t)]
+            for t in thetas for p in phis]
+    vertices = np.array([[0.0, 0.0, radius]] + ring + [[0.0, 0.0, -radius]])
+    m = 2 * n
+    triangles = [[0, 1 + a, 1 + (a + 1) % m] for a in range(m)]
+    for r in range(n - 2):
+        base = 1 + r * m
+        for a in range(m):
+            p, q = base + a, base + (a + 1) % m
+            triangles += [[p, p + m, q], [q, p + m, q + m]]
+    base, last = 1 + (n - 2) * m, len(vertices) - 1
+    triangles += [[base + a, last, base + (a + 1) % m] for a in range(m)]
+    return vertices, np.array(triangles)
+
+
+def domain(bounds, shape):
+    (x0, y0, z0), (x1, y1, z1) = bounds
+    return {
+        "min_x": x0, "max_x": x1, "min_y": y0, "max_y": y1, "min_z": z0, "max_z": z1,
+        "nx": shape[0], "ny": shape[1], "nz": shape[2]
+    }
+
+# ✅ Grid spacing helper
+def test_grid_spacing():
+    origin, spacing, shape = grid_spacing(domain(((0, -1, -1), (2, 1, 1)), (4, 4, 8)))
+    assert origin == (0.0, -1.0, -1.0)
+    assert spacing == (0.5, 0.5, 0.25)
+    assert shape == (4, 4, 8)
+
+# ✅ Box filling the whole domain marks every cell solid
+def test_full_box():
+    vertices, triangles = box_surface((0, -1, -1), (2, 1, 1))
+    mask = compute_occupancy_mask(domain(((0, -1, -1), (2, 1, 1)), (4, 4, 4)), vertices, triangles)
+    assert mask.dtype == np.uint8
+    assert mask.sum() == 64
+
+# ✅ Inner box only covers the central cells, in x-fastest order
+def test_inner_box_layout():
+    vertices, triangles = box_surface((0.4, -0.6, -0.1), (0.9, 0.6, 0.9))
+    mask = compute_occupancy_mask(domain(((0, -1, -1), (2, 1, 1)), (4, 4, 4)), vertices, triangles)
+    grid = mask.reshape(4, 4, 4)  # (z, y, x)
+    expected = np.zeros((4, 4, 4), dtype=np.uint8)
+    expected[2:4, 1:3, 1:2] = 1
+    np.testing.assert_array_equal(grid, expected)
+
+# ✅ Sphere agrees with the analytic classification away from the surface
+def test_sphere_against_analytic():
+    vertices, triangles = sphere_surface(n=48)
+    n = 40
+    mask = compute_occupancy_mask(domain(((-1.2,) * 3, (1.2,) * 3), (n, n, n)), vertices, triangles)
+    centers = -1.2 + (np.arange(n) + 0.5) * 2.4 / n
+    z, y, x = np.meshgrid(centers, centers, centers, indexing="ij")
+    radius = np.sqrt(x ** 2 + y ** 2 + z ** 2).reshape(-1)
+    clear = np.abs(radius - 1.0) > 0.05  # Ignore cells within the chord error band
+    np.testing.assert_array_equal(mask[clear], (radius[clear] < 1.0).astype(np.uint8))
+
+# ✅ Slab size does not change the result
+@pytest.mark.parametrize("slab_cells", [1, 40 * 40, 40 * 40 * 7, 1 << 24])
+def test_slab_size_invariance(slab_cells):
+    vertices, triangles = sphere_surface(n=16)
+    d = domain(((-1.2,) * 3, (1.2,) * 3), (40, 40, 40))
+    reference = compute_occupancy_mask(d, vertices, triangles)
+    np.testing.assert_array_equal(compute_occupancy_mask(d, vertices, triangles, slab_cells=slab_cells), reference)
+
+# ✅ Slabs cover the z range contiguously and respect the cell budget
+def test_iter_mask_slabs_shapes():
+    vertices, triangles = box_surface((0, 0, 0), (1, 1, 1))
+    d = domain(((0, 0, 0), (1, 1, 1)), (5, 3, 7))
+    slabs = list(iter_mask_slabs(d, vertices, triangles, slab_cells=5 * 3 * 2))
+    assert [(a, b) for a, b, _ in slabs] == [(0, 2), (2, 4), (4, 6), (6, 7)]
+    assert all(slab.shape == (b - a, 3, 5) for a, b, slab in slabs)
+
+# ✅ Geometry outside the domain produces no crossings
+def test_no_crossings_outside_domain():
+    vertices, triangles = box_surface((5, 5, 5), (6, 6, 6))
+    columns, flips = column_crossings(vertices, triangles, domain(((0, 0, 0), (1, 1, 1)), (4, 4, 4)))
+    assert columns.size == 0 and flips.size == 0
+
+# ✅ Preallocated output buffers (e.g. memmaps) are filled in place
+def test_out_buffer():
+    vertices, triangles = box_surface((0, 0, 0), (1, 1, 1))
+    out = np.full(27, 9, dtype=np.uint8)
+    result = compute_occupancy_mask(domain(((0, 0, 0), (1, 1, 1)), (3, 3, 3)), vertices, triangles, out=out)
+    assert result is out
+    assert out.sum() == 27
@@ -0,0 +1,125 @@
+# tests/test_pipeline_orchestrator.py
+
+import json
+import os
+import shutil
+import sys
+import zipfile
+
+import pytest
+import src.batch_runner as batch_runner
+import src.pipeline_orchestrator as pipeline_orchestrator
+from src.batch_runner import _extract
+from src.pipeline_orchestrator import run_pipeline, SUMMARY_FILENAME
+from src.transfer_store import LocalStore
+from tests.test_run_catalog import gmsh_available
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), "test_models")
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "schemas", "domain_schema.json")
+
+
+def fill_store(root):
+    """Remote folder "/in" with three STEP files, a zip of two and one broken model."""
+    folder = root / "in"
+    folder.mkdir(parents=True)
+    for name in ("test_cube.step", "cube_with_hole.step", "hollow_cylinder.step"):
+        shutil.copy(os.path.join(MODELS_DIR, name), folder / name)
+    with zipfile.ZipFile(folder / "bundle.zip", "w") as archive:
+        archive.write(os.path.join(MODELS_DIR, "test_cube.step"), "a/test_cube.step")
+        archive.write(os.path.join(MODELS_DIR, "hollow_cylinder.step"), "b/cylinder.stp")
+    (folder / "broken.step").write_text("not a STEP file")
+    (folder / "notes.txt").write_text("ignored")
+
+# ✅ Every model is downloaded, extracted and uploaded; failures keep their stage
+@pytest.mark.skipif(not gmsh_available(), reason="The extraction workers run Gmsh")
+def test_run_pipeline_local_store(tmp_path):
+    fill_store(tmp_path / "remote")
+    store = LocalStore(str(tmp_path / "remote"))
+    summary = run_pipeline(store, "/in", str(tmp_path / "work"), upload_folder="/out", lc=0.5,
+                           schema_path=SCHEMA_PATH, workers=2, transfer_workers=2, queue_size=1)
+
+    assert summary["downloaded"] == 5
+    assert (summary["total"], summary["succeeded"], summary["failed"]) == (6, 5, 1)
+    failed, = [r for r in summary["files"] if r["status"] != "ok"]
+    assert failed["stage"] == "extract" and failed["step"].endswith("broken.step")
+
+    remote = tmp_path / "remote" / "out"
+    for relative in ("test_cube.json", "cube_with_hole.json", "hollow_cylinder.json",
+                     "bundle/a/test_cube.json", "bundle/b/cylinder.json"):
+        uploaded = json.loads((remote / relative).read_text())
+        local = json.loads((tmp_path / "work" / "domains" / relative).read_text())
+        assert uploaded == local and "domain_definition" in uploaded
+    assert json.loads((remote / "bundle/a/test_cube.json").read_text()) == json.loads((remote / "test_cube.json").read_text())
+    assert not (remote / "notes.json").exists()
+    assert json.loads((tmp_path / "work" / "domains" / SUMMARY_FILENAME).read_text())["total"] == 6
+
+# ✅ Uploads start while later models are still downloading
+@pytest.mark.skipif(not gmsh_available(), reason="The extraction workers run Gmsh")
+def test_run_pipeline_overlaps_stages(tmp_path):
+    fill_store(tmp_path / "remote")
+    delay = 0.3
+    store = LocalStore(str(tmp_path / "remote"), delay=delay)
+    summary = run_pipeline(store, "/in", str(tmp_path / "work"), upload_folder="/out", lc=0.5,
+                           schema_path=SCHEMA_PATH, workers=1, transfer_workers=1, queue_size=1)
+    # Five sequential downloads take 1.5 s; a sequential run would upload only after all of them
+    assert summary["first_upload_s"] < 5 * delay
+    assert summary["succeeded"] == 5
+
+# ✅ An empty upload folder keeps results local
+@pytest.mark.skipif(not gmsh_available(), reason="The extraction workers run Gmsh")
+def test_run_pipeline_without_upload(tmp_path):
+    fill_store(tmp_path / "remote")
+    summary = run_pipeline(LocalStore(str(tmp_path / "remote")), "/in", str(tmp_path / "work"), upload_folder="",
+                           lc=0.5, schema_path=SCHEMA_PATH)
+    assert summary["succeeded"] == 5 and summary["first_upload_s"] is None
+    assert "remote" not in summary["files"][0]
+    assert os.listdir(tmp_path / "remote") == ["in"]
+
+# ❌ Resolution arguments are checked before any transfer starts
+def test_run_pipeline_requires_resolution(tmp_path):
+    with pytest.raises(ValueError):
+        run_pipeline(LocalStore(str(tmp_path)), "/in", str(tmp_path / "work"))
+    assert not (tmp_path / "work").exists()
+
+# ❌ An unreachable remote folder is reported, not raised
+def test_run_pipeline_missing_folder(tmp_path):
+    summary = run_pipeline(LocalStore(str(tmp_path)), "/missing", str(tmp_path / "work"), lc=0.5,
+                           schema_path=SCHEMA_PATH)
+    assert summary["failed"] == 1 and summary["files"][0]["stage"] == "list"
+
+def _crash_on_marked(step_path, *args):
+    if "crash" in os.path.basename(step_path):
+        os._exit(1)  # What a Gmsh/OCC segfault or an OOM kill looks like to the pool
+    return _extract(step_path, *args)
+
+# ❌ A dead Gmsh worker fails its own file; a fresh pool extracts the rest and the summary is written
+@pytest.mark.skipif(not gmsh_available(), reason="The extraction workers run Gmsh")
+def test_run_pipeline_survives_dead_worker(tmp_path, monkeypatch):
+    folder = tmp_path / "remote" / "in"
+    folder.mkdir(parents=True)
+    shutil.copy(os.path.join(MODELS_DIR, "test_cube.step"), folder / "a_crash.step")
+    for i in range(4):
+        shutil.copy(os.path.join(MODELS_DIR, "test_cube.step"), folder / f"b_{i}.step")
+    monkeypatch.setattr(batch_runner, "_extract", _crash_on_marked)
+    summary = run_pipeline(LocalStore(str(tmp_path / "remote")), "/in", str(tmp_path / "work"), upload_folder="",
+                           lc=0.5, schema_path=SCHEMA_PATH, workers=1, transfer_workers=1, queue_size=1)
+
+    assert summary["total"] == 5 and summary["succeeded"] >= 3
+    crashed, = [r for r in summary["files"] if r["step"].endswith("a_crash.step")]
+    assert crashed["stage"] == "extract" and "BrokenProcessPool" in crashed["error"]
+    assert json.loads((tmp_path / "work" / "domains" / SUMMARY_FILENAME).read_text())["total"] == 5
+
+# ✅ The command line passes a resolution budget and the result cache through to the run
+def test_main_budget_and_cache(tmp_path, monkeypatch):
+    runs = []
+    monkeypatch.setattr(pipeline_orchestrator, "run_pipeline", lambda store, **kwargs: runs.append(kwargs) or {"failed": 0})
+    argv = ["pipeline_orchestrator", "--work-dir", str(tmp_path / "work"), "--local-store", str(tmp_path),
+            "--max-cells", "5000", "--cache-dir", str(tmp_path / "cache")]
+    monkeypatch.setattr(sys, "argv", argv)
+    pipeline_orchestrator.main()
+    monkeypatch.setattr(sys, "argv", argv + ["--no-cache"])
+    pipeline_orchestrator.main()
+
+    assert runs[0]["resolution_budget"]["max_cells"] == 5000 and runs[0]["lc"] is None
+    assert runs[0]["cache"].cache_dir == str(tmp_path / "cache")
+    assert runs[1]["cache"] is None
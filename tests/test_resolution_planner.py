@@ -0,0 +1,58 @@
+# tests/test_resolution_planner.py
+
+import pytest
+from jsonschema import validate
+from src.resolution_planner import plan_resolution, cell_budget, estimate_memory, ResolutionBudgetError
+from src.gmsh_runner import compute_resolution, resolve_domain, load_schema, SCHEMA_PATH
+
+BOX = (0.0, -1.0, -1.0, 2.0, 1.0, 1.0)
+SLAB = (0.0, 0.0, 0.0, 10.0, 1.0, 0.1)
+
+# ✅ Byte budgets translate to cells through fields and value size
+def test_cell_budget():
+    assert cell_budget(max_bytes=8000, fields=5, bytes_per_value=8) == 200
+    assert cell_budget(max_cells=100, max_bytes=8000) == 100
+    with pytest.raises(ValueError):
+        cell_budget()
+    with pytest.raises(ResolutionBudgetError):
+        cell_budget(max_bytes=10, fields=4)
+
+# ✅ Uniform plans are the finest lc grid that fits and agree with compute_resolution
+@pytest.mark.parametrize("bbox,budget", [(BOX, 1000), (BOX, 64), (SLAB, 5000), (SLAB, 7)])
+def test_uniform_plan_is_finest(bbox, budget):
+    plan = plan_resolution(bbox, max_cells=budget)
+    cells = plan["nx"] * plan["ny"] * plan["nz"]
+    assert cells <= budget
+    assert [plan["nx"], plan["ny"], plan["nz"]] == [
+        compute_resolution(bbox[i], bbox[i + 3], plan["lc"]) for i in range(3)
+    ]
+    finer = [compute_resolution(bbox[i], bbox[i + 3], plan["lc"] * 0.999) for i in range(3)]
+    assert finer[0] * finer[1] * finer[2] > budget
+
+# ✅ Per-axis plans use at least as much of the budget as uniform ones
+def test_per_axis_plan():
+    uniform = plan_resolution(SLAB, max_cells=5000)
+    per_axis = plan_resolution(SLAB, max_cells=5000, mode="per-axis")
+    assert per_axis["memory_estimate"]["cells"] >= uniform["memory_estimate"]["cells"]
+    assert per_axis["memory_estimate"]["cells"] <= 5000
+
+# ✅ Minimum cells per feature raise coarse axes; impossible requests fail
+def test_min_feature_size():
+    bbox = (0.0, 0.0, 0.0, 1.0, 1.0, 1.9)
+    plan = plan_resolution(bbox, max_cells=8)
+    assert (plan["nx"], plan["ny"], plan["nz"]) == (1, 1, 3)
+    plan = plan_resolution(bbox, max_cells=8, min_feature_size=1.9, min_cells_per_feature=2)
+    assert (plan["nx"], plan["ny"], plan["nz"]) == (2, 2, 2)
+    with pytest.raises(ResolutionBudgetError, match="budget is 8"):
+        plan_resolution(bbox, max_cells=8, min_feature_size=1.0, min_cells_per_feature=2)
+
+# ✅ Budgeted domains carry a schema-valid memory estimate
+def test_resolve_domain_memory_estimate():
+    budget = {"max_bytes": 64 * 1024 * 1024, "fields": 5, "bytes_per_value": 8}
+    domain = resolve_domain(BOX, resolution_budget=budget)
+    estimate = domain["memory_estimate"]
+    assert estimate == dict(estimate_memory(domain["domain_definition"]["nx"], domain["domain_definition"]["ny"],
+                                            domain["domain_definition"]["nz"], fields=5, bytes_per_value=8),
+                            budget_cells=64 * 1024 * 1024 // 40)
+    assert estimate["bytes"] <= 64 * 1024 * 1024
+    validate(instance=domain, schema=load_schema(SCHEMA_PATH))
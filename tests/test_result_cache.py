@@ -0,0 +1,73 @@
+# tests/test_result_cache.py
+
+import os
+import pytest
+from src.result_cache import ResultCache, file_sha256
+
+DOMAIN = {
+    "domain_definition": {
+        "min_x": 0.0, "max_x": 2.0,
+        "min_y": -1.0, "max_y": 1.0,
+        "min_z": -1.0, "max_z": 1.0,
+        "nx": 4, "ny": 4, "nz": 4
+    }
+}
+
+@pytest.fixture
+def step_file(tmp_path):
+    path = tmp_path / "part.step"
+    path.write_text("ISO-10303-21;\nDATA;\nENDSEC;\n")
+    return path
+
+# ✅ Content hash matches hashlib over the whole file
+def test_file_sha256(step_file):
+    import hashlib
+    assert file_sha256(str(step_file)) == hashlib.sha256(step_file.read_bytes()).hexdigest()
+
+# ✅ Round trip through the cache
+def test_put_get_roundtrip(tmp_path, step_file):
+    cache = ResultCache(str(tmp_path / "cache"))
+    key = cache.make_key(str(step_file), lc=0.5)
+    assert cache.get(key) is None
+    cache.put(key, DOMAIN)
+    assert cache.get(key) == DOMAIN
+
+# ✅ Key depends on content and resolution, not on file name
+def test_key_sensitivity(tmp_path, step_file):
+    cache = ResultCache(str(tmp_path / "cache"))
+    copy = tmp_path / "renamed.step"
+    copy.write_bytes(step_file.read_bytes())
+    assert cache.make_key(str(step_file), lc=0.5) == cache.make_key(str(copy), lc=0.5)
+    assert cache.make_key(str(step_file), lc=0.5) != cache.make_key(str(step_file), lc=0.25)
+    assert cache.make_key(str(step_file), nx=4, ny=4, nz=4) != cache.make_key(str(step_file), nx=4, ny=4, nz=8)
+    # nx/ny/nz are ignored by the extractor when lc is set
+    assert cache.make_key(str(step_file), lc=0.5) == cache.make_key(str(step_file), lc=0.5, nx=9, ny=9, nz=9)
+    step_file.write_text("ISO-10303-21;\nDATA;\n#1=X();\nENDSEC;\n")
+    assert cache.make_key(str(step_file), lc=0.5) != cache.make_key(str(copy), lc=0.5)
+
+# ✅ Least-recently-used entries are evicted first
+def test_lru_eviction(tmp_path, step_file):
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=10**9)
+    keys = [f"{i:064x}" for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, DOMAIN)
+        os.utime(cache._entry_path(key), (1000 + i, 1000 + i))
+    cache.get(keys[0])  # Touch the oldest so it becomes most recent
+    entry_size = os.path.getsize(cache._entry_path(keys[0]))
+    cache.max_bytes = 2 * entry_size
+    assert cache.evict() == 1
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == DOMAIN
+    assert cache.get(keys[2]) == DOMAIN
+
+# ✅ Purge removes everything
+def test_purge(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    cache.put("a" * 64, DOMAIN)
+    cache.put("b" * 64, DOMAIN)
+    assert cache.purge() == 2
+    assert cache.size_bytes() == 0
+
+# ✅ Purging a cache directory that does not exist yet is a no-op
+def test_purge_missing_dir(tmp_path):
+    assert ResultCache(str(tmp_path / "absent")).purge() == 0
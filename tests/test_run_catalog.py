@@ -0,0 +1,107 @@
+# tests/test_run_catalog.py
+
+import json
+import os
+import sqlite3
+
+import pytest
+from src.batch_runner import run_batch
+from src.result_cache import file_sha256
+from src.run_catalog import RunCatalog, CatalogError, main
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), "test_models")
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "schemas", "domain_schema.json")
+
+DOMAIN = {
+    "domain_definition": {"min_x": 0.0, "max_x": 2.0, "min_y": -1.0, "max_y": 1.0, "min_z": -1.0, "max_z": 1.0,
+                          "nx": 4, "ny": 2, "nz": 2},
+    "geometry_mask": {"path": "out_mask.npy", "sha256": "ab" * 32},
+}
+
+
+def gmsh_available():
+    try:
+        import gmsh  # noqa: F401
+    except (ImportError, OSError):  # OSError: the package is there but its shared library is not
+        return False
+    return True
+
+
+def write_output(tmp_path, name="out.json"):
+    output = tmp_path / name
+    output.write_text(json.dumps(DOMAIN))
+    return str(output)
+
+# ✅ Runs are found by content hash and dimensions, with their outputs pending upload
+def test_record_and_find_runs(tmp_path):
+    catalog = RunCatalog(str(tmp_path / "catalog.sqlite"))
+    output = write_output(tmp_path)
+    metrics = {"step_sha256": "f" * 64, "step_bytes": 123, "cache": "miss", "total_wall_s": 1.5,
+               "phases": {"bbox": {"wall_s": 1.0, "cpu_s": 0.9}}}
+    run_id = catalog.record_run("part.step", "ok", domain=DOMAIN, output_path=output, lc=0.5, metrics=metrics)
+    catalog.record_run("part.step", "failed", lc=0.25, metrics=metrics, error="RuntimeError: boom")
+
+    run, = catalog.find_runs(nx=4, ny=2, nz=2)
+    assert run["id"] == run_id and run["cells"] == 16 and run["max_x"] == 2.0 and run["wall_s"] == 1.5
+    assert json.loads(run["phases"])["bbox"]["wall_s"] == 1.0
+    assert catalog.completed_run("f" * 64, lc=0.5)["id"] == run_id
+    assert catalog.completed_run("f" * 64, lc=0.25) is None
+    assert [(o["kind"], os.path.basename(o["path"]), o["upload_status"]) for o in catalog.outputs(run_id=run_id)] == [
+        ("geometry_mask", "out_mask.npy", "pending"), ("domain", "out.json", "pending")
+    ]
+    assert catalog.outputs(run_id=run_id)[1]["sha256"] == file_sha256(output)
+
+# ✅ Uploads update the status of the matching outputs
+def test_record_transfer_updates_outputs(tmp_path):
+    catalog = RunCatalog(str(tmp_path / "catalog.sqlite"))
+    output = write_output(tmp_path)
+    catalog.record_run("part.step", "ok", domain=DOMAIN, output_path=output, step_sha256="a" * 64)
+    catalog.record_transfer("upload", output, "/out/out.json")
+    catalog.record_transfer("upload", str(tmp_path / "out_mask.npy"), "/out/out_mask.npy", status="failed")
+    catalog.record_transfer("download", str(tmp_path / "part.step"), "/in/part.step", content_hash="c" * 64)
+
+    assert catalog.outputs(upload_status="uploaded")[0]["remote_path"] == "/out/out.json"
+    assert catalog.outputs(upload_status="failed")[0]["kind"] == "geometry_mask"
+    assert catalog.stats() == {"runs": {"ok": 1}, "distinct_models": 1, "outputs": {"failed": 1, "uploaded": 1},
+                               "transfers": {"download": 1, "upload": 2}}
+
+# ✅ Batch runs record one row per file, keyed by the STEP content hash
+@pytest.mark.skipif(not gmsh_available(), reason="The batch workers extract with Gmsh")
+def test_run_batch_records_catalog(tmp_path):
+    catalog = RunCatalog(str(tmp_path / "catalog.sqlite"))
+    summary = run_batch(MODELS_DIR, str(tmp_path / "out"), lc=0.5, schema_path=SCHEMA_PATH, catalog=catalog)
+    runs = catalog.find_runs(status="ok", limit=1000)
+    assert len(runs) == summary["succeeded"] > 0
+    cube = os.path.join(MODELS_DIR, "test_cube.step")
+    done = catalog.completed_run(file_sha256(cube), lc=0.5)
+    assert done["step_path"] == cube and done["source"] == "batch" and done["cells"] > 0
+    assert catalog.outputs(run_id=done["id"])[0]["path"] == str(tmp_path / "out" / "test_cube.json")
+
+# ✅ The query CLI answers "already done?" through its exit code
+def test_cli(tmp_path, capsys):
+    path = str(tmp_path / "catalog.sqlite")
+    step = os.path.join(MODELS_DIR, "test_cube.step")
+    RunCatalog(path).record_run(step, "ok", domain=DOMAIN, output_path=write_output(tmp_path),
+                                step_sha256=file_sha256(step), lc=0.5)
+    main(["--catalog", path, "done", "--step", step, "--lc", "0.5"])
+    with pytest.raises(SystemExit) as exit_info:
+        main(["--catalog", path, "done", "--step", step, "--lc", "0.25"])
+    assert exit_info.value.code == 1
+    capsys.readouterr()
+    main(["--catalog", path, "--json", "runs", "--nx", "4"])
+    assert json.loads(capsys.readouterr().out.splitlines()[0])["step_path"] == step
+
+# ❌ A catalog written by a newer layout is refused
+def test_unknown_layout_version(tmp_path):
+    path = str(tmp_path / "catalog.sqlite")
+    with sqlite3.connect(path) as db:
+        db.execute("PRAGMA user_version = 99")
+    with pytest.raises(CatalogError):
+        RunCatalog(path)
+
+# ❌ A file that is not an SQLite database is reported as a CatalogError
+def test_corrupt_catalog(tmp_path):
+    path = tmp_path / "catalog.sqlite"
+    path.write_bytes(b"not a database, just some bytes" * 64)
+    with pytest.raises(CatalogError, match="Cannot open catalog"):
+        RunCatalog(str(path))
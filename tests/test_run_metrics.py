@@ -0,0 +1,48 @@
+# tests/test_run_metrics.py
+
+import json
+import pstats
+import time
+from src.run_metrics import RunMetrics, profiled
+from src.gmsh_runner import extract_domain_definition
+
+# ✅ Re-entered phases accumulate wall and CPU time
+def test_phase_accumulates():
+    metrics = RunMetrics(step="a.step")
+    for _ in range(2):
+        with metrics.phase("open"):
+            time.sleep(0.01)
+    record = metrics.as_record()
+    assert record["step"] == "a.step"
+    assert record["phases"]["open"]["wall_s"] >= 0.02
+    assert record["phases"]["open"]["cpu_s"] < record["phases"]["open"]["wall_s"]
+    assert record["peak_rss_mb"] > 0
+
+# ✅ Records append as JSON lines
+def test_emit_json_lines(tmp_path):
+    path = tmp_path / "metrics" / "runs.jsonl"
+    for n in range(2):
+        metrics = RunMetrics(run=n)
+        metrics.set("cache", "miss")
+        metrics.emit(str(path))
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["run"] for line in lines] == [0, 1]
+    assert lines[0]["cache"] == "miss"
+
+# ✅ The profiling hook dumps pstats only when a path is given
+def test_profiled(tmp_path):
+    with profiled(None) as profiler:
+        assert profiler is None
+    dump = tmp_path / "run.prof"
+    with profiled(str(dump)):
+        sum(range(1000))
+    assert pstats.Stats(str(dump)).total_calls > 0
+
+# ✅ Extraction reports its phases and file facts
+def test_extract_records_metrics():
+    metrics = RunMetrics()
+    extract_domain_definition("tests/test_models/test_cube.step", nx=4, ny=4, nz=4, bbox_mode="fast", metrics=metrics)
+    record = metrics.as_record()
+    assert set(record["phases"]) == {"prescan", "resolution"}
+    assert record["step_bytes"] > 0
+    assert record["cache"] == "disabled"
@@ -0,0 +1,86 @@
+# tests/test_sparse_grid.py
+
+import numpy as np
+import pytest
+from jsonschema import validate
+from src.gmsh_runner import load_schema, attach_geometry_mask, SCHEMA_PATH
+from src.mask_io import write_mask_slabs, load_mask_array, read_mask_slab, verify_mask_file, MaskFileError
+from src.sparse_grid import SparseMask, load_sparse_mask, FLUID_BLOCK, SOLID_BLOCK
+from tests.test_occupancy_mask import sphere_surface, domain
+
+
+def ball_mask(shape=(37, 29, 21), radius=0.3):
+    """Dense (nz, ny, nx) mask of a ball in the unit cube, cell centres."""
+    nx, ny, nz = shape
+    z, y, x = np.meshgrid(*((np.arange(n) + 0.5) / n - 0.5 for n in (nz, ny, nx)), indexing="ij")
+    return (x * x + y * y + z * z < radius * radius).astype(np.uint8)
+
+
+def slabs_of(mask, depth):
+    for k in range(0, mask.shape[0], depth):
+        yield k, min(k + depth, mask.shape[0]), mask[k:k + depth]
+
+# ✅ Round trip for grids that are not block multiples, streamed in odd slabs
+@pytest.mark.parametrize("block_size,depth", [(4, 3), (8, 5), (8, 100)])
+def test_roundtrip(block_size, depth):
+    mask = ball_mask()
+    sparse = SparseMask.from_slabs((37, 29, 21), slabs_of(mask, depth), block_size=block_size)
+    np.testing.assert_array_equal(sparse.expand(), mask)
+    assert sparse.solid_cells() == int(mask.sum())
+
+# ✅ Uniform blocks are not stored; only blocks on the surface cost bricks
+def test_uniform_blocks_compress():
+    mask = ball_mask(shape=(64, 64, 64), radius=0.35)
+    sparse = SparseMask.from_dense(mask, block_size=8)
+    counts = sparse.block_counts()
+    assert counts["fluid"] + counts["solid"] + counts["mixed"] == 512
+    assert counts["solid"] > 0 and counts["mixed"] < 512 // 2
+    assert sparse.blocks[0, 0, 0] == FLUID_BLOCK
+    assert sparse.blocks[4, 4, 4] == SOLID_BLOCK
+    assert sparse.bricks.nbytes + sparse.blocks.nbytes < mask.nbytes // 4
+
+# ✅ Any region expands on demand and matches the dense slice
+@pytest.mark.parametrize("region", [
+    ((0, 37), (0, 29), (0, 21)),
+    ((5, 19), (3, 4), (7, 20)),
+    ((30, 37), (20, 29), (0, 1)),
+    ((-3, 50), (10, 10), (2, 9)),
+])
+def test_expand_region(region):
+    mask = ball_mask()
+    sparse = SparseMask.from_dense(mask, block_size=4)
+    (x0, x1), (y0, y1), (z0, z1) = region
+    expected = mask[max(0, z0):z1, max(0, y0):y1, max(0, x0):x1]
+    np.testing.assert_array_equal(sparse.expand(x_range=(x0, x1), y_range=(y0, y1), z_range=(z0, z1)), expected)
+
+# ✅ Blocks encoding through mask_io: write, verify, slab reads
+def test_mask_io_blocks(tmp_path):
+    mask = ball_mask()
+    path = tmp_path / "mask.npz"
+    descriptor = write_mask_slabs(str(path), (37, 29, 21), slabs_of(mask, 6), encoding="blocks", block_size=4)
+    descriptor["path"] = path.name
+    assert descriptor["format"] == "npz" and descriptor["block_size"] == 4
+    assert descriptor["solid_cells"] == int(mask.sum())
+    assert verify_mask_file(descriptor, base_dir=str(tmp_path))
+    sparse = load_mask_array(descriptor, base_dir=str(tmp_path), verify=True)
+    np.testing.assert_array_equal(read_mask_slab(descriptor, 3, 11, array=sparse), mask[3:11])
+    np.testing.assert_array_equal(read_mask_slab(descriptor, 0, 21, base_dir=str(tmp_path)), mask)
+
+# ✅ Runner writes a schema-valid block-sparse mask descriptor
+def test_attach_blocks_mask_schema(tmp_path):
+    vertices, triangles = sphere_surface(n=16)
+    domain_json = {"domain_definition": domain(((-2, -2, -2), (2, 2, 2)), (24, 24, 24))}
+    attach_geometry_mask(domain_json, vertices, triangles, mask_path=str(tmp_path / "d_mask.npz"), mask_encoding="blocks")
+    validate(instance=domain_json, schema=load_schema(SCHEMA_PATH))
+    assert domain_json["geometry_mask"]["block_counts"]["fluid"] > 0
+
+# ❌ Tables that do not fit the declared grid are rejected
+def test_load_sparse_mask_errors(tmp_path):
+    sparse = SparseMask.from_dense(ball_mask(), block_size=4)
+    sparse.save(str(tmp_path / "m.npz"))
+    with pytest.raises(MaskFileError):
+        load_sparse_mask(str(tmp_path / "m.npz"), shape=[21, 29, 38])
+    with pytest.raises(MaskFileError):
+        load_sparse_mask(str(tmp_path / "missing.npz"))
+    with pytest.raises(ValueError):
+        SparseMask((4, 4, 4), 6, np.zeros((1, 1, 1)), np.zeros((0, 27)))
@@ -0,0 +1,87 @@
+# tests/test_spatial_index.py
+
+import numpy as np
+import pytest
+from src.spatial_index import SurfaceIndex, closest_points_on_triangles
+from tests.test_occupancy_mask import box_surface, sphere_surface
+
+
+def brute_force_distance(vertices, triangles, points):
+    corners = vertices[triangles]
+    best = np.full(len(points), np.inf)
+    for a, b, c in corners:
+        n = len(points)
+        cp = closest_points_on_triangles(points, np.tile(a, (n, 1)), np.tile(b, (n, 1)), np.tile(c, (n, 1)))
+        best = np.minimum(best, np.linalg.norm(cp - points, axis=1))
+    return best
+
+# ✅ Closest point covers vertex, edge and face regions
+def test_closest_points_on_triangle_regions():
+    a, b, c = np.array([0.0, 0, 0]), np.array([1.0, 0, 0]), np.array([0.0, 1, 0])
+    points = np.array([[-1, -1, 0], [0.5, -1, 0], [0.2, 0.2, 3], [2, 2, 0], [2, -1, 0]], dtype=float)
+    n = len(points)
+    cp = closest_points_on_triangles(points, np.tile(a, (n, 1)), np.tile(b, (n, 1)), np.tile(c, (n, 1)))
+    np.testing.assert_allclose(cp, [[0, 0, 0], [0.5, 0, 0], [0.2, 0.2, 0], [0.5, 0.5, 0], [1, 0, 0]])
+
+# ✅ Nearest distances match a brute-force scan, inside and far outside the bins
+def test_nearest_matches_brute_force():
+    vertices, triangles = sphere_surface(n=16)
+    index = SurfaceIndex(vertices, triangles, triangles_per_bin=2)
+    points = np.random.default_rng(0).uniform(-3, 3, size=(300, 3))
+    distance, triangle, closest = index.nearest(points)
+    np.testing.assert_allclose(distance, brute_force_distance(vertices, triangles, points), rtol=1e-12, atol=1e-12)
+    assert (triangle >= 0).all()
+    np.testing.assert_allclose(np.linalg.norm(closest - points, axis=1), distance)
+
+# ✅ Search radius leaves far points unmatched
+def test_nearest_max_distance():
+    vertices, triangles = box_surface((0, 0, 0), (1, 1, 1))
+    index = SurfaceIndex(vertices, triangles)
+    distance, triangle, closest = index.nearest([[0.5, 0.5, 0.45], [0.5, 0.5, 3.0]], max_distance=0.5)
+    assert distance[0] == pytest.approx(0.45)
+    assert triangle[0] >= 0
+    assert distance[1] == np.inf and triangle[1] == -1 and np.isnan(closest[1]).all()
+
+# ✅ Inside/outside agrees with the analytic sphere away from the surface
+def test_contains_sphere():
+    vertices, triangles = sphere_surface(n=32)
+    index = SurfaceIndex(vertices, triangles)
+    points = np.random.default_rng(1).uniform(-1.5, 1.5, size=(2000, 3))
+    radius = np.linalg.norm(points, axis=1)
+    clear = np.abs(radius - 1.0) > 0.02
+    inside = index.contains(points)
+    assert (inside[clear] == (radius[clear] < 1.0)).all()
+
+# ✅ Boxes: face-aligned query points and points beside the footprint
+def test_contains_box():
+    vertices, triangles = box_surface((0, 0, 0), (2, 1, 1))
+    index = SurfaceIndex(vertices, triangles)
+    inside = index.contains([[0.5, 0.5, 0.5], [1.0, 0.5, 0.5], [3.0, 0.5, 0.5], [0.5, 0.5, -1.0], [0.5, 0.5, 2.0]])
+    assert inside.tolist() == [True, True, False, False, False]
+
+# ✅ One index answers queries for grids of different resolutions
+def test_reuse_across_resolutions():
+    vertices, triangles = sphere_surface(n=16)
+    index = SurfaceIndex(vertices, triangles)
+    for n in (4, 9):
+        axis = (np.arange(n) + 0.5) / n * 2.4 - 1.2
+        centers = np.stack(np.meshgrid(axis, axis, axis, indexing="ij"), axis=-1).reshape(-1, 3)
+        distance, _, _ = index.nearest(centers)
+        assert distance.shape == (n ** 3,)
+        assert index.contains(centers).sum() > 0
+
+# ✅ Entity boxes support single and batched overlap queries
+def test_entities_overlapping():
+    vertices, triangles = box_surface((0, 0, 0), (1, 1, 1))
+    boxes = np.array([[0, 0, 0, 1, 1, 0], [0, 0, 1, 1, 1, 1]], dtype=float)
+    index = SurfaceIndex(vertices, triangles, entity_tags=[1, 2], entity_boxes=boxes)
+    assert index.entities_overlapping([0.2, 0.2, -0.1, 0.3, 0.3, 0.1]).tolist() == [True, False]
+    overlap = index.entities_overlapping([[0, 0, 0.5, 1, 1, 2], [5, 5, 5, 6, 6, 6]])
+    assert overlap.tolist() == [[False, True], [False, False]]
+
+# ✅ Empty surfaces are valid, everything is far and outside
+def test_empty_index():
+    index = SurfaceIndex(np.zeros((0, 3)), np.zeros((0, 3), dtype=int))
+    distance, triangle, _ = index.nearest([[0, 0, 0]])
+    assert distance[0] == np.inf and triangle[0] == -1
+    assert not index.contains([[0, 0, 0]]).any()
@@ -0,0 +1,69 @@
+# tests/test_startup.py
+
+import json
+import os
+import subprocess
+import sys
+import textwrap
+from src.result_cache import ResultCache
+from src.run_catalog import RunCatalog
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("gmsh", "jsonschema", "numpy")
+
+# Generous ceiling for importing the runner module; a regression that pulls
+# the Gmsh shared library back into module import time blows well past it.
+IMPORT_BUDGET_S = 0.5
+
+
+def run_probe(code):
+    """Run `code` in a fresh interpreter and return the JSON it prints last."""
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    result = subprocess.run([sys.executable, "-c", textwrap.dedent(code)], cwd=REPO_ROOT, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_main(argv):
+    return run_probe(f"""
+        import json, runpy, sys, time
+        sys.argv = {argv!r}
+        try:
+            runpy.run_path("src/gmsh_runner.py", run_name="__main__")
+        except SystemExit:
+            pass
+        print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))
+    """)
+
+# ✅ Importing the runner loads no heavy dependency and stays within budget
+def test_import_budget():
+    probe = run_probe(f"""
+        import json, sys, time
+        started = time.perf_counter()
+        import src.gmsh_runner
+        elapsed = time.perf_counter() - started
+        print(json.dumps({{"elapsed": elapsed, "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+    """)
+    assert probe["loaded"] == []
+    assert probe["elapsed"] < IMPORT_BUDGET_S
+
+# ✅ --help and argument errors never load Gmsh or jsonschema
+def test_help_and_usage_errors_stay_light():
+    assert run_main(["gmsh_runner.py", "--help"]) == []
+    assert run_main(["gmsh_runner.py", "--lc", "0.5"]) == []
+
+# ✅ A cache hit validates the cached domain without loading Gmsh
+def test_cache_hit_skips_gmsh(tmp_path):
+    step = os.path.join(REPO_ROOT, "tests", "test_models", "test_cube.step")
+    cache = ResultCache(str(tmp_path / "cache"))
+    key = cache.make_key(step, lc=0.5, bbox_mode="occ", mask=False, mask_path=None, mask_encoding="dense")
+    cache.put(key, {"domain_definition": {"min_x": 0.0, "max_x": 2.0, "min_y": -1.0, "max_y": 1.0,
+                                          "min_z": -1.0, "max_z": 1.0, "nx": 4, "ny": 4, "nz": 4}})
+    output = tmp_path / "out.json"
+    loaded = run_main(["gmsh_runner.py", "--step", step, "--lc", "0.5", "--cache-dir", str(tmp_path / "cache"),
+                       "--output", str(output), "--catalog", str(tmp_path / "catalog.sqlite")])
+    assert "gmsh" not in loaded and "numpy" not in loaded
+    assert json.loads(output.read_text())["domain_definition"]["nx"] == 4
+    run, = RunCatalog(str(tmp_path / "catalog.sqlite")).find_runs()
+    assert (run["status"], run["cache"], run["nx"]) == ("ok", "hit", 4)
@@ -0,0 +1,114 @@
+# tests/test_step_prescan.py
+
+import pytest
+from src.step_prescan import (
+    prescan_bounding_box, compare_bounding_boxes, iter_statements, StepPrescanError
+)
+
+STEP_TEMPLATE = """ISO-10303-21;
+HEADER;
+FILE_DESCRIPTION(('synthetic'),'2;1');
+FILE_SCHEMA(('AUTOMOTIVE_DESIGN'));
+ENDSEC;
+DATA;
+{body}
+ENDSEC;
+END-ISO-10303-21;
+"""
+
+MM_UNIT = "#900 = ( LENGTH_UNIT() NAMED_UNIT(*) SI_UNIT(.MILLI.,.METRE.) );"
+
+
+def write_step(tmp_path, body, name="synthetic.step"):
+    path = tmp_path / name
+    path.write_text(STEP_TEMPLATE.format(body=body))
+    return str(path)
+
+# ✅ Fixture models match their expected domain extents
+@pytest.mark.parametrize("model", ["test_cube", "cube_with_hole", "hollow_cylinder"])
+def test_fixture_models(model):
+    report = prescan_bounding_box(f"tests/test_models/{model}.step")
+    assert report["bbox"] == pytest.approx((0.0, -1.0, -1.0, 2.0, 1.0, 1.0))
+    assert report["file_unit_m"] == pytest.approx(0.001)
+
+# ✅ Statements spanning lines and read-block boundaries are reassembled
+def test_iter_statements_block_boundaries(tmp_path):
+    body = "#1 = CARTESIAN_POINT('a;b',\n  (1.,2.,3.));\n#2 = CARTESIAN_POINT('',(4.,5.,6.));"
+    path = write_step(tmp_path, body)
+    statements = list(iter_statements(path, block_size=7))
+    assert statements[0] == "#1 = CARTESIAN_POINT('a;b',\n  (1.,2.,3.))"
+    assert statements[1].startswith("#2 = CARTESIAN_POINT")
+
+# ✅ 2D parameter-space points are ignored
+def test_ignores_2d_points(tmp_path):
+    body = "\n".join([
+        "#1 = CARTESIAN_POINT('',(0.,0.,0.));",
+        "#2 = CARTESIAN_POINT('',(1.,1.,1.));",
+        "#3 = CARTESIAN_POINT('',(-50.,80.));",
+        MM_UNIT,
+    ])
+    report = prescan_bounding_box(write_step(tmp_path, body))
+    assert report["bbox"] == pytest.approx((0.0, 0.0, 0.0, 1.0, 1.0, 1.0))
+    assert report["points"] == 2
+
+# ✅ Circles are padded in their plane only
+def test_circle_padding_in_plane(tmp_path):
+    body = "\n".join([
+        "#1 = CARTESIAN_POINT('',(0.,0.,0.));",
+        "#2 = DIRECTION('',(0.,0.,1.));",
+        "#3 = DIRECTION('',(1.,0.,0.));",
+        "#4 = AXIS2_PLACEMENT_3D('',#1,#2,#3);",
+        "#5 = CIRCLE('',#4,2.5);",
+        "#6 = CARTESIAN_POINT('',(2.5,0.,0.));",
+        MM_UNIT,
+    ])
+    report = prescan_bounding_box(write_step(tmp_path, body))
+    assert report["bbox"] == pytest.approx((-2.5, -2.5, 0.0, 2.5, 2.5, 0.0))
+
+# ✅ Spheres pad isotropically
+def test_sphere_padding(tmp_path):
+    body = "\n".join([
+        "#1 = CARTESIAN_POINT('',(1.,1.,1.));",
+        "#4 = AXIS2_PLACEMENT_3D('',#1,$,$);",
+        "#5 = SPHERICAL_SURFACE('',#4,1.);",
+        MM_UNIT,
+    ])
+    report = prescan_bounding_box(write_step(tmp_path, body))
+    assert report["bbox"] == pytest.approx((0.0, 0.0, 0.0, 2.0, 2.0, 2.0))
+
+# ✅ Conversion-based units are scaled to millimetres like OCC
+def test_inch_units(tmp_path):
+    body = "\n".join([
+        "#1 = CARTESIAN_POINT('',(0.,0.,0.));",
+        "#2 = CARTESIAN_POINT('',(1.,2.,3.));",
+        "#3 = ( CONVERSION_BASED_UNIT('INCH',#4) LENGTH_UNIT() NAMED_UNIT(#5) );",
+    ])
+    report = prescan_bounding_box(write_step(tmp_path, body))
+    assert report["bbox"] == pytest.approx((0.0, 0.0, 0.0, 25.4, 50.8, 76.2))
+    report_m = prescan_bounding_box(write_step(tmp_path, body), target_unit="M")
+    assert report_m["bbox"][5] == pytest.approx(0.0762)
+
+# ❌ No geometry at all
+def test_no_points(tmp_path):
+    with pytest.raises(StepPrescanError):
+        prescan_bounding_box(write_step(tmp_path, MM_UNIT))
+
+# ✅ Bounding box comparison reports bounds beyond tolerance only
+def test_compare_bounding_boxes():
+    fast = (0.0, -1.0, -1.0, 2.0, 1.0, 1.5)
+    occ = (0.0, -1.0, -1.005, 2.0, 1.0, 1.0)
+    discrepancies = compare_bounding_boxes(fast, occ, tolerance=0.01)
+    assert [d[0] for d in discrepancies] == ["max_z"]
+    assert discrepancies[0][3] == pytest.approx(0.5)
+
+# ❌ Mixed length units are flagged and scaled by the first unit in the file
+def test_mixed_units(tmp_path):
+    body = "\n".join([
+        "#1 = CARTESIAN_POINT('',(0.,0.,0.));",
+        "#2 = CARTESIAN_POINT('',(1.,2.,3.));",
+        "#3 = ( LENGTH_UNIT() NAMED_UNIT(*) SI_UNIT($,.METRE.) );",
+        MM_UNIT,
+    ])
+    report = prescan_bounding_box(write_step(tmp_path, body))
+    assert report["mixed_units"] and report["file_unit_m"] == 1.0
+    assert report["bbox"][5] == pytest.approx(3000.0)
@@ -0,0 +1,131 @@
+# tests/test_transfer_control.py
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import dropbox
+import pytest
+import requests
+from src import transfer_control
+from src.transfer_control import (
+    AdaptiveLimiter, TransferHTTPError, call_with_retry, classify_error, parse_retry_after, refresh_access_token,
+    THROTTLED, TRANSIENT, FATAL
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = headers or {}
+        self.text = str(payload)
+
+    def json(self):
+        return self.payload
+
+
+class FakeTokenSession:
+    """Token endpoint answering with `responses` in turn."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.posts = 0
+
+    def post(self, url, data):
+        self.posts += 1
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(transfer_control.time, "sleep", sleeps.append)
+    return sleeps
+
+# ✅ Throttling and transient failures are retryable, anything else is not
+def test_classify_error():
+    assert classify_error(dropbox.exceptions.RateLimitError("id", backoff=3)) == (THROTTLED, 3)
+    assert classify_error(dropbox.exceptions.InternalServerError("id", 503, "busy")) == (TRANSIENT, None)
+    assert classify_error(requests.exceptions.ConnectionError("reset")) == (TRANSIENT, None)
+    assert classify_error(TransferHTTPError(429, "slow down", retry_after=2.0)) == (THROTTLED, 2.0)
+    assert classify_error(TransferHTTPError(400, "bad grant")) == (FATAL, None)
+    assert classify_error(IOError("disk full")) == (FATAL, None)
+
+# ✅ Retries wait for Retry-After on 429 and back off on transient errors
+def test_call_with_retry(no_sleep):
+    failures = [dropbox.exceptions.RateLimitError("id", backoff=0.05),
+                dropbox.exceptions.InternalServerError("id", 500, "oops")]
+
+    def flaky(value):
+        if failures:
+            raise failures.pop(0)
+        return value * 2
+
+    limiter = AdaptiveLimiter(8, initial=8)
+    assert call_with_retry(flaky, 21, limiter=limiter, base_delay=0.1) == 42
+    assert no_sleep[0] == 0.05 and 0 <= no_sleep[1] <= 0.2
+    assert limiter.stats() == {"limit": 2, "peak": 8, "throttled": 1, "errors": 1}
+
+# ❌ Fatal errors surface at once, retryable ones after the last attempt
+def test_call_with_retry_gives_up(no_sleep):
+    calls = []
+
+    def broken(error):
+        calls.append(error)
+        raise error
+
+    with pytest.raises(IOError):
+        call_with_retry(broken, IOError("gone"))
+    assert len(calls) == 1 and no_sleep == []
+    with pytest.raises(requests.exceptions.Timeout):
+        call_with_retry(broken, requests.exceptions.Timeout(), max_attempts=3)
+    assert len(calls) == 4 and len(no_sleep) == 2
+
+# ✅ The limit grows round by round while throughput improves and stops at the ceiling
+def test_limiter_grows_with_throughput():
+    limiter = AdaptiveLimiter(5, initial=2)
+    for _ in range(20):
+        for _ in range(limiter.limit):
+            limiter.acquire()
+        time.sleep(0.01)  # Each round takes as long, so throughput scales with the limit
+        for _ in range(limiter.limit):
+            limiter.release(nbytes=100)
+    assert limiter.limit == limiter.peak == 5
+
+# ✅ A 429 halves the limit and holds every new transfer for Retry-After
+def test_limiter_throttle_holds_new_transfers():
+    limiter = AdaptiveLimiter(8, initial=8)
+    limiter.acquire()
+    limiter.release(THROTTLED, retry_after=0.2)
+    assert limiter.limit == 4
+    started = time.monotonic()
+    acquired = threading.Event()
+    threading.Thread(target=lambda: (limiter.acquire(), acquired.set())).start()
+    assert acquired.wait(timeout=2)
+    assert time.monotonic() - started >= 0.15
+
+# ✅ Token refresh retries throttling and server errors; bad credentials fail fast
+def test_refresh_access_token(no_sleep):
+    session = FakeTokenSession([FakeResponse(429, headers={"Retry-After": "2"}), FakeResponse(503),
+                                FakeResponse(200, {"access_token": "fresh"})])
+    assert refresh_access_token("r", "id", "secret", session=session) == "fresh"
+    assert session.posts == 3 and no_sleep[0] == 2.0
+
+    session = FakeTokenSession([FakeResponse(400, {"error": "invalid_grant"})])
+    with pytest.raises(Exception, match="Status Code 400"):
+        refresh_access_token("r", "id", "secret", session=session)
+    assert session.posts == 1
+
+# ✅ Retry-After is read as delay-seconds or as an HTTP-date, never below zero
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0 and parse_retry_after("-1") == 0.0
+    assert parse_retry_after(None) is None and parse_retry_after("soon") is None
+    later = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 <= parse_retry_after(format_datetime(later, usegmt=True)) <= 30
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+    session = FakeTokenSession([FakeResponse(429, headers={"Retry-After": format_datetime(later, usegmt=True)}),
+                                FakeResponse(200, {"access_token": "fresh"})])
+    assert refresh_access_token("r", "id", "secret", session=session) == "fresh"
@@ -0,0 +1,42 @@
+# tests/test_transfer_loadtest.py
+
+import io
+
+from src.download_dropbox_files import list_downloadable_entries, download_entries
+from src.transfer_loadtest import FakeDropboxServer, local_client, run_load_test, UPLOAD_FOLDER
+
+# ✅ The real SDK round-trips files through throttling, 5xx errors and expiring tokens
+def test_load_test_survives_faults():
+    server = FakeDropboxServer(latency_s=0.005, capacity=4, throttle_rate=0.1, error_rate=0.05, retry_after_s=0,
+                               token_lifetime_s=0.2, seed=1)
+    with server:
+        report = run_load_test(server, files=16, size=20000, workers=8)
+        assert report["download"]["done"] == report["upload"]["done"] == 16
+        assert report["download"]["failed"] == report["upload"]["failed"] == 0
+        assert server.stats["throttled"] > 0 and server.stats["errors"] > 0 and server.stats["refreshes"] > 1
+        for i in range(16):
+            assert server.files[f"{UPLOAD_FOLDER}/part_{i:04d}.step"] == server.files[f"/bench/part_{i:04d}.step"]
+
+# ✅ Adaptive concurrency stays near the server's capacity instead of hammering it
+def test_adaptive_throttles_less_than_fixed():
+    throttled = {}
+    for fixed in (True, False):
+        with FakeDropboxServer(latency_s=0.02, capacity=3, retry_after_s=0) as server:
+            report = run_load_test(server, files=24, size=4096, workers=12, fixed=fixed)
+            throttled[fixed] = server.stats["throttled"]
+    # A fixed 12 against a capacity of 3 may even run out of retries; the adaptive run may not
+    assert report["download"]["failed"] == report["upload"]["failed"] == 0
+    assert throttled[False] < throttled[True]
+
+# ❌ A file missing on the server is reported as failed, not retried
+def test_missing_file_fails_without_retry(tmp_path):
+    with FakeDropboxServer() as server:
+        server.put_file("/in/a.step", b"A" * 10)
+        server.put_file("/in/b.step", b"B" * 10)
+        dbx = local_client(server)
+        entries = list_downloadable_entries(dbx, "/in", io.StringIO())
+        del server.files["/in/b.step"]
+        requests_before = server.stats["requests"]
+        downloaded, failed = download_entries(dbx, entries, str(tmp_path), io.StringIO())
+    assert downloaded == ["a.step"] and failed == ["b.step"]
+    assert server.stats["requests"] - requests_before == 2
@@ -0,0 +1,41 @@
+# tests/test_transfer_store.py
+
+import os
+
+import pytest
+from src.dropbox_sync import dropbox_content_hash
+from src.transfer_store import LocalStore, RemoteEntry, TransferError
+
+# ✅ Listing returns regular, visible files with their content hash
+def test_local_store_list(tmp_path):
+    folder = tmp_path / "remote" / "in"
+    folder.mkdir(parents=True)
+    (folder / "b.step").write_text("bb")
+    (folder / "a.zip").write_text("a")
+    (folder / ".state.json").write_text("{}")
+    (folder / "sub").mkdir()
+    entries = LocalStore(str(tmp_path / "remote")).list_files("/in")
+    assert [e.name for e in entries] == ["a.zip", "b.step"]
+    assert entries[1] == RemoteEntry("b.step", "/in/b.step", 2, dropbox_content_hash(str(folder / "b.step")))
+
+# ✅ Download and upload copy complete files and leave no partial files behind
+def test_local_store_roundtrip(tmp_path):
+    store = LocalStore(str(tmp_path / "remote"))
+    source = tmp_path / "result.json"
+    source.write_text("{}")
+    store.upload(str(source), "/out/nested/result.json")
+    assert (tmp_path / "remote" / "out" / "nested" / "result.json").read_text() == "{}"
+
+    local = tmp_path / "local"
+    local.mkdir()
+    entry, = store.list_files("/out/nested")
+    assert store.download(entry, str(local)) == str(local / "result.json")
+    assert os.listdir(local) == ["result.json"]
+
+# ❌ Missing folders and paths outside the root are rejected
+def test_local_store_errors(tmp_path):
+    store = LocalStore(str(tmp_path / "remote"))
+    with pytest.raises(TransferError):
+        store.list_files("/missing")
+    with pytest.raises(TransferError):
+        store.upload(__file__, "/../escape.py")
@@ -0,0 +1,73 @@
+# tests/test_upload_to_dropbox.py
+
+from src import upload_to_dropbox
+from src.upload_to_dropbox import collect_upload_files, upload_session_for_file, upload_files
+from tests.helpers.fake_dropbox import FakeDropbox
+
+
+def make_outputs(tmp_path):
+    files = {
+        "a.json": b'{"nx": 4}',
+        "b_mask.npy": bytes(range(256)) * 40,
+        "empty.json": b"",
+    }
+    for name, data in files.items():
+        (tmp_path / name).write_bytes(data)
+    (tmp_path / ".hidden").write_bytes(b"skip")
+    (tmp_path / "subdir").mkdir()
+    return files
+
+# ✅ Directories expand to their visible regular files, sorted
+def test_collect_upload_files(tmp_path):
+    make_outputs(tmp_path)
+    names = [p.rsplit("/", 1)[-1] for p in collect_upload_files([str(tmp_path)])]
+    assert names == ["a.json", "b_mask.npy", "empty.json"]
+
+# ✅ Large files are sent in chunks; the session is closed on the last one
+def test_upload_session_chunks(tmp_path):
+    data = make_outputs(tmp_path)["b_mask.npy"]
+    dbx = FakeDropbox()
+    cursor = upload_session_for_file(dbx, str(tmp_path / "b_mask.npy"), chunk_size=4096)
+    assert cursor.offset == len(data)
+    appends = [c for c in dbx.calls if c[0] == "files_upload_session_append_v2"]
+    assert len(appends) == 2
+    assert appends[-1][-1] is True
+    assert bytes(dbx.sessions[cursor.session_id]["data"]) == data
+
+# ✅ Concurrent sessions are committed with a single finish-batch call
+def test_upload_files_batch_commit(tmp_path):
+    files = make_outputs(tmp_path)
+    dbx = FakeDropbox()
+    uploads = [(str(tmp_path / name), f"/out/{name}") for name in files]
+    uploaded, failed = upload_files(dbx, uploads, max_workers=3, chunk_size=1024)
+    assert failed == []
+    assert uploaded == [f"/out/{name}" for name in files]
+    assert [c for c in dbx.calls if c[0] == "files_upload_session_finish_batch_v2"] == [
+        ("files_upload_session_finish_batch_v2", 3)
+    ]
+    for name, data in files.items():
+        assert dbx.files[f"/out/{name}"] == data
+
+# ❌ A rejected commit is reported without hiding the successful ones
+def test_upload_files_commit_failure(tmp_path):
+    files = make_outputs(tmp_path)
+    dbx = FakeDropbox(fail_commits={"/out/a.json"})
+    uploads = [(str(tmp_path / name), f"/out/{name}") for name in files]
+    uploaded, failed = upload_files(dbx, uploads)
+    assert failed == [str(tmp_path / "a.json")]
+    assert sorted(uploaded) == ["/out/b_mask.npy", "/out/empty.json"]
+
+# ✅ The access token is refreshed once for the whole directory
+def test_single_token_refresh(tmp_path, monkeypatch):
+    files = make_outputs(tmp_path)
+    refreshes = []
+    dbx = FakeDropbox()
+    monkeypatch.setattr(upload_to_dropbox, "refresh_access_token",
+                        lambda *args: refreshes.append(args) or "token")
+    monkeypatch.setattr(upload_to_dropbox.dropbox, "Dropbox", lambda *a, **k: dbx)
+    uploaded, failed = upload_to_dropbox.upload_files_to_dropbox(
+        [str(tmp_path)], "/pipeline", "r", "id", "secret", max_workers=2
+    )
+    assert len(refreshes) == 1
+    assert failed == []
+    assert sorted(dbx.files) == sorted(f"/pipeline/{name}" for name in files)
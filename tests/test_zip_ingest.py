@@ -0,0 +1,81 @@
+# tests/test_zip_ingest.py
+
+import os
+import zipfile
+
+import pytest
+from src.zip_ingest import (
+    list_step_members, member_ref, split_member_ref, member_output_stem, spool_member, open_step_source
+)
+from src.batch_runner import collect_step_files, output_path_for, plan_outputs
+
+STEP_MODEL = os.path.join(os.path.dirname(__file__), "test_models", "test_cube.step")
+
+
+def make_archive(path, members):
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return str(path)
+
+# ✅ Only STEP members are listed; folders, resource forks and hidden files are skipped
+def test_list_step_members(tmp_path):
+    archive = make_archive(tmp_path / "parts.zip", {
+        "b/bolt.STP": "x", "a.step": "x", "readme.txt": "x", "b/": "",
+        "__MACOSX/a.step": "x", "b/.hidden.step": "x",
+    })
+    assert list_step_members(archive) == ["a.step", "b/bolt.STP"]
+
+# ❌ Members that would escape the output directory are skipped
+def test_list_step_members_unsafe(tmp_path, capsys):
+    archive = make_archive(tmp_path / "evil.zip", {"../up.step": "x", "/abs.step": "x", "ok.step": "x"})
+    assert list_step_members(archive) == ["ok.step"]
+    assert "[WARN]" in capsys.readouterr().out
+
+# ✅ References round-trip and plain paths pass through
+def test_member_ref_roundtrip():
+    ref = member_ref("/data/Vendor.ZIP", "asm/part.step")
+    assert split_member_ref(ref) == ("/data/Vendor.ZIP", "asm/part.step")
+    assert split_member_ref("/data/part.step") == ("/data/part.step", None)
+    assert member_output_stem(ref) == os.path.join("Vendor", "asm", "part")
+
+# ✅ A spooled member has the STEP extension and the member's bytes, and is removed afterwards
+def test_spool_member(tmp_path):
+    with open(STEP_MODEL, "rb") as f:
+        data = f.read()
+    archive = make_archive(tmp_path / "parts.zip", {"asm/cube.STP": data, "other.step": "x"})
+    spool_dir = tmp_path / "spool"
+    spool_dir.mkdir()
+    with open_step_source(member_ref(archive, "asm/cube.STP"), spool_dir=str(spool_dir)) as path:
+        assert path.endswith(".stp")
+        assert os.listdir(spool_dir) == [os.path.basename(path)]
+        with open(path, "rb") as f:
+            assert f.read() == data
+    assert os.listdir(spool_dir) == []
+    with open_step_source(STEP_MODEL) as path:
+        assert path == STEP_MODEL
+
+# ❌ The temporary file is removed when the consumer fails
+def test_spool_member_cleanup_on_error(tmp_path):
+    archive = make_archive(tmp_path / "parts.zip", {"a.step": "x"})
+    with pytest.raises(RuntimeError):
+        with spool_member(archive, "a.step", spool_dir=str(tmp_path)) as path:
+            raise RuntimeError("extractor failed")
+    assert not os.path.exists(path)
+
+# ✅ Batch sources expand archives found directly, in directories and in manifests
+def test_collect_step_files_archives(tmp_path):
+    archive = make_archive(tmp_path / "vendor.zip", {"x/part.step": "x", "y/part.step": "x"})
+    (tmp_path / "loose.step").write_text("")
+    refs = [member_ref(archive, "x/part.step"), member_ref(archive, "y/part.step")]
+    assert collect_step_files(archive) == refs
+    assert collect_step_files(str(tmp_path)) == [str(tmp_path / "loose.step")] + refs
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text("vendor.zip\n")
+    assert collect_step_files(str(manifest)) == refs
+    # Same part name in two archive folders maps to two outputs
+    planned = plan_outputs(refs, "/out")
+    assert [output for _, output in planned] == [
+        os.path.join("/out", "vendor", "x", "part.json"), os.path.join("/out", "vendor", "y", "part.json")
+    ]
+    assert output_path_for(str(tmp_path / "loose.step"), "/out") == "/out/loose.json"